@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+date_parser と、統合前の extract_items 内の日付パース処理（旧実装）の速度比較
+
+- 旧実装は行ごとに正規表現を都度評価し、strptime を try/except で切り替えていた
+- 新実装は事前コンパイル済みルール + 正規化テキストをキーにした LRU キャッシュ
+- 一覧ページを模して、少数の日付が繰り返し出現する入力で parses/sec を計測
+- 旧実装が解釈できる入力については結果が一致することも確認する
+
+使い方:
+    python benchmarks/bench_date_parser.py --n 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import date_parser  # noqa: E402
+
+DATE_REGEX = r"(\d{4})[./-](\d{1,2})[./-](\d{1,2})"
+
+
+def _quiet(*args, **kwargs) -> None:
+    pass
+
+
+def legacy_parse(date_text: str, date_regex: Optional[str]) -> Optional[datetime]:
+    """統合前の scraper_utils.extract_items の日付パース（そのまま移植）"""
+    pub_date: Optional[datetime] = None
+
+    # 連続スペースなどを正規化（"22  November  2023" → "22 November 2023"）
+    date_text_norm = re.sub(r"\s+", " ", date_text or "").strip()
+
+    def _num(s: str) -> int:
+        return int(re.sub(r"\D", "", s or ""))
+
+    try:
+        # まずは呼び出し側から渡された正規表現で試す
+        match = re.search(date_regex, date_text_norm) if date_regex else None
+
+        if match:
+            groups = match.groups()
+            effective = [g for g in groups if g is not None]
+
+            if len(effective) == 3:
+                a, b, c = effective
+
+                # DMY（例: 22 November 2023 / 22 Nov 2023）
+                if re.match(r"^[A-Za-z]{3,}$", b):
+                    # まずフル月名 %B、失敗したら短縮 %b
+                    try:
+                        pub_date = datetime.strptime(f"{a} {b} {c}", "%d %B %Y").replace(tzinfo=timezone.utc)
+                    except ValueError:
+                        pub_date = datetime.strptime(f"{a} {b} {c}", "%d %b %Y").replace(tzinfo=timezone.utc)
+
+                # MDY（例: Aug 6, 2025）※カンマ入りは別ルートで掴むことが多いが保険で対応
+                elif re.match(r"^[A-Za-z]{3,}$", a) and ("," in date_text_norm):
+                    # "Aug 6, 2025" / "August 6, 2025"
+                    try:
+                        pub_date = datetime.strptime(f"{a} {int(_num(b))}, {int(_num(c))}", "%b %d, %Y").replace(tzinfo=timezone.utc)
+                    except ValueError:
+                        pub_date = datetime.strptime(f"{a} {int(_num(b))}, {int(_num(c))}", "%B %d, %Y").replace(tzinfo=timezone.utc)
+
+                else:
+                    # 数値系（YMD 等）フォールバック
+                    year, month, day = _num(a), _num(b), _num(c)
+                    if year < 100:
+                        year += 2000
+                    pub_date = datetime(year, month, day, tzinfo=timezone.utc)
+
+            elif len(effective) == 2:
+                # 年月だけのケース（順不同対応）
+                x, y = effective
+                xn, yn = _num(x), _num(y)
+                if len(str(xn)) == 4:
+                    year, mo = xn, yn
+                elif len(str(yn)) == 4:
+                    year, mo = yn, xn
+                else:
+                    raise ValueError("Year not found in two-group date")
+                if year < 100:
+                    year += 2000
+                pub_date = datetime(year, mo, 1, tzinfo=timezone.utc)
+
+            else:
+                _quiet("⚠ 想定外のグループ構成でした（date_regexを見直してください）")
+
+        else:
+            # ---------- セカンダリの複合フォールバック ----------
+            # 1) DMY（フル/短縮月名）
+            m = re.search(r"(\d{1,2})\s+([A-Za-z]{3,})\s+(\d{4})", date_text_norm)
+            if m:
+                d, mon, y = m.groups()
+                try:
+                    pub_date = datetime.strptime(f"{d} {mon} {y}", "%d %B %Y").replace(tzinfo=timezone.utc)
+                except ValueError:
+                    pub_date = datetime.strptime(f"{d} {mon} {y}", "%d %b %Y").replace(tzinfo=timezone.utc)
+            else:
+                # 2) MDY（英語月名 + 日, 年）
+                m2 = re.search(r"([A-Za-z]{3,})\s+(\d{1,2}),\s+(\d{4})", date_text_norm)
+                if m2:
+                    mon, d, y = m2.groups()
+                    try:
+                        pub_date = datetime.strptime(f"{mon} {d}, {y}", "%b %d, %Y").replace(tzinfo=timezone.utc)
+                    except ValueError:
+                        pub_date = datetime.strptime(f"{mon} {d}, {y}", "%B %d, %Y").replace(tzinfo=timezone.utc)
+                else:
+                    # 3) 日本語「M月 YYYY」→ day=1 補完
+                    m3 = re.search(r"(\d{1,2})月\s+(\d{4})", date_text_norm)
+                    if m3:
+                        mo, y = map(_num, m3.groups())
+                        if y < 100:
+                            y += 2000
+                        pub_date = datetime(y, mo, 1, tzinfo=timezone.utc)
+                    else:
+                        # 4) 数値 Y-M-D
+                        m4 = re.search(r"(\d{4})[./-](\d{1,2})[./-](\d{1,2})", date_text_norm)
+                        if m4:
+                            y, mo, d = map(_num, m4.groups())
+                            pub_date = datetime(y, mo, d, tzinfo=timezone.utc)
+                        else:
+                            _quiet("⚠ 日付の抽出に失敗しました（正規表現にマッチしません）")
+    except Exception as e:
+        _quiet(f"⚠ 日付パースに失敗: {e}")
+        pub_date = None
+    return pub_date
+
+
+def legacy_parse_reiwa(date_text: str) -> Optional[datetime]:
+    """統合前の scraper_utils2.extract_items の日付パース（そのまま移植）"""
+    pub_date: Optional[datetime] = None
+
+    # 連続スペースなどを正規化
+    date_text_norm = re.sub(r"\s+", " ", date_text or "").strip()
+
+    # 全角数字 → 半角数字
+    def _to_ascii_digits(s: str) -> str:
+        table = str.maketrans({chr(ord("０") + i): str(i) for i in range(10)})
+        return (s or "").translate(table)
+
+    def _num(s: str) -> int:
+        s = _to_ascii_digits(s)
+        return int(re.sub(r"\D", "", s))
+
+    try:
+        # 令和N年M月D日 / 令和Ｎ年Ｍ月Ｄ日 / 令和元年M月D日 だけを扱う
+        m_reiwa = re.search(
+            r"令和\s*([0-9０-９]{1,2}|元)年\s*([0-9０-９]{1,2})月\s*([0-9０-９]{1,2})日",
+            date_text_norm,
+        )
+
+        if m_reiwa:
+            nen, mo, d = m_reiwa.groups()
+
+            # 「元年」対応（想定しないなら常に _num でもOK）
+            if nen == "元":
+                nen_i = 1
+            else:
+                nen_i = _num(nen)
+
+            mo_i = _num(mo)
+            d_i = _num(d)
+
+            # 令和1年 = 2019年 → 2018 + N
+            year = 2018 + nen_i
+            pub_date = datetime(year, mo_i, d_i, tzinfo=timezone.utc)
+        else:
+            # 令和表記が無ければ pub_date は None のまま
+            _quiet("⚠ 令和形式の日付が見つかりませんでした（pub_date=None）")
+
+    except Exception as e:
+        _quiet(f"⚠ 日付パースに失敗: {e}")
+        pub_date = None
+    return pub_date
+
+
+# 一覧ページでよく見る書式（DATE_REGEX にマッチするものとしないもの）
+_SAMPLES = [
+    "2025.08.06",
+    "2025/8/6 更新",
+    "2025-08-06",
+    "22 November 2023",
+    "6 Aug 2025",
+    "Aug 6, 2025",
+    "August 6, 2025",
+    "8月 2025",
+    "2025年8月6日",
+    "令和7年8月6日",
+    "令和７年８月６日",
+    "令和元年5月1日",
+    "平成31年4月30日",
+    "お知らせ",
+]
+
+
+def _make_inputs(n: int, distinct_days: int, seed: int = 0):
+    rnd = random.Random(seed)
+    days = [(2024 + d // 365, 1 + (d // 28) % 12, 1 + d % 28) for d in range(distinct_days)]
+    texts = []
+    for _ in range(n):
+        y, m, d = rnd.choice(days)
+        fmt = rnd.choice(_SAMPLES)
+        texts.append(
+            fmt.replace("2025", str(y)).replace("8", str(m), 1).replace("6", str(d), 1)
+            if fmt[0].isdigit() else fmt
+        )
+    return texts
+
+
+def _rate(fn, texts) -> float:
+    started = time.perf_counter()
+    for t in texts:
+        fn(t)
+    return len(texts) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20000, help="パースするテキスト数")
+    parser.add_argument("--distinct-days", type=int, default=30, help="入力に現れる日付の種類数")
+    args = parser.parse_args()
+
+    texts = _make_inputs(args.n, args.distinct_days)
+
+    # 旧実装が解釈できる入力は一致すること（新ルールで増えた書式は除く）
+    for t in set(texts):
+        old = legacy_parse(t, DATE_REGEX)
+        if old is not None and old != date_parser.parse_date(t, DATE_REGEX):
+            raise SystemExit(f"❌ 結果不一致: {t!r}")
+        old = legacy_parse_reiwa(t)
+        if old is not None and old != date_parser.parse_date(t, rules=date_parser.WAREKI_RULES):
+            raise SystemExit(f"❌ 和暦の結果不一致: {t!r}")
+
+    rows = [("legacy scraper_utils", _rate(lambda t: legacy_parse(t, DATE_REGEX), texts))]
+    rows.append(("legacy scraper_utils2", _rate(legacy_parse_reiwa, texts)))
+
+    date_parser.clear_cache()
+    uncached = date_parser._parse_normalized.__wrapped__
+    rows.append((
+        "date_parser (no cache)",
+        _rate(lambda t: uncached(date_parser.normalize_date_text(t), DATE_REGEX, date_parser.DEFAULT_RULES), texts),
+    ))
+    date_parser.clear_cache()
+    rows.append(("date_parser.parse_date", _rate(lambda t: date_parser.parse_date(t, DATE_REGEX), texts)))
+    info = date_parser.cache_info()
+
+    date_parser.clear_cache()
+    started = time.perf_counter()
+    date_parser.parse_dates(texts, DATE_REGEX)
+    rows.append(("date_parser.parse_dates", len(texts) / (time.perf_counter() - started)))
+
+    base = rows[0][1]
+    print(f"{'implementation':<26}{'parses/sec':>14}{'vs legacy':>11}")
+    for name, rate in rows:
+        print(f"{name:<26}{rate:>14,.0f}{rate / base:>10.1f}x")
+    print(f"parse_date cache: hits={info.hits} misses={info.misses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+extract_items のロケータ経路と bulk 経路（1 回の page.evaluate）を比較するベンチマーク
+
+- 行数ごとに合成したリストページを page.set_content で読み込み、両経路で抽出
+- Playwright との往復（RPC）回数と所要時間を計測して表で出力
+- 両経路の戻り値が一致することも確認する
+
+使い方:
+    python benchmarks/bench_extract_items.py --rows 10 50 100 500 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from playwright.sync_api import sync_playwright  # noqa: E402
+
+import scraper_utils  # noqa: E402
+import scraper_utils2  # noqa: E402
+
+# ドライバとの往復が発生するメソッド（locator()/nth() はクライアント側で完結する）
+_RPC_METHODS = {
+    "count",
+    "text_content",
+    "inner_text",
+    "get_attribute",
+    "is_visible",
+    "evaluate",
+    "wait_for_load_state",
+    "wait_for_selector",
+    "click",
+}
+
+
+class _CountingProxy:
+    """Page / Locator をラップし、RPC を伴うメソッド呼び出し回数を数える"""
+
+    def __init__(self, target, counter):
+        self._target = target
+        self._counter = counter
+
+    def __bool__(self):
+        return True
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return _wrap(attr, self._counter)
+
+        def _call(*args, **kwargs):
+            if name in _RPC_METHODS:
+                self._counter["rpc"] += 1
+            return _wrap(attr(*args, **kwargs), self._counter)
+
+        return _call
+
+
+def _wrap(obj, counter):
+    if hasattr(obj, "locator") and hasattr(obj, "count"):
+        return _CountingProxy(obj, counter)
+    return obj
+
+
+def _build_html(rows: int) -> str:
+    today = datetime.now(timezone.utc)
+    ymd = f"{today.year}年{today.month}月{today.day}日"
+    reiwa = f"令和{today.year - 2018}年{today.month}月{today.day}日"
+    lis = "\n".join(
+        f'<li><span class="date">{ymd} {reiwa}</span>'
+        f'<a href="/news/{i}.html" title="記事 {i}">お知らせ {i}</a></li>'
+        for i in range(rows)
+    )
+    return f"<html><body><ul class=\"news\">{lis}</ul></body></html>"
+
+
+def _run(module, page, rows: int, bulk: bool):
+    counter = {"rpc": 0}
+    proxy = _CountingProxy(page, counter)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        items = module.extract_items(
+            proxy,
+            SELECTOR_DATE="ul.news li",
+            SELECTOR_TITLE="ul.news li",
+            title_selector="a",
+            title_index=0,
+            href_selector="a",
+            href_index=0,
+            base_url="https://example.com/",
+            date_selector="span.date",
+            date_index=0,
+            date_format=None,
+            date_regex=r"(\d{4})年(\d{1,2})月(\d{1,2})日",
+            max_items=rows,
+            bulk=bulk,
+        )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return items, counter["rpc"], elapsed_ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 50, 100, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", dest="json_path", default=None, help="結果を JSON で保存するパス")
+    args = parser.parse_args()
+
+    results = []
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        for rows in args.rows:
+            page.set_content(_build_html(rows))
+            for module in (scraper_utils, scraper_utils2):
+                best = {}
+                outputs = {}
+                for bulk in (False, True):
+                    times = []
+                    for _ in range(args.repeat):
+                        items, rpc, ms = _run(module, page, rows, bulk)
+                        times.append(ms)
+                    outputs[bulk] = items
+                    best[bulk] = (rpc, min(times))
+                if outputs[False] != outputs[True]:
+                    raise SystemExit(f"❌ {module.__name__} rows={rows}: bulk と locator の結果が一致しません")
+                for bulk in (False, True):
+                    rpc, ms = best[bulk]
+                    results.append(
+                        {
+                            "module": module.__name__,
+                            "rows": rows,
+                            "mode": "bulk" if bulk else "locator",
+                            "rpc": rpc,
+                            "ms": round(ms, 2),
+                        }
+                    )
+        browser.close()
+
+    print(f"{'module':<15}{'rows':>6}  {'mode':<8}{'rpc':>8}{'ms':>12}")
+    for r in results:
+        print(f"{r['module']:<15}{r['rows']:>6}  {r['mode']:<8}{r['rpc']:>8}{r['ms']:>12.2f}")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+各モジュールの import 時間を `python -X importtime` で計測し、予算と比較するベンチマーク
+
+- モジュールごとに新しいインタプリタで `import <module>` だけを実行し、そのモジュールの
+  cumulative（子の import を含む）時間を取る。repeat 回のうち最小値を採用
+- 重い依存（playwright / feedgen / feedparser / lxml / requests / bs4）は使う時まで読み込まない方針のため、
+  モジュールごとに「import しただけで読み込まれてはいけない」依存も確認する
+- 予算超過または禁止した依存の読み込みがあれば、重い子 import を表示して終了コード 1 で終了する
+
+使い方:
+    python benchmarks/bench_importtime.py
+    python benchmarks/bench_importtime.py --only rss_utils scraper_utils --repeat 10
+    python benchmarks/bench_importtime.py --budget rss_utils=80 --output .cache/bench/importtime.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_REPEAT = 5
+# 表示する重い子 import の件数
+TOP_CHILDREN = 5
+
+_BROWSER = ("playwright",)
+_FEED = ("feedgen", "feedparser", "lxml")
+_HTTP = ("requests", "bs4")
+
+# module -> (予算 ms, import しただけで読み込まれてはいけないモジュール)
+# 予算は CI ランナーの揺れを見込んで手元の計測値の 2〜3 倍
+ENTRY_POINTS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "instrumentation": (20.0, _BROWSER + _FEED + _HTTP),
+    "date_parser": (20.0, _BROWSER + _FEED + _HTTP),
+    "feed_item": (20.0, _BROWSER + _FEED + _HTTP),
+    "cache_files": (20.0, _BROWSER + _FEED + _HTTP),
+    "scheduler": (25.0, _BROWSER + _FEED + _HTTP + ("subprocess", "argparse")),
+    "scraper_utils": (40.0, _BROWSER + _FEED + _HTTP),
+    "scraper_utils2": (40.0, _BROWSER + _FEED + _HTTP),
+    "browser_utils": (40.0, _BROWSER + _FEED + _HTTP),
+    "rss_utils": (80.0, _BROWSER + _FEED + _HTTP),
+    "seen_store": (90.0, _BROWSER + _FEED + _HTTP),
+    "http_cache": (50.0, _BROWSER + _FEED + _HTTP),
+    "list_fingerprint": (50.0, _BROWSER + _FEED + _HTTP),
+    # requests を使う HTTP 経路の共通部品。bs4（lxml）は読み込まない
+    "fetch_scheduler": (300.0, _BROWSER + _FEED + ("bs4",)),
+    "pagination": (100.0, _BROWSER + _FEED + _HTTP),
+    # 静的 HTML 経路は requests / bs4（lxml）を使うため、ブラウザと feed 生成の依存だけを禁止
+    "static_scraper": (500.0, _BROWSER + ("feedgen", "feedparser")),
+}
+
+_PROBE = "import json, sys; import {module}; print(json.dumps(sorted(sys.modules)))"
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[int, int, str]]:
+    """`import time: self | cumulative | name` の行を (self_us, cumulative_us, name) に（name は字下げ付き）"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+
+def _indent(name: str) -> int:
+    return len(name) - len(name.lstrip(" "))
+
+
+def measure(module: str) -> Dict[str, object]:
+    """module を新しいインタプリタで import し、cumulative ms・読み込まれたモジュール・重い子 import を返す"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = _parse_importtime(proc.stderr)
+    # 対象モジュールの行は子の行の後に字下げなしで出る
+    end = max(i for i, (_, _, name) in enumerate(rows) if name.strip() == module and _indent(name) == 1)
+    start = end
+    while start > 0 and _indent(rows[start - 1][2]) > 1:
+        start -= 1
+    children = sorted(
+        ((cum, name.strip()) for _, cum, name in rows[start:end] if _indent(name) == 3),
+        reverse=True,
+    )
+    return {
+        "ms": rows[end][1] / 1000,
+        "modules": json.loads(proc.stdout.strip().splitlines()[-1]),
+        "children": [(name, round(cum / 1000, 2)) for cum, name in children[:TOP_CHILDREN]],
+    }
+
+
+def _loaded(modules: List[str], forbidden: Tuple[str, ...]) -> List[str]:
+    return [f for f in forbidden if any(m == f or m.startswith(f + ".") for m in modules)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", default=None, metavar="MODULE", help="計測するモジュール")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="計測回数（最小値を採用）")
+    parser.add_argument("--budget", nargs="+", default=[], metavar="MODULE=MS", help="予算の上書き")
+    parser.add_argument("--output", default=None, metavar="PATH", help="結果を JSON で保存")
+    args = parser.parse_args()
+
+    budgets = {name: budget for name, (budget, _) in ENTRY_POINTS.items()}
+    for spec in args.budget:
+        name, _, ms = spec.partition("=")
+        budgets[name] = float(ms)
+    names = args.only or list(ENTRY_POINTS)
+
+    results = {}
+    failed = 0
+    print(f"{'module':<18}{'ms':>9}{'budget':>9}  status")
+    for name in names:
+        runs = [measure(name) for _ in range(max(1, args.repeat))]
+        best = min(runs, key=lambda r: r["ms"])
+        budget = budgets.get(name)
+        forbidden = _loaded(best["modules"], ENTRY_POINTS.get(name, (0.0, ()))[1])
+        over = budget is not None and best["ms"] > budget
+        status = "ok"
+        if over or forbidden:
+            failed += 1
+            status = "❌ " + ", ".join(
+                (["over budget"] if over else []) + ([f"loaded {', '.join(forbidden)}"] if forbidden else [])
+            )
+        print(f"{name:<18}{best['ms']:>9.1f}{budget if budget is not None else float('nan'):>9.1f}  {status}")
+        if status != "ok":
+            for child, ms in best["children"]:
+                print(f"{'':<20}{child:<40}{ms:>8.2f} ms")
+        results[name] = {
+            "ms": round(best["ms"], 3),
+            "runs_ms": [round(r["ms"], 3) for r in runs],
+            "budget_ms": budget,
+            "forbidden_loaded": forbidden,
+            "children": best["children"],
+        }
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    if failed:
+        raise SystemExit(f"\n❌ {failed} モジュールが import 時間の予算または遅延 import の方針を満たしていません")
+    print("\n✅ すべてのモジュールが予算内です")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+generate_rss の feedgen バックエンドと stream バックエンドの比較ベンチマーク
+
+- 件数ごとに items をジェネレータで供給し、所要時間と tracemalloc のピークメモリを計測
+- 出力した 2 つのフィードの記事内容（順序を除く）が一致することも確認する
+- feedgen で書いたフィードを stream の incremental で更新しても、max_history 件の上限で新しい記事が残ることも確認する
+
+使い方:
+    python benchmarks/bench_rss_writer.py --items 500 5000 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import rss_utils  # noqa: E402
+
+BASE_URL = "https://example.org/"
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def _items(n: int):
+    now = NOW
+    for i in range(n):
+        yield {
+            "title": f"お知らせ {i}：第{i % 50}回 学術集会のご案内",
+            "link": f"{BASE_URL}news/{i}.html" if i % 3 else None,
+            "description": f"説明 {i}",
+            "pub_date": now - timedelta(hours=i) if i % 5 else None,
+        }
+
+
+def _generate(backend: str, n: int, path: str) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        rss_utils.generate_rss(_items(n), path, BASE_URL, "ベンチマーク学会", backend=backend)
+
+
+def _measure(backend: str, n: int, path: str):
+    # 時間は tracemalloc なしで、メモリは別の実行で計測する
+    started = time.perf_counter()
+    _generate(backend, n, path)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    tracemalloc.start()
+    _generate(backend, n, path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed_ms, peak / (1024 * 1024)
+
+
+def _check_incremental_switch(tmp: str) -> None:
+    """feedgen（古い順）で書いたフィードに stream の incremental で 1 件足すと、新しい順に max_history 件残る"""
+    path = str(Path(tmp) / "switch.xml")
+    old = [
+        {"title": f"T{i}", "link": f"{BASE_URL}t/{i}", "description": "", "pub_date": NOW - timedelta(days=i)}
+        for i in range(5)
+    ]
+    new = [{"title": "NEW", "link": f"{BASE_URL}new", "description": "", "pub_date": NOW + timedelta(days=1)}]
+    with contextlib.redirect_stdout(io.StringIO()):
+        rss_utils.generate_rss(old, path, BASE_URL, "ベンチマーク学会")
+        rss_utils.generate_rss(new, path, BASE_URL, "ベンチマーク学会", incremental=True, max_history=3, backend="stream")
+    titles = [item["title"] for item in rss_utils.read_feed_items(path)]
+    if titles != ["NEW", "T0", "T1"]:
+        raise SystemExit(f"❌ feedgen → stream の incremental で新しい記事が残っていません: {titles}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[500, 5000, 50000])
+    args = parser.parse_args()
+
+    print(f"{'items':>7}  {'backend':<8}{'ms':>10}{'peak MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        _check_incremental_switch(tmp)
+        for n in args.items:
+            paths = {}
+            for backend in ("feedgen", "stream"):
+                paths[backend] = str(Path(tmp) / f"{backend}-{n}.xml")
+                ms, peak = _measure(backend, n, paths[backend])
+                print(f"{n:>7}  {backend:<8}{ms:>10.1f}{peak:>10.2f}")
+
+            feeds = {b: sorted(rss_utils.iter_feed_entries(p), key=lambda e: e["guid"]) for b, p in paths.items()}
+            if feeds["feedgen"] != feeds["stream"]:
+                raise SystemExit(f"❌ items={n}: バックエンド間で記事内容が一致しません")
+
+
+if __name__ == "__main__":
+    main()
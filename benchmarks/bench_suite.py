@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+"""
+ローカル fixture に対するオフラインのベンチマークスイート
+
+fixtures.py の一覧ページ（リスト / テーブル / 列分割 / hidden / 和暦 / 英語日付、10〜2000 行）を
+ローカル HTTP サーバで配信し、以下を計測して JSON に保存する。
+
+- extract_items（scraper_utils / scraper_utils2、ロケータ経路と bulk 経路）
+- _get_first_text_in_parent / _get_first_attr_in_parent（全行に対して 1 回ずつ）
+- 日付パース（parse_date をキャッシュなし / あり、parse_dates 一括）
+- click_button_in_order（合成ポップアップ: ボタン / リンク / 遅延表示 / iframe / なし）
+- extract_items_static（ブラウザなし、fetch_html を含む）
+- generate_rss（feedgen / stream バックエンド）
+
+--baseline を指定すると各ケースの中央値を比較し、しきい値を超えて遅くなったケースがあれば
+終了コード 1 で終了する（CI でのリグレッション検出用）。Chromium が起動できない環境では
+ブラウザを使うケースを skipped として記録し、残りのケースだけ計測する。
+
+使い方:
+    python benchmarks/bench_suite.py --output .cache/bench/latest.json
+    python benchmarks/bench_suite.py --baseline .cache/bench/baseline.json
+    python benchmarks/bench_suite.py --save-baseline .cache/bench/baseline.json --only parse_date
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import date_parser  # noqa: E402
+import rss_utils  # noqa: E402
+import scraper_utils  # noqa: E402
+import scraper_utils2  # noqa: E402
+import static_scraper  # noqa: E402
+from browser_utils import click_button_in_order  # noqa: E402
+from fixtures import (  # noqa: E402
+    DEFAULT_ROWS,
+    FIXTURES,
+    POPUP_LABEL,
+    POPUPS,
+    build_fixture,
+    extract_args,
+    serve_directory,
+    write_fixtures,
+    write_popup_pages,
+)
+
+SCHEMA_VERSION = 1
+DEFAULT_REPEAT = 5
+# 中央値がベースラインの (1 + しきい値) 倍を超えたらリグレッション
+DEFAULT_THRESHOLD = 0.25
+# 待ち時間やスケジューリングの揺れが大きいグループは緩めに判定する
+GROUP_THRESHOLDS = {
+    "click_button_in_order": 0.5,
+    "parse_date": 0.5,
+}
+# 差がこの ms 未満ならノイズとして扱う（マイクロベンチの誤検出防止）
+MIN_DELTA_MS = 1.0
+# ロケータ経路は行数に比例して往復が増えるため、これを超える行数では計測しない
+DEFAULT_LOCATOR_MAX_ROWS = 500
+GENERATE_RSS_SIZES = (100, 1000)
+MODULES = (scraper_utils, scraper_utils2)
+
+
+class Suite:
+    """ケースを登録順に計測し、結果とスキップ理由を保持する"""
+
+    def __init__(self, repeat: int, only: List[str]):
+        self.repeat = repeat
+        self.only = only
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.skipped: Dict[str, str] = {}
+
+    def wanted(self, case: str) -> bool:
+        return not self.only or any(fnmatch.fnmatch(case, pat) or case.startswith(pat) for pat in self.only)
+
+    def wants_group(self, group: str) -> bool:
+        """group（ケース名の先頭要素）のケースが 1 つでも計測対象になりうるか"""
+        heads = [pat.split("/", 1)[0] for pat in self.only]
+        return not self.only or any(fnmatch.fnmatch(group, h) or group.startswith(h) for h in heads)
+
+    def measure(
+        self,
+        case: str,
+        fn: Callable[[], Any],
+        setup: Optional[Callable[[], Any]] = None,
+        repeat: Optional[int] = None,
+        **extra,
+    ) -> None:
+        """fn を repeat 回実行して中央値・最小値を記録する（setup は各回の直前に実行し計測外）"""
+        if not self.wanted(case):
+            return
+        times = []
+        try:
+            for _ in range(repeat or self.repeat):
+                if setup is not None:
+                    setup()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    started = time.perf_counter()
+                    fn()
+                    times.append((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            self.skipped[case] = f"{type(e).__name__}: {e}"
+            print(f"⚠ {case}: {self.skipped[case]}")
+            return
+        self.results[case] = {
+            "group": case.split("/", 1)[0],
+            "median_ms": round(statistics.median(times), 3),
+            "min_ms": round(min(times), 3),
+            "runs": len(times),
+            **extra,
+        }
+        print(f"⏱ {case:<60}{self.results[case]['median_ms']:>12.2f} ms")
+
+    def skip_group(self, group: str, reason: str) -> None:
+        if self.wants_group(group):
+            self.skipped[group] = reason
+
+
+# --- ブラウザなしのケース -----------------------------------------------------
+
+def bench_parse_date(suite: Suite, rows: int) -> None:
+    for name, (_, args) in FIXTURES.items():
+        _, dates = build_fixture(name, rows)
+        regex = args["date_regex"]
+        rules = date_parser.WAREKI_RULES if name == "wareki" else date_parser.DEFAULT_RULES
+
+        def cold():
+            for text in dates:
+                date_parser.parse_date(text, regex, rules)
+
+        suite.measure(f"parse_date/{name}/{rows}/cold", cold, setup=date_parser.clear_cache)
+        suite.measure(f"parse_date/{name}/{rows}/warm", cold)
+        suite.measure(
+            f"parse_date/{name}/{rows}/parse_dates",
+            lambda: date_parser.parse_dates(dates, regex, rules),
+            setup=date_parser.clear_cache,
+        )
+
+
+def bench_static(suite: Suite, base: str, pages: Dict) -> None:
+    for (name, rows), path in pages.items():
+        for module in MODULES:
+            kwargs = extract_args(name, rows)
+
+            def run(module=module, path=path, kwargs=kwargs):
+                soup = static_scraper.fetch_html(base + path)
+                static_scraper.extract_items_static(soup, **kwargs, engine=module)
+
+            suite.measure(f"extract_items_static/{module.__name__}/{name}/{rows}", run)
+
+
+def _rss_items(n: int):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    return [
+        {
+            "title": f"お知らせ {i}",
+            "link": f"https://example.org/news/{i}.html",
+            "description": f"お知らせ {i}",
+            "pub_date": now - timedelta(hours=i),
+        }
+        for i in range(n)
+    ]
+
+
+def bench_generate_rss(suite: Suite, workdir: str) -> None:
+    for n in GENERATE_RSS_SIZES:
+        items = _rss_items(n)
+        for backend in ("feedgen", "stream"):
+            out = str(Path(workdir) / f"rss-{backend}-{n}.xml")
+            suite.measure(
+                f"generate_rss/{backend}/{n}",
+                lambda out=out, backend=backend: rss_utils.generate_rss(
+                    items, out, "https://example.org/", "ベンチマーク学会", backend=backend
+                ),
+            )
+
+
+# --- ブラウザを使うケース -----------------------------------------------------
+
+def bench_browser(
+    suite: Suite,
+    page,
+    base: str,
+    pages: Dict,
+    popups: Dict[str, str],
+    locator_max_rows: int,
+) -> None:
+    for (name, rows), path in pages.items():
+        url = base + path
+        page.goto(url, wait_until="domcontentloaded")
+        kwargs = extract_args(name, rows)
+
+        for module in MODULES:
+            for bulk in (False, True):
+                if not bulk and rows > locator_max_rows:
+                    continue
+                mode = "bulk" if bulk else "locator"
+                suite.measure(
+                    f"extract_items/{module.__name__}/{mode}/{name}/{rows}",
+                    lambda module=module, bulk=bulk: module.extract_items(page, **kwargs, bulk=bulk),
+                )
+
+        if rows > locator_max_rows:
+            continue
+        blocks = page.locator(kwargs["SELECTOR_TITLE"])
+        count = blocks.count()
+        suite.measure(
+            f"get_first_text_in_parent/{name}/{rows}",
+            lambda: [scraper_utils._get_first_text_in_parent(blocks.nth(i), kwargs["title_selector"]) for i in range(count)],
+        )
+        suite.measure(
+            f"get_first_attr_in_parent/{name}/{rows}",
+            lambda: [scraper_utils._get_first_attr_in_parent(blocks.nth(i), kwargs["href_selector"], "href") for i in range(count)],
+        )
+
+    for name, path in popups.items():
+        # absent は timeout_ms まで待つケース（見つからない場合のコスト）
+        timeout_ms = 1000 if name == "absent" else 5000
+        suite.measure(
+            f"click_button_in_order/{name}",
+            lambda timeout_ms=timeout_ms: click_button_in_order(page, POPUP_LABEL, 1, timeout_ms=timeout_ms),
+            setup=lambda path=path: page.goto(base + path, wait_until="domcontentloaded"),
+            repeat=min(suite.repeat, 3),
+        )
+
+
+BROWSER_GROUPS = ("extract_items", "get_first_text_in_parent", "get_first_attr_in_parent", "click_button_in_order")
+
+
+# --- ベースライン比較 ---------------------------------------------------------
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Any],
+    threshold: Optional[float] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    各ケースの中央値をベースラインと比較する
+    status: ok / regression / improved / new（ベースラインに無い）
+    """
+    base_results = baseline.get("results", {})
+    out = {}
+    for case, r in results.items():
+        limit = threshold if threshold is not None else GROUP_THRESHOLDS.get(r["group"], DEFAULT_THRESHOLD)
+        b = base_results.get(case)
+        if b is None:
+            out[case] = {"status": "new", "median_ms": r["median_ms"], "threshold": limit}
+            continue
+        ratio = r["median_ms"] / b["median_ms"] if b["median_ms"] > 0 else float("inf")
+        delta = r["median_ms"] - b["median_ms"]
+        if ratio > 1 + limit and delta >= MIN_DELTA_MS:
+            status = "regression"
+        elif ratio < 1 / (1 + limit) and -delta >= MIN_DELTA_MS:
+            status = "improved"
+        else:
+            status = "ok"
+        out[case] = {
+            "status": status,
+            "baseline_ms": b["median_ms"],
+            "median_ms": r["median_ms"],
+            "ratio": round(ratio, 3),
+            "threshold": limit,
+        }
+    return out
+
+
+def _print_comparison(comparison: Dict[str, Dict[str, Any]]) -> int:
+    marks = {"ok": "  ", "regression": "❌", "improved": "✅", "new": "🆕"}
+    regressions = 0
+    print(f"\n{'case':<62}{'baseline':>10}{'now':>10}{'ratio':>8}")
+    for case, c in comparison.items():
+        if c["status"] == "regression":
+            regressions += 1
+        base = f"{c['baseline_ms']:.2f}" if "baseline_ms" in c else "-"
+        ratio = f"{c['ratio']:.2f}" if "ratio" in c else "-"
+        print(f"{marks[c['status']]}{case:<60}{base:>10}{c['median_ms']:>10.2f}{ratio:>8}")
+    return regressions
+
+
+# --- 実行 ---------------------------------------------------------------------
+
+def run_suite(
+    rows_list: List[int],
+    repeat: int = DEFAULT_REPEAT,
+    only: Optional[List[str]] = None,
+    locator_max_rows: int = DEFAULT_LOCATOR_MAX_ROWS,
+    fixtures_dir: Optional[str] = None,
+    browser: bool = True,
+) -> Dict[str, Any]:
+    suite = Suite(repeat, only or [])
+    names = list(FIXTURES)
+
+    with contextlib.ExitStack() as stack:
+        workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="rss-bench-"))
+        directory = fixtures_dir or workdir
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        pages = write_fixtures(directory, names, rows_list)
+        popups = write_popup_pages(directory)
+        base = stack.enter_context(serve_directory(directory))
+        print(f"🌐 fixture を配信中: {base}（{directory}）")
+
+        for rows in rows_list:
+            bench_parse_date(suite, rows)
+        bench_static(suite, base, pages)
+        bench_generate_rss(suite, workdir)
+
+        if not browser:
+            for group in BROWSER_GROUPS:
+                suite.skip_group(group, "--no-browser")
+        elif any(suite.wants_group(group) for group in BROWSER_GROUPS):
+            try:
+                from playwright.sync_api import sync_playwright
+
+                pw = stack.enter_context(sync_playwright())
+                chromium = pw.chromium.launch(headless=True)
+                stack.callback(chromium.close)
+            except Exception as e:
+                reason = f"Chromium を起動できません: {str(e).splitlines()[0]}"
+                print(f"⚠ {reason}（ブラウザを使うケースはスキップ）")
+                for group in BROWSER_GROUPS:
+                    suite.skip_group(group, reason)
+            else:
+                page = chromium.new_page()
+                bench_browser(suite, page, base, pages, popups, locator_max_rows)
+
+    return {
+        "schema": SCHEMA_VERSION,
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "rows": rows_list,
+            "fixtures": names,
+            "popups": list(POPUPS),
+        },
+        "results": suite.results,
+        "skipped": suite.skipped,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS))
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--only", nargs="+", default=None, metavar="PATTERN",
+                        help="計測するケース（前方一致または glob。例: parse_date extract_items/*/bulk/*）")
+    parser.add_argument("--locator-max-rows", type=int, default=DEFAULT_LOCATOR_MAX_ROWS)
+    parser.add_argument("--fixtures-dir", default=None, help="fixture を書き出して残すディレクトリ")
+    parser.add_argument("--no-browser", action="store_true", help="ブラウザを使うケースを計測しない")
+    parser.add_argument("--output", default=None, help="結果 JSON の保存先")
+    parser.add_argument("--baseline", default=None, help="比較するベースライン JSON")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="リグレッションと判定する増加率（既定はグループごとの値）")
+    parser.add_argument("--save-baseline", default=None, metavar="PATH", help="今回の結果をベースラインとして保存")
+    args = parser.parse_args()
+
+    report = run_suite(
+        args.rows,
+        repeat=args.repeat,
+        only=args.only,
+        locator_max_rows=args.locator_max_rows,
+        fixtures_dir=args.fixtures_dir,
+        browser=not args.no_browser,
+    )
+
+    regressions = 0
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        report["baseline"] = {"path": args.baseline, "created_at": baseline.get("meta", {}).get("created_at")}
+        report["comparison"] = compare(report["results"], baseline, args.threshold)
+        regressions = _print_comparison(report["comparison"])
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            Path(path).write_text(text, encoding="utf-8")
+            print(f"💾 {path} に保存しました")
+
+    print(f"\n🏁 計測 {len(report['results'])} 件 / スキップ {len(report['skipped'])} 件"
+          + (f" / リグレッション {regressions} 件" if args.baseline else ""))
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク用の一覧ページ fixture（合成 HTML）とローカル HTTP サーバ
+
+- レイアウト: リスト / テーブル / タイトル列と日付列が別 / hidden 要素混在 / 和暦 / 英語日付
+- 行数を指定して決定的に生成し、ディレクトリへ書き出してから http.server で配信する
+  （同じ引数なら同じ HTML になるので、書き出したファイルをそのまま記録として使える）
+- 日付は実行日基準（一部の行は 3 日ルールで除外される古い日付）
+- 各 fixture は extract_items に渡す引数も持つ
+
+例:
+    with serve_fixtures(["list", "table"], [10, 100]) as (base, pages):
+        page.goto(base + pages[("list", 10)])
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import http.server
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+BASE_URL = "https://example.org/"
+
+_MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+
+
+def _date_for(i: int, today: datetime) -> datetime:
+    # 5 行に 1 行は 3 日ルールで除外される古い記事
+    return today - timedelta(days=10 if i % 5 == 4 else i % 3)
+
+
+def _ymd_kanji(d: datetime) -> str:
+    return f"{d.year}年{d.month}月{d.day}日"
+
+
+def _wareki(d: datetime) -> str:
+    return f"令和{d.year - 2018}年{d.month}月{d.day}日"
+
+
+def _english(d: datetime) -> str:
+    return f"{_MONTH_NAMES[d.month - 1]} {d.day}, {d.year}"
+
+
+def _page(body: str) -> str:
+    return (
+        "<!DOCTYPE html><html lang=\"ja\"><head><meta charset=\"utf-8\">"
+        f"<title>fixture</title></head><body>{body}</body></html>"
+    )
+
+
+def _list_html(rows: int, today: datetime) -> Tuple[str, List[str]]:
+    dates = [_ymd_kanji(_date_for(i, today)) for i in range(rows)]
+    lis = "".join(
+        f'<li><span class="date">{dates[i]}</span><a href="/news/{i}.html">お知らせ {i}</a></li>'
+        for i in range(rows)
+    )
+    return _page(f'<ul class="news">{lis}</ul>'), dates
+
+
+def _table_html(rows: int, today: datetime) -> Tuple[str, List[str]]:
+    dates = [_date_for(i, today).strftime("%Y.%m.%d") for i in range(rows)]
+    trs = "".join(
+        f'<tr><td class="date">{dates[i]}</td><td class="cat">学会</td>'
+        f'<td class="title"><a href="/info/{i}.html">学術集会のご案内 {i}</a></td></tr>'
+        for i in range(rows)
+    )
+    return _page(f'<table class="news"><tbody>{trs}</tbody></table>'), dates
+
+
+def _split_html(rows: int, today: datetime) -> Tuple[str, List[str]]:
+    # タイトル列と日付列が別ブロック（行ズレ耐性の経路）
+    dates = [_ymd_kanji(_date_for(i, today)) for i in range(rows)]
+    titles = "".join(f'<p><a href="/topics/{i}.html">トピックス {i}</a></p>' for i in range(rows))
+    date_ps = "".join(f"<p>{d}</p>" for d in dates)
+    return _page(f'<div class="titles">{titles}</div><div class="dates">{date_ps}</div>'), dates
+
+
+def _hidden_html(rows: int, today: datetime) -> Tuple[str, List[str]]:
+    # 先頭のタイトル要素は非表示で空（title 属性のみ）、7 行に 1 行は本文も空で title 属性へフォールバック。
+    # 日付は hidden（text_content で拾える必要がある）
+    dates = [_ymd_kanji(_date_for(i, today)) for i in range(rows)]
+    lis = "".join(
+        f'<li><a class="ttl" style="display:none" title="お知らせ {i}"></a>'
+        f'<a class="ttl" href="/news/{i}.html">{"" if i % 7 == 0 else f"お知らせ {i}"}</a>'
+        f'<span class="date" hidden>{dates[i]}</span></li>'
+        for i in range(rows)
+    )
+    return _page(f'<ul class="news">{lis}</ul>'), dates
+
+
+def _wareki_html(rows: int, today: datetime) -> Tuple[str, List[str]]:
+    dates = [_wareki(_date_for(i, today)) for i in range(rows)]
+    items = "".join(
+        f'<div class="row"><dt>{dates[i]}</dt><dd><a href="/news/{i}.html">会告 {i}</a></dd></div>'
+        for i in range(rows)
+    )
+    return _page(f'<dl class="news">{items}</dl>'), dates
+
+
+def _english_html(rows: int, today: datetime) -> Tuple[str, List[str]]:
+    dates = [_english(_date_for(i, today)) for i in range(rows)]
+    posts = "".join(
+        f'<article class="post"><time>{dates[i]}</time>'
+        f'<h3><a href="/en/news/{i}.html">Announcement {i}</a></h3></article>'
+        for i in range(rows)
+    )
+    return _page(f'<section class="posts">{posts}</section>'), dates
+
+
+def _extract_args(
+    SELECTOR_TITLE: str,
+    title_selector: Optional[str],
+    href_selector: Optional[str],
+    date_selector: Optional[str],
+    SELECTOR_DATE: Optional[str] = None,
+    date_regex: str = "",
+) -> Dict[str, Any]:
+    return {
+        "SELECTOR_DATE": SELECTOR_DATE if SELECTOR_DATE is not None else SELECTOR_TITLE,
+        "SELECTOR_TITLE": SELECTOR_TITLE,
+        "title_selector": title_selector,
+        "title_index": 0,
+        "href_selector": href_selector,
+        "href_index": 0,
+        "base_url": BASE_URL,
+        "date_selector": date_selector,
+        "date_index": 0,
+        "date_format": None,
+        "date_regex": date_regex,
+    }
+
+
+# name -> (HTML 生成関数, extract_items の引数)
+FIXTURES: Dict[str, Tuple[Callable[[int, datetime], Tuple[str, List[str]]], Dict[str, Any]]] = {
+    "list": (_list_html, _extract_args(
+        "ul.news li", "a", "a", "span.date", date_regex=r"(\d{4})年(\d{1,2})月(\d{1,2})日")),
+    "table": (_table_html, _extract_args(
+        "table.news tr", "td.title a", "td.title a", "td.date", date_regex=r"(\d{4})\.(\d{1,2})\.(\d{1,2})")),
+    "split": (_split_html, _extract_args(
+        "div.titles p", "a", "a", None, SELECTOR_DATE="div.dates p")),
+    "hidden": (_hidden_html, _extract_args("ul.news li", "a.ttl", "a.ttl", "span.date")),
+    "wareki": (_wareki_html, _extract_args("dl.news div.row", "dd a", "dd a", "dt")),
+    "english": (_english_html, _extract_args("section.posts article.post", "h3 a", "h3 a", "time")),
+}
+DEFAULT_ROWS = (10, 100, 2000)
+
+
+def build_fixture(name: str, rows: int, today: Optional[datetime] = None) -> Tuple[str, List[str]]:
+    """fixture の HTML と、各行の日付テキストを返す"""
+    builder, _ = FIXTURES[name]
+    today = (today or datetime.now(timezone.utc)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return builder(rows, today)
+
+
+def extract_args(name: str, max_items: int) -> Dict[str, Any]:
+    """fixture 用の extract_items 引数（page 以外）"""
+    return {**FIXTURES[name][1], "max_items": max_items}
+
+
+def fixture_path(name: str, rows: int) -> str:
+    return f"/{name}-{rows}.html"
+
+
+def write_fixtures(directory: str, names: Iterable[str], rows_list: Iterable[int]) -> Dict[Tuple[str, int], str]:
+    """fixture を directory に書き出し、(name, rows) -> URL パス の対応を返す"""
+    out = {}
+    rows_list = list(rows_list)
+    for name in names:
+        for rows in rows_list:
+            html, _ = build_fixture(name, rows)
+            path = fixture_path(name, rows)
+            Path(directory, path.lstrip("/")).write_text(html, encoding="utf-8")
+            out[(name, rows)] = path
+    return out
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    extensions_map = {**http.server.SimpleHTTPRequestHandler.extensions_map, ".html": "text/html; charset=utf-8"}
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+@contextlib.contextmanager
+def serve_directory(directory: str) -> Iterator[str]:
+    """directory を 127.0.0.1 の空きポートで配信し、ベース URL（末尾 / なし）を返す"""
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextlib.contextmanager
+def serve_fixtures(
+    names: Iterable[str],
+    rows_list: Iterable[int],
+    directory: Optional[str] = None,
+) -> Iterator[Tuple[str, Dict[Tuple[str, int], str]]]:
+    """
+    fixture を書き出してローカル HTTP サーバで配信する
+    directory を省略すると一時ディレクトリを使い、終了時に削除する
+    """
+    with contextlib.ExitStack() as stack:
+        if directory is None:
+            directory = stack.enter_context(tempfile.TemporaryDirectory(prefix="rss-bench-"))
+        else:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+        pages = write_fixtures(directory, names, rows_list)
+        base = stack.enter_context(serve_directory(directory))
+        yield base, pages
+
+
+# click_button_in_order 用の合成ポップアップ（name -> 一覧ページに追加する HTML）
+POPUP_LABEL = "同意する"
+POPUPS: Dict[str, str] = {
+    "button": f'<div class="cookie"><p>Cookie を使用します</p><button>{POPUP_LABEL}</button></div>',
+    "link": f'<div class="cookie"><a href="#" onclick="this.parentNode.remove();return false">{POPUP_LABEL}</a></div>',
+    "delayed_500ms": (
+        "<script>setTimeout(() => {"
+        "const d = document.createElement('div'); d.className = 'cookie';"
+        f"d.innerHTML = '<button>{POPUP_LABEL}</button>'; document.body.appendChild(d);"
+        "}, 500);</script>"
+    ),
+    "iframe": (
+        f'<iframe srcdoc="<button>{POPUP_LABEL}</button>" style="width:300px;height:80px"></iframe>'
+    ),
+    "absent": "",
+}
+
+
+def build_popup_page(name: str, rows: int = 50) -> str:
+    """一覧ページ（list fixture）に合成ポップアップを重ねた HTML"""
+    html, _ = build_fixture("list", rows)
+    return html.replace("</body>", POPUPS[name] + "</body>")
+
+
+def write_popup_pages(directory: str) -> Dict[str, str]:
+    out = {}
+    for name in POPUPS:
+        path = f"/popup-{name}.html"
+        Path(directory, path.lstrip("/")).write_text(build_popup_page(name), encoding="utf-8")
+        out[name] = path
+    return out
@@ -1,8 +1,31 @@
 # browser_utils.py
+import json
+import os
 import re
+import sys
+import tempfile
 import time
 from contextlib import contextmanager
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from cache_files import atomic_write_json, cache_path
+from instrumentation import log, timed
+from scheduler import Budget, resolve_budget
+
+# playwright は open_browser() で初めて import する（ページを受け取るだけの関数や
+# 定数だけを使う static_scraper / http_cache では読み込まない）
+_LAZY_ATTRS = {"sync_playwright": "sync_playwright", "PlaywrightTimeoutError": "TimeoutError"}
+
+
+def __getattr__(name):
+    # 互換のため browser_utils.sync_playwright / PlaywrightTimeoutError も参照できるようにする
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from playwright import sync_api
+
+    return getattr(sync_api, _LAZY_ATTRS[name])
+
 
 DEFAULT_VIEWPORT = {"width": 1366, "height": 900}
 DEFAULT_UA = (
@@ -11,12 +34,452 @@ DEFAULT_UA = (
     "Chrome/120.0.0.0 Safari/537.36"
 )
 
-def click_button_in_order(page, label: str, step_idx: int, timeout_ms: int = 12000, delay_before_click_ms: int = 0) -> bool:
+# --- リソースブロック -------------------------------------------------------
+# extract_items は DOM テキストと href しか使わないため、描画専用のリソースは既定で遮断する
+# （stylesheet は click_button_in_order の可視判定に影響するため既定では通す）
+DEFAULT_BLOCK_PROFILE = {
+    "resource_types": ["image", "media", "font"],
+    "host_patterns": [
+        "googletagmanager.com",
+        "google-analytics.com",
+        "doubleclick.net",
+        "googlesyndication.com",
+        "adservice.google.",
+        "facebook.net",
+        "platform.twitter.com",
+        "hotjar.com",
+        "clarity.ms",
+        "ads-twitter.com",
+    ],
+    # サイト側の埋め込み（YouTube・地図・SNS 等）の iframe を遮断
+    "block_third_party_frames": True,
+    # 上記に該当しても通すホスト（一覧の描画に必要な CDN 等をサイトごとに指定）
+    "allow_host_patterns": [],
+}
+
+# co.jp / ac.jp 等の 2 階層目（登録可能ドメインを 3 ラベルで判定する）
+_JP_SECOND_LEVEL = {"ac", "ad", "co", "ed", "go", "gr", "lg", "ne", "or"}
+
+
+def make_block_profile(**overrides) -> dict:
+    """
+    DEFAULT_BLOCK_PROFILE にサイト別の上書きを適用したプロファイルを返す
+    リストは置き換え。extra_host_patterns / extra_allow_host_patterns は既定に追加する
+    """
+    profile = {k: (list(v) if isinstance(v, list) else v) for k, v in DEFAULT_BLOCK_PROFILE.items()}
+    profile["host_patterns"] += overrides.pop("extra_host_patterns", [])
+    profile["allow_host_patterns"] += overrides.pop("extra_allow_host_patterns", [])
+    profile.update(overrides)
+    return profile
+
+
+def _site_of(host: str) -> str:
+    labels = host.lower().rstrip(".").split(".")
+    n = 3 if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in _JP_SECOND_LEVEL else 2
+    return ".".join(labels[-n:])
+
+
+class BlockStats:
+    """
+    1 ページ分のリソース遮断の集計
+    遮断した要求は応答が無くサイズが分からないため、遮断は件数（理由別）で、通した要求は件数と
+    content-length の合計（allowed_bytes）で数える。削減できた通信量は遮断の有無で allowed_bytes を比べて測る
+    """
+
+    def __init__(self):
+        self.first_party_site: Optional[str] = None
+        self.blocked = 0
+        self.blocked_by_reason: Dict[str, int] = {}
+        self.allowed = 0
+        self.allowed_bytes = 0
+
+    def add_blocked(self, reason: str) -> None:
+        self.blocked += 1
+        self.blocked_by_reason[reason] = self.blocked_by_reason.get(reason, 0) + 1
+
+    def as_dict(self) -> dict:
+        return {
+            "blocked": self.blocked,
+            "blocked_by_reason": dict(self.blocked_by_reason),
+            "allowed": self.allowed,
+            "allowed_bytes": self.allowed_bytes,
+        }
+
+    def report(self, label: str = "") -> None:
+        detail = ", ".join(f"{k}={v}" for k, v in sorted(self.blocked_by_reason.items()))
+        log(f"🚫 リソース遮断{f'[{label}]' if label else ''}: {self.blocked} 件 ({detail or '-'}) / "
+              f"通過 {self.allowed} 件 {self.allowed_bytes / 1024:.0f}KB")
+
+
+def _make_block_rules(profile: Optional[dict]):
+    """プロファイルから (遮断理由を返す関数, 集計) を作る。理由が None なら通す"""
+    profile = profile or DEFAULT_BLOCK_PROFILE
+    block_types = set(profile.get("resource_types") or [])
+    block_hosts = tuple(profile.get("host_patterns") or [])
+    allow_hosts = tuple(profile.get("allow_host_patterns") or [])
+    block_frames = profile.get("block_third_party_frames", False)
+    stats = BlockStats()
+
+    def _reason(req) -> Optional[str]:
+        host = urlsplit(req.url).hostname or ""
+
+        if req.is_navigation_request() and req.frame.parent_frame is None:
+            stats.first_party_site = _site_of(host) if host else None
+            return None
+        if any(p in host for p in allow_hosts):
+            return None
+        if req.resource_type in block_types:
+            return req.resource_type
+        if any(p in host for p in block_hosts):
+            return "tracker"
+        if (
+            block_frames
+            and req.resource_type == "document"
+            and req.frame.parent_frame is not None
+            and host
+            and _site_of(host) != stats.first_party_site
+        ):
+            return "third_party_frame"
+        return None
+
+    def _on_response(response):
+        stats.allowed += 1
+        try:
+            stats.allowed_bytes += int(response.headers.get("content-length") or 0)
+        except ValueError:
+            pass
+
+    return _reason, _on_response, stats
+
+
+def _safe_reason(reason_of, request) -> Optional[str]:
+    # Service Worker の要求は request.frame が例外になる。判定できない要求は通し、ルートを必ず解決する
+    try:
+        return reason_of(request)
+    except Exception:
+        return None
+
+
+def install_resource_blocking(page, profile: Optional[dict] = None) -> BlockStats:
+    """
+    page に遮断ルールを設定し、集計用の BlockStats を返す（page.goto より前に呼ぶ）
+    - profile["resource_types"] に含まれる種別（image / media / font 等）
+    - profile["host_patterns"] を含むホスト（広告・解析）
+    - block_third_party_frames=True なら他サイトの iframe 文書
+    allow_host_patterns に一致するホストは常に通す。トップレベルの遷移は遮断しない。
+    通す要求は fallback でコンテキストのルート（HAR の再生等）に回す。
+    """
+    reason_of, on_response, stats = _make_block_rules(profile)
+
+    def _handler(route):
+        reason = _safe_reason(reason_of, route.request)
+        if reason:
+            stats.add_blocked(reason)
+            route.abort("blockedbyclient")
+        else:
+            route.fallback()
+
+    page.route("**/*", _handler)
+    page.on("response", on_response)
+    return stats
+
+
+async def install_resource_blocking_async(page, profile: Optional[dict] = None) -> BlockStats:
+    """install_resource_blocking の async Playwright 版"""
+    reason_of, on_response, stats = _make_block_rules(profile)
+
+    async def _handler(route):
+        reason = _safe_reason(reason_of, route.request)
+        if reason:
+            stats.add_blocked(reason)
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    await page.route("**/*", _handler)
+    page.on("response", on_response)
+    return stats
+
+
+# --- HAR の記録 / 再生 --------------------------------------------------------
+# RSS_HAR_MODE=record で実行すると各コンテキストの通信を <RSS_HAR_DIR>/<name>-<n>.har に保存し、
+# RSS_HAR_MODE=replay ではその HAR からだけ応答してネットワークには出ない（HAR に無い要求は abort）。
+# open_browser() / BrowserPool を使うスクリプトは変更なしでどちらのモードでも動く。
+# name の既定は RSS_HAR_NAME、無ければ実行中のスクリプト名（RSS_example.py → RSS_example）
+ENV_HAR_MODE = "RSS_HAR_MODE"
+ENV_HAR_DIR = "RSS_HAR_DIR"
+ENV_HAR_NAME = "RSS_HAR_NAME"
+DEFAULT_HAR_DIR = os.path.join(".cache", "har")
+HAR_MODES = ("record", "replay")
+
+
+class HarArchive:
+    """
+    name（サイト / スクリプト）ごとの HAR ファイル群
+    - record: context_options() を new_context に渡すと、コンテキストの close 時に次の番号の HAR へ書き出す
+      （最初のコンテキストを作る前に、同じ name の古い HAR は削除する）
+    - replay: attach() で同じ name の全 HAR をコンテキストのルートに登録する
+    """
+
+    def __init__(self, mode: str, name: str, directory: str = DEFAULT_HAR_DIR):
+        if mode not in HAR_MODES:
+            raise ValueError(f"HAR のモードは {' / '.join(HAR_MODES)} のいずれかです: {mode!r}")
+        self.mode = mode
+        self.name = name
+        self.directory = directory
+        self.stats = {"recorded": 0, "served": 0, "missed": 0}
+        self._next = 0
+
+    @classmethod
+    def from_env(cls, name: Optional[str] = None) -> Optional["HarArchive"]:
+        """環境変数 RSS_HAR_MODE が record / replay ならその設定の HarArchive。未設定なら None"""
+        mode = os.environ.get(ENV_HAR_MODE, "").strip().lower()
+        if not mode:
+            return None
+        script = sys.argv[0] if sys.argv and sys.argv[0] not in ("", "-", "-c") else "browser"
+        name = name or os.environ.get(ENV_HAR_NAME) or os.path.splitext(os.path.basename(script))[0]
+        return cls(mode, name, os.environ.get(ENV_HAR_DIR) or DEFAULT_HAR_DIR)
+
+    def paths(self) -> List[str]:
+        """記録済みの HAR（番号順）"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        pattern = re.compile(re.escape(self.name) + r"-(\d+)\.har$")
+        numbered = sorted((int(m.group(1)), n) for n in names if (m := pattern.match(n)))
+        return [os.path.join(self.directory, n) for _, n in numbered]
+
+    def context_options(self) -> dict:
+        """new_context に追加で渡す引数（Service Worker 経由の通信は HAR に残らないため遮断する）"""
+        if self.mode != "record":
+            return {"service_workers": "block"}
+        if self._next == 0:
+            os.makedirs(self.directory, exist_ok=True)
+            for path in self.paths():
+                os.remove(path)
+        self._next += 1
+        self.stats["recorded"] += 1
+        return {
+            "service_workers": "block",
+            "record_har_path": os.path.join(self.directory, f"{self.name}-{self._next}.har"),
+            "record_har_content": "embed",
+        }
+
+    def _replay_paths(self) -> List[str]:
+        paths = self.paths()
+        if not paths:
+            raise FileNotFoundError(f"{self.name} の HAR がありません（先に {ENV_HAR_MODE}=record で実行してください）: {self.directory}")
+        return paths
+
+    def _on_miss(self, url: str) -> None:
+        self.stats["missed"] += 1
+        log(f"📼 HAR に無い要求を遮断: {url}", row=True)
+
+    def attach(self, context) -> None:
+        """replay のとき context の全要求を HAR から応答させる（record では何もしない）"""
+        if self.mode != "replay":
+            return
+
+        def _miss(route):
+            self._on_miss(route.request.url)
+            route.abort("internetdisconnected")
+
+        paths = self._replay_paths()
+        # ルートは登録と逆順に評価される。HAR に無い要求は fallback で最初に登録した _miss に落ちる
+        context.route("**/*", _miss)
+        for path in paths:
+            context.route_from_har(path, not_found="fallback")
+        self.stats["served"] += 1
+
+    async def attach_async(self, context) -> None:
+        """attach の async Playwright 版"""
+        if self.mode != "replay":
+            return
+
+        async def _miss(route):
+            self._on_miss(route.request.url)
+            await route.abort("internetdisconnected")
+
+        paths = self._replay_paths()
+        await context.route("**/*", _miss)
+        for path in paths:
+            await context.route_from_har(path, not_found="fallback")
+        self.stats["served"] += 1
+
+    def report(self) -> None:
+        if self.mode == "record":
+            log(f"📼 HAR を記録: {self.name}（{self.stats['recorded']} コンテキスト → {self.directory}）")
+        else:
+            log(f"📼 HAR から再生: {self.name}（{self.stats['served']} コンテキスト / HAR に無い要求 {self.stats['missed']} 件）")
+
+
+# コンテキストを作り直すまでに払い出すページ数 / JS ヒープの上限(MB)
+DEFAULT_MAX_USES = 20
+DEFAULT_MEMORY_LIMIT_MB = 512
+
+_JS_HEAP_USED = "() => (performance.memory ? performance.memory.usedJSHeapSize : 0)"
+
+
+class BrowserPool:
+    """
+    1 つの Chromium を共有し、既定の UA / viewport を設定したコンテキスト・ページを払い出す。
+    - page(): 共有コンテキスト上の新しいページ（使用後に自動で close）
+    - context(): 使い捨ての専用コンテキスト（Cookie 等を分離したいサイト向け）
+    - 共有コンテキストは max_uses 回払い出すか、JS ヒープが memory_limit_mb を超えたら作り直す
+    - har（HarArchive）を渡すと、すべてのコンテキストで通信を HAR に記録 / HAR から再生する
+    """
+
+    def __init__(
+        self,
+        browser,
+        max_uses: int = DEFAULT_MAX_USES,
+        memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+        har: Optional[HarArchive] = None,
+        **context_options,
+    ):
+        self.browser = browser
+        self.har = har
+        self.max_uses = max_uses
+        self.memory_limit_mb = memory_limit_mb
+        self.context_options = {"user_agent": DEFAULT_UA, "viewport": DEFAULT_VIEWPORT, **context_options}
+        self.stats = {"contexts": 0, "pages": 0, "recycled": 0}
+        self._context = None
+        self._uses = 0
+        self._recycle_requested = False
+
+    def new_context(self, **overrides):
+        """既定設定（UA / viewport）を適用した新しいコンテキストを作る。呼び出し側で close すること"""
+        self.stats["contexts"] += 1
+        if self.har is None:
+            return self.browser.new_context(**{**self.context_options, **overrides})
+        ctx = self.browser.new_context(**{**self.context_options, **self.har.context_options(), **overrides})
+        self.har.attach(ctx)
+        return ctx
+
+    def _shared_context(self):
+        if self._context is not None and (self._uses >= self.max_uses or self._recycle_requested):
+            self.stats["recycled"] += 1
+            self._close_shared()
+        if self._context is None:
+            self._context = self.new_context()
+            self._uses = 0
+            self._recycle_requested = False
+        self._uses += 1
+        return self._context
+
+    def _close_shared(self):
+        if self._context is not None:
+            try:
+                self._context.close()
+            except Exception as e:
+                log(f"⚠ コンテキストのクローズに失敗: {e}")
+        self._context = None
+
+    def _check_memory(self, page) -> None:
+        if not self.memory_limit_mb:
+            return
+        try:
+            used = page.evaluate(_JS_HEAP_USED) or 0
+        except Exception:
+            return
+        if used > self.memory_limit_mb * 1024 * 1024:
+            log(f"♻ JSヒープ {used // (1024 * 1024)}MB が上限 {self.memory_limit_mb}MB を超えたためコンテキストを作り直します")
+            self._recycle_requested = True
+
+    @contextmanager
+    def page(self, block: Optional[dict] = None):
+        """
+        共有コンテキスト上の新しいページを払い出し、抜けるときに close する
+        block にプロファイル（make_block_profile()）を渡すとリソース遮断を設定し、終了時に集計を表示する
+        """
+        page = self._shared_context().new_page()
+        self.stats["pages"] += 1
+        block_stats = install_resource_blocking(page, block) if block is not None else None
+        try:
+            yield page
+        finally:
+            if block_stats is not None:
+                block_stats.report(page.url)
+            self._check_memory(page)
+            try:
+                page.close()
+            except Exception:
+                pass
+
+    @contextmanager
+    def context(self, **overrides):
+        """専用コンテキストを払い出し、抜けるときに close する"""
+        ctx = self.new_context(**overrides)
+        try:
+            yield ctx
+        finally:
+            try:
+                ctx.close()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        self._close_shared()
+
+
+@contextmanager
+def open_browser(
+    headless: bool = True,
+    max_uses: int = DEFAULT_MAX_USES,
+    memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+    launch_args: Optional[List[str]] = None,
+    har: Optional[HarArchive] = None,
+    **context_options,
+):
+    """
+    Chromium を 1 回だけ起動して BrowserPool を返す。with を抜けるとページ・コンテキスト・ブラウザを全て閉じる。
+    har を省略すると環境変数 RSS_HAR_MODE / RSS_HAR_DIR に従って HAR を記録 / 再生する（HarArchive.from_env）
+
+    例:
+        with open_browser() as pool:
+            for site in sites:
+                with pool.page() as page:
+                    page.goto(site["url"])
+                    items = extract_items(page, ...)
+    """
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless, args=launch_args or [])
+        har = har or HarArchive.from_env()
+        pool = BrowserPool(browser, max_uses=max_uses, memory_limit_mb=memory_limit_mb, har=har, **context_options)
+        try:
+            yield pool
+        finally:
+            # record では close 時に HAR が書き出される
+            pool.close()
+            browser.close()
+            if har is not None:
+                har.report()
+            log(f"🧹 ブラウザを終了しました（コンテキスト {pool.stats['contexts']} / ページ {pool.stats['pages']} / 再作成 {pool.stats['recycled']}）")
+
+
+@timed("popup.dismiss")
+def click_button_in_order(
+    page,
+    label: str,
+    step_idx: int,
+    timeout_ms: int = 12000,
+    delay_before_click_ms: int = 0,
+    budget: Optional[Budget] = None,
+) -> bool:
     """
     指定ラベルの要素（ボタン/リンク/その他）を探索してクリック。成功で True。
     - ボタン(role=button) → リンク(role=link) → 汎用テキスト → CSS:has-text の順に探索
     - 可視要素を優先
+    - 待機・クリックのタイムアウトは budget（省略時は環境変数の締め切り）の残り時間で頭打ち
     """
+    budget = resolve_budget(budget) or Budget()
+    if budget.expired():
+        log(f"⏱ 時間予算を使い切ったため、ポップアップ[{step_idx}] '{label}' の探索を省略")
+        return False
+    timeout_ms = budget.timeout_ms(timeout_ms)
     deadline = time.time() + (timeout_ms / 1000.0)
     appeared = None
     pattern = re.compile(re.escape(label), re.I)
@@ -61,21 +524,340 @@ def click_button_in_order(page, label: str, step_idx: int, timeout_ms: int = 120
         page.wait_for_timeout(250)
 
     if not appeared:
-        print(f"ℹ ポップアップ[{step_idx}] '{label}' は {timeout_ms}ms 以内に表示されませんでした")
+        log(f"ℹ ポップアップ[{step_idx}] '{label}' は {timeout_ms}ms 以内に表示されませんでした")
         return False
 
     try:
         if delay_before_click_ms > 0:
             page.wait_for_timeout(delay_before_click_ms)
 
-        appeared.click(timeout=4000)
-        print(f"✅ ポップアップ[{step_idx}] クリック: {label}")
+        appeared.click(timeout=budget.timeout_ms(4000))
+        log(f"✅ ポップアップ[{step_idx}] クリック: {label}")
+        return True
+    except Exception:
+        try:
+            appeared.click(force=True, timeout=budget.timeout_ms(3000))
+            log(f"✅ ポップアップ[{step_idx}] 強制クリック: {label}")
+            return True
+        except Exception as e:
+            log(f"⚠ ポップアップ[{step_idx}] クリック失敗: {label} ({e})")
+            return False
+
+
+# --- ポップアップの一括クリック ------------------------------------------------
+POPUP_STRATEGIES = ("button", "link", "text", "has_text")
+DEFAULT_POPUP_HINTS_PATH = cache_path("popup_strategies.json")
+# メインフレームの 1 回の待機の上限 = settle_ms + この値（ms）。待機の合間に後から読み込まれた iframe を確認し直す
+POPUP_FRAME_RECHECK_MS = 1000
+
+# ページ内で labels を順に探し、最初に見つかった可視要素に目印を付けて {label, strategy} を返す。
+# 見つからなければ MutationObserver で DOM の変化を待ち、settle ms 変化が無い（かつ読み込み完了）なら null、
+# timeout ms 経過なら {pending: true}（まだ変化が続いている）を返す。strategies はラベルごとの探索順（前回成功した方式が先頭）。
+_POPUP_FIND_JS = """
+(args) => new Promise((resolve) => {
+  const visible = (el) => {
+    const r = el.getBoundingClientRect();
+    if (r.width <= 0 || r.height <= 0) return false;
+    const st = getComputedStyle(el);
+    return st.visibility !== "hidden" && st.display !== "none";
+  };
+  const nameOf = (el) =>
+    el.getAttribute("aria-label") || el.innerText || el.value || el.getAttribute("title") || "";
+  const textHolders = (needle) => {
+    const out = [];
+    const walker = document.createTreeWalker(document.body || document.documentElement, NodeFilter.SHOW_TEXT);
+    for (let n = walker.nextNode(); n; n = walker.nextNode()) {
+      if (n.nodeValue.toLowerCase().includes(needle) && n.parentElement) out.push(n.parentElement);
+    }
+    return out;
+  };
+  const finders = {
+    button: (needle) => Array.from(document.querySelectorAll(
+        'button, [role="button"], input[type="button"], input[type="submit"]'))
+      .filter((el) => nameOf(el).toLowerCase().includes(needle)),
+    link: (needle) => Array.from(document.querySelectorAll('a[href], [role="link"]'))
+      .filter((el) => nameOf(el).toLowerCase().includes(needle)),
+    text: (needle) => textHolders(needle),
+    has_text: (needle) => textHolders(needle)
+      .map((el) => el.closest('button, a, label, [role], [onclick], [tabindex]') || el),
+  };
+
+  const find = () => {
+    for (const label of args.labels) {
+      const needle = label.toLowerCase();
+      for (const strategy of args.strategies[label]) {
+        const el = finders[strategy](needle).find(visible);
+        if (el) {
+          el.setAttribute("data-popup-dismiss", args.token);
+          return { label, strategy };
+        }
+      }
+    }
+    return null;
+  };
+
+  const first = find();
+  if (first || args.timeout <= 0) return resolve(first);
+
+  let settleTimer = null;
+  const finish = (value) => {
+    observer.disconnect();
+    clearInterval(poll);
+    clearTimeout(deadline);
+    clearTimeout(settleTimer);
+    resolve(value);
+  };
+  const armSettle = () => {
+    clearTimeout(settleTimer);
+    settleTimer = setTimeout(() => {
+      if (document.readyState === "complete") finish(null);
+      else armSettle();
+    }, args.settle);
+  };
+  const check = () => { const hit = find(); if (hit) finish(hit); };
+
+  const observer = new MutationObserver(() => { check(); armSettle(); });
+  observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+  // CSS アニメーション等で属性変化なしに表示されるケースの保険（ページ内のみ・通信なし）
+  const poll = setInterval(check, 200);
+  const deadline = setTimeout(() => finish({ pending: true }), args.timeout);
+  armSettle();
+})
+"""
+
+# hints_path ごとに読み込んだ探索方式（ホスト|ラベル -> 方式）
+_popup_hints: Dict[str, Dict[str, str]] = {}
+
+
+def _load_popup_hints(path: str) -> Dict[str, str]:
+    if path not in _popup_hints:
+        try:
+            with open(path, encoding="utf-8") as f:
+                _popup_hints[path] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            _popup_hints[path] = {}
+    return _popup_hints[path]
+
+
+def _save_popup_hints(path: str) -> None:
+    """一時ファイルに書いてから置き換える（書き込み途中の中断で既存のファイルを壊さない）"""
+    if path not in _popup_hints:
+        return
+    tmp = None
+    try:
+        dirpath = os.path.dirname(path) or "."
+        os.makedirs(dirpath, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=dirpath, prefix=".tmp-", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(_popup_hints[path], f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+    except OSError as e:
+        log(f"⚠ ポップアップ探索方式の保存に失敗: {e}")
+    finally:
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def _click_marked(page, frame, token: str, label: str, delay_before_click_ms: int, budget: Budget) -> bool:
+    target = frame.locator(f'[data-popup-dismiss="{token}"]').first
+    if delay_before_click_ms > 0:
+        page.wait_for_timeout(delay_before_click_ms)
+    try:
+        target.click(timeout=budget.timeout_ms(4000))
+        log(f"✅ ポップアップ クリック: {label}")
         return True
     except Exception:
         try:
-            appeared.click(force=True, timeout=3000)
-            print(f"✅ ポップアップ[{step_idx}] 強制クリック: {label}")
+            target.click(force=True, timeout=budget.timeout_ms(3000))
+            log(f"✅ ポップアップ 強制クリック: {label}")
             return True
         except Exception as e:
-            print(f"⚠ ポップアップ[{step_idx}] クリック失敗: {label} ({e})")
+            log(f"⚠ ポップアップ クリック失敗: {label} ({e})")
             return False
+
+
+@timed("popup.dismiss")
+def dismiss_popups(
+    page,
+    labels: List[str],
+    timeout_ms: int = 12000,
+    settle_ms: int = 2000,
+    delay_before_click_ms: int = 0,
+    hints_path: Optional[str] = DEFAULT_POPUP_HINTS_PATH,
+    budget: Optional[Budget] = None,
+    failed: Optional[List[str]] = None,
+) -> Dict[str, bool]:
+    """
+    labels のポップアップをまとめて待ち、表示されたものから（labels の順で）クリックする。
+
+    click_button_in_order をラベルごとに呼ぶ代わりに使う。ページ内の MutationObserver で
+    全ラベルを同時に待つため、表示されないラベルで timeout_ms を使い切ることがなく、
+    DOM が settle_ms 変化しなくなった時点で終了する。メインフレームの待機は settle_ms + POPUP_FRAME_RECHECK_MS
+    ごとに区切り、その都度 iframe 内を確認し直す（後から読み込まれた同意ダイアログの iframe も締め切り内に見つける）。
+    一致した探索方式（button / link / text / has_text）はホスト+ラベル単位で hints_path に保存し、
+    次回以降はその方式から試す。
+    timeout_ms は budget（省略時は環境変数の締め切り）の残り時間で頭打ちにする。
+    failed にリストを渡すと、表示されたがクリックできなかったラベルを追加する（表示されなかったラベルと区別する）。
+
+    Returns:
+        {label: クリックできたら True}
+    """
+    results = {label: False for label in labels}
+    remaining = list(labels)
+    hints = _load_popup_hints(hints_path) if hints_path else {}
+    host = urlsplit(page.url).hostname or ""
+    budget = resolve_budget(budget) or Budget()
+    deadline = min(time.time() + timeout_ms / 1000.0, budget.deadline or float("inf"))
+    token = ""
+
+    def _args(wait_ms: int) -> dict:
+        strategies = {}
+        for label in remaining:
+            hint = hints.get(f"{host}|{label}")
+            strategies[label] = ([hint] if hint in POPUP_STRATEGIES else []) + [
+                s for s in POPUP_STRATEGIES if s != hint
+            ]
+        return {"labels": remaining, "strategies": strategies, "token": token,
+                "timeout": wait_ms, "settle": settle_ms}
+
+    def _find_in_frames():
+        for fr in page.frames[1:]:
+            try:
+                hit = fr.evaluate(_POPUP_FIND_JS, _args(0))
+            except Exception:
+                hit = None
+            if hit:
+                return hit, fr
+        return None, None
+
+    while remaining:
+        left_ms = int((deadline - time.time()) * 1000)
+        if left_ms <= 0:
+            break
+        # 目印はクリックごとに変える（閉じた後も DOM に残る前回の要素を掴まないように）
+        token = f"d{int(time.time() * 1000)}-{len(remaining)}"
+
+        found, frame = _find_in_frames()
+        if not found:
+            try:
+                found = page.main_frame.evaluate(
+                    _POPUP_FIND_JS, _args(min(left_ms, settle_ms + POPUP_FRAME_RECHECK_MS))
+                )
+            except Exception as e:
+                log(f"⚠ ポップアップ探索に失敗: {e}")
+                break
+            frame = page.main_frame
+            if found and found.get("pending"):
+                # DOM の変化が続いている。iframe を確認し直してから待機を続ける
+                continue
+        if not found:
+            # メインフレームが落ち着いた後に読み込みを終えた iframe を最後にもう一度確認
+            found, frame = _find_in_frames()
+        if not found:
+            break
+
+        label = found["label"]
+        remaining.remove(label)
+        results[label] = _click_marked(page, frame, token, label, delay_before_click_ms, budget)
+        if not results[label] and failed is not None:
+            failed.append(label)
+        if results[label] and hints_path and hints.get(f"{host}|{label}") != found["strategy"]:
+            hints[f"{host}|{label}"] = found["strategy"]
+            _save_popup_hints(hints_path)
+
+    for label in remaining:
+        log(f"ℹ ポップアップ '{label}' は表示されませんでした")
+    return results
+
+
+# --- storage_state の再利用 ----------------------------------------------------
+DEFAULT_STORAGE_STATE_DIR = os.path.join(".cache", "storage_state")
+DEFAULT_STORAGE_STATE_TTL_HOURS = 24 * 7
+
+
+class StorageStateStore:
+    """
+    サイトごとの Playwright storage_state（Cookie / localStorage）をファイルに保存する。
+    ttl_hours を過ぎた状態は読み込まずに削除する。
+    """
+
+    def __init__(self, directory: str = DEFAULT_STORAGE_STATE_DIR, ttl_hours: float = DEFAULT_STORAGE_STATE_TTL_HOURS):
+        self.directory = directory
+        self.ttl_hours = ttl_hours
+
+    def path_for(self, site: str) -> str:
+        safe = re.sub(r"[^0-9A-Za-z_.-]+", "_", site).strip("_") or "site"
+        return os.path.join(self.directory, f"{safe}.json")
+
+    def load(self, site: str) -> Optional[str]:
+        """有効な状態ファイルのパス（無い・期限切れなら None）"""
+        path = self.path_for(site)
+        try:
+            age_hours = (time.time() - os.path.getmtime(path)) / 3600
+        except OSError:
+            return None
+        if age_hours > self.ttl_hours:
+            self.invalidate(site)
+            return None
+        return path
+
+    def save(self, context, site: str) -> None:
+        # 一時ファイル経由で置き換える（失敗時は一時ファイルも残さない）
+        try:
+            atomic_write_json(self.path_for(site), context.storage_state())
+        except Exception as e:
+            log(f"⚠ storage_state の保存に失敗: {site} ({e})")
+
+    def invalidate(self, site: str) -> None:
+        try:
+            os.remove(self.path_for(site))
+        except OSError:
+            pass
+
+
+@contextmanager
+def consent_page(
+    pool: BrowserPool,
+    site: str,
+    url: str,
+    labels: List[str],
+    store: Optional[StorageStateStore] = None,
+    verify_ms: int = 3000,
+    **dismiss_kwargs,
+):
+    """
+    前回ポップアップを閉じた後の storage_state を読み込んだ専用コンテキストで url を開き、page を返す。
+
+    - 保存済みの状態がある場合はポップアップが出ないことを短時間（verify_ms）だけ確認する
+    - 状態が無い・期限切れ、または状態があってもポップアップが出た場合は dismiss_popups で閉じ、
+      閉じられたら状態を保存し直す（効かなくなった状態はこの時点で置き換わる）
+    - ポップアップが出たのにクリックできなかった場合は保存済みの状態を削除する（次回は状態なしでやり直す）
+    - 読み込みのタイムアウトは dismiss_kwargs の budget（省略時は環境変数の締め切り）の残り時間で頭打ちにする
+    """
+    store = store or StorageStateStore()
+    state = store.load(site)
+    overrides = {"storage_state": state} if state else {}
+    budget = resolve_budget(dismiss_kwargs.get("budget")) or Budget()
+
+    with pool.context(**overrides) as ctx:
+        page = ctx.new_page()
+        page.goto(url, wait_until="domcontentloaded", timeout=budget.timeout_ms(30000))
+
+        failed: List[str] = []
+        if state:
+            kwargs = {**dismiss_kwargs, "timeout_ms": verify_ms, "settle_ms": min(verify_ms, 1000)}
+            clicked = dismiss_popups(page, labels, failed=failed, **kwargs)
+            if any(clicked.values()):
+                log(f"♻ 保存済みの storage_state が効かなかったため更新します: {site}")
+        else:
+            clicked = dismiss_popups(page, labels, failed=failed, **dismiss_kwargs)
+
+        if failed:
+            log(f"⚠ ポップアップを閉じられなかったため storage_state を保存しません: {site}（{', '.join(failed)}）")
+            if state:
+                store.invalidate(site)
+        elif any(clicked.values()):
+            store.save(ctx, site)
+        elif state:
+            log(f"🍪 storage_state を再利用（ポップアップなし）: {site}")
+        yield page
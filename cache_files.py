@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+.cache 配下の JSON ファイル（http_cache / list_fingerprint / detail_fetcher / scheduler の履歴など）の共通処理
+
+- atomic_write_json(path, data): 一時ファイルに書いてから os.replace で置き換える
+  （書き込み途中でプロセスが止められても既存のファイルを壊さない。失敗時は一時ファイルを消す）
+- cache_path(name): 各キャッシュの既定の保存先。ファイル全体を読み書きする SHARD_CACHE_FILES は、
+  環境変数 RSS_SHARD_CACHE_DIR があればそのディレクトリを使う。sharding.run_shard がシャードごとに
+  .cache の内容を写したディレクトリを設定するため、同時に動くシャードが互いの更新を上書きしない
+- merge_json_caches(cache_dir, shard_dirs): シャードのキャッシュのうち、元の内容から変わったキーだけを
+  cache_dir のファイルへ書き戻す（sharding.merge_shards が使う）
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CACHE_DIR = ".cache"
+ENV_SHARD_CACHE_DIR = "RSS_SHARD_CACHE_DIR"
+# キー（URL / ホスト）ごとのエントリを持つ dict を丸ごと読み書きするキャッシュ
+SHARD_CACHE_FILES = (
+    "http_validators.json",
+    "list_fingerprints.json",
+    "article_details.json",
+    "popup_strategies.json",
+)
+
+
+def cache_path(name: str) -> str:
+    shard_dir = os.environ.get(ENV_SHARD_CACHE_DIR)
+    if shard_dir and name in SHARD_CACHE_FILES:
+        return os.path.join(shard_dir, name)
+    return os.path.join(DEFAULT_CACHE_DIR, name)
+
+
+def read_json(path: str) -> Optional[Any]:
+    """JSON ファイルの内容（無い・壊れていれば None）"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = None) -> None:
+    # tempfile は random 等を読み込むため、書き出すときまで import しない
+    import tempfile
+
+    dirpath = os.path.dirname(path) or "."
+    os.makedirs(dirpath, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dirpath, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def seed_shard_caches(shard_cache_dir: str, cache_dir: str = DEFAULT_CACHE_DIR) -> None:
+    """cache_dir の SHARD_CACHE_FILES をシャード用のディレクトリへ写す（シャードは前回の内容から始める）"""
+    import shutil
+
+    os.makedirs(shard_cache_dir, exist_ok=True)
+    for name in SHARD_CACHE_FILES:
+        src = os.path.join(cache_dir, name)
+        if os.path.exists(src):
+            shutil.copyfile(src, os.path.join(shard_cache_dir, name))
+
+
+def merge_json_caches(cache_dir: str, shard_dirs: List[str]) -> Dict[str, int]:
+    """
+    各シャードのキャッシュ（seed_shard_caches で写した後に更新されたもの）を cache_dir に統合し、
+    ファイルごとの更新キー数を返す。元の内容と同じキーは書き戻さないため、別のシャードの更新を古い値で
+    上書きしない。シャードで削除（evict）されたキーは、他のシャードが更新していなければ削除する
+    """
+    updated: Dict[str, int] = {}
+    for name in SHARD_CACHE_FILES:
+        target = os.path.join(cache_dir, name)
+        original = read_json(target) or {}
+        merged = dict(original)
+        changed = 0
+        for shard_dir in shard_dirs:
+            shard = read_json(os.path.join(shard_dir, name))
+            if not isinstance(shard, dict):
+                continue
+            for key, value in shard.items():
+                if original.get(key) != value:
+                    merged[key] = value
+                    changed += 1
+            for key in original:
+                if key not in shard and key in merged and merged[key] == original[key]:
+                    del merged[key]
+                    changed += 1
+        if changed:
+            atomic_write_json(target, merged)
+            updated[name] = changed
+    return updated
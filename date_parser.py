@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+ニュース一覧の日付テキストを datetime(UTC) に変換する共通パーサ
+
+- 全角数字を半角に、連続空白を 1 つに正規化してからパース
+- ルールは事前コンパイル済みで、上から順に最初にマッチしたものを採用
+    1. 呼び出し側の date_regex（マッチした場合はその結果で確定）
+    2. 和暦（令和 / 平成、元年対応）
+    3. Y年M月D日
+    4. DMY（22 November 2023 / 22 Nov 2023）
+    5. MDY（Aug 6, 2025 / August 6, 2025）
+    6. M月 YYYY（day=1 補完）
+    7. 数値 Y-M-D（/ . - 区切り）
+- 一覧ページは同じ日付が並ぶため、正規化後のテキストをキーに LRU キャッシュ
+- parse_dates() で複数テキストを一括パース
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+
+CACHE_SIZE = 4096
+
+_FULLWIDTH_DIGITS = str.maketrans("０１２３４５６７８９", "0123456789")
+_WHITESPACE = re.compile(r"\s+")
+_NON_DIGIT = re.compile(r"\D")
+_ALPHA_WORD = re.compile(r"^[A-Za-z]{3,}$")
+
+# strptime の %B / %b が受け付ける英語月名（大文字小文字は無視）
+_MONTHS: Dict[str, int] = {}
+for _i, _name in enumerate(
+    ["january", "february", "march", "april", "may", "june",
+     "july", "august", "september", "october", "november", "december"],
+    start=1,
+):
+    _MONTHS[_name] = _i
+    _MONTHS[_name[:3]] = _i
+
+# 和暦の元年の前年（令和1年 = 2019年 → 2018 + N）
+_ERA_OFFSETS = {"令和": 2018, "平成": 1988}
+
+
+def normalize_date_text(text: Optional[str]) -> str:
+    """全角数字 → 半角、連続空白 → 1 つ、前後の空白を除去"""
+    return _WHITESPACE.sub(" ", (text or "").translate(_FULLWIDTH_DIGITS)).strip()
+
+
+def _num(s: str) -> int:
+    return int(_NON_DIGIT.sub("", s or ""))
+
+
+def _month(name: str) -> int:
+    return _MONTHS[name.lower()]
+
+
+def _utc(year: int, month: int, day: int) -> datetime:
+    return datetime(year, month, day, tzinfo=timezone.utc)
+
+
+def _from_wareki(m) -> datetime:
+    era, nen, mo, d = m.groups()
+    nen_i = 1 if nen == "元" else _num(nen)
+    return _utc(_ERA_OFFSETS[era] + nen_i, _num(mo), _num(d))
+
+
+def _from_ymd(m) -> datetime:
+    y, mo, d = m.groups()
+    return _utc(_num(y), _num(mo), _num(d))
+
+
+def _from_dmy(m) -> datetime:
+    d, mon, y = m.groups()
+    return _utc(_num(y), _month(mon), _num(d))
+
+
+def _from_mdy(m) -> datetime:
+    mon, d, y = m.groups()
+    return _utc(_num(y), _month(mon), _num(d))
+
+
+def _from_month_year(m) -> datetime:
+    mo, y = m.groups()
+    year = _num(y)
+    if year < 100:
+        year += 2000
+    return _utc(year, _num(mo), 1)
+
+
+# (名前, 事前コンパイル済みパターン, match → datetime)
+Rule = Tuple[str, Pattern[str], Callable[..., datetime]]
+
+RULES: Tuple[Rule, ...] = (
+    ("wareki", re.compile(r"(令和|平成)\s*(\d{1,2}|元)年\s*(\d{1,2})月\s*(\d{1,2})日"), _from_wareki),
+    ("ymd_kanji", re.compile(r"(\d{4})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日"), _from_ymd),
+    ("dmy", re.compile(r"(\d{1,2})\s+([A-Za-z]{3,})\s+(\d{4})"), _from_dmy),
+    ("mdy", re.compile(r"([A-Za-z]{3,})\s+(\d{1,2}),\s+(\d{4})"), _from_mdy),
+    ("month_year", re.compile(r"(\d{1,2})月\s+(\d{4})"), _from_month_year),
+    ("ymd_numeric", re.compile(r"(\d{4})[./-](\d{1,2})[./-](\d{1,2})"), _from_ymd),
+)
+RULES_BY_NAME: Dict[str, Rule] = {rule[0]: rule for rule in RULES}
+
+DEFAULT_RULES: Tuple[str, ...] = tuple(rule[0] for rule in RULES)
+WAREKI_RULES: Tuple[str, ...] = ("wareki",)
+
+
+@lru_cache(maxsize=256)
+def _compile(date_regex: str) -> Pattern[str]:
+    return re.compile(date_regex)
+
+
+def _from_caller_groups(groups: Tuple[Optional[str], ...], text: str) -> Optional[datetime]:
+    """呼び出し側 date_regex のグループを解釈する（3 グループ: 日付 / 2 グループ: 年月）"""
+    effective = [g for g in groups if g is not None]
+
+    if len(effective) == 3:
+        a, b, c = effective
+        if _ALPHA_WORD.match(b):
+            # DMY（例: 22 November 2023）
+            return _utc(_num(c), _month(b), _num(a))
+        if _ALPHA_WORD.match(a) and "," in text:
+            # MDY（例: Aug 6, 2025）
+            return _utc(_num(c), _month(a), _num(b))
+        year, month, day = _num(a), _num(b), _num(c)
+        if year < 100:
+            year += 2000
+        return _utc(year, month, day)
+
+    if len(effective) == 2:
+        # 年月だけのケース（順不同対応）
+        xn, yn = _num(effective[0]), _num(effective[1])
+        if len(str(xn)) == 4:
+            year, mo = xn, yn
+        elif len(str(yn)) == 4:
+            year, mo = yn, xn
+        else:
+            return None
+        return _utc(year, mo, 1)
+
+    return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_normalized(text: str, date_regex: Optional[str], rules: Tuple[str, ...]) -> Optional[datetime]:
+    if not text:
+        return None
+    try:
+        if date_regex:
+            m = _compile(date_regex).search(text)
+            if m:
+                return _from_caller_groups(m.groups(), text)
+
+        for name in rules:
+            _, pattern, build = RULES_BY_NAME[name]
+            m = pattern.search(text)
+            if m:
+                return build(m)
+    except (ValueError, KeyError):
+        # 存在しない日付（2月30日等）や未知の月名
+        return None
+    return None
+
+
+def parse_date(
+    text: Optional[str],
+    date_regex: Optional[str] = None,
+    rules: Tuple[str, ...] = DEFAULT_RULES,
+) -> Optional[datetime]:
+    """
+    日付テキストを datetime(UTC) に変換する。解釈できなければ None。
+
+    date_regex がマッチした場合はその結果で確定し、組み込みルールにはフォールバックしない。
+    rules で使う組み込みルールとその順序を指定できる（例: WAREKI_RULES）。
+    """
+    return _parse_normalized(normalize_date_text(text), date_regex or None, rules)
+
+
+def parse_dates(
+    texts: Iterable[Optional[str]],
+    date_regex: Optional[str] = None,
+    rules: Tuple[str, ...] = DEFAULT_RULES,
+) -> List[Optional[datetime]]:
+    """複数の日付テキストをまとめてパースする（同一テキストは 1 回だけ解釈）"""
+    seen: Dict[str, Optional[datetime]] = {}
+    out: List[Optional[datetime]] = []
+    for text in texts:
+        norm = normalize_date_text(text)
+        if norm not in seen:
+            seen[norm] = _parse_normalized(norm, date_regex or None, rules)
+        out.append(seen[norm])
+    return out
+
+
+def cache_info():
+    return _parse_normalized.cache_info()
+
+
+def clear_cache() -> None:
+    _parse_normalized.cache_clear()
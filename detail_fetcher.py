@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+抽出済み items の link（記事ページ）を並行に取得し、要約（description）と日付を補完するユーティリティ
+
+- 記事ページは ThreadPoolExecutor で並行取得。取得は fetch_scheduler（ホストごとの Session プール・開始間隔・
+  Retry-After）経由で、同じホストへの同時接続数はさらに per_host までに制限する
+- 要約は summary_selector の最初の空でないテキスト（省略時は og:description / meta description）
+- 日付は date_selector のテキストを date_parser で解釈（省略時は article:published_time / time[datetime]）
+  一覧ページで日付が取れなかった item にだけ pub_date を補完し、max_age_days より古ければ除外する
+- HTTP で取得できない / 要約も日付も見つからない（JS 描画の）ページは、page を渡せばブラウザで再取得
+  （http=False なら最初からブラウザで取得する。HAR の記録 / 再生中はブラウザ以外の通信を使わないため）
+- 結果は DetailCache に URL ごとに保存し、同じ記事は一度だけ取得する
+
+例:
+    cache = DetailCache()
+    fetcher = DetailFetcher(summary_selector="div.entry-content p", date_selector="time", cache=cache)
+    items = fetcher.enrich(extract_items(page, ...), page=page)
+    generate_rss(items, OUTPUT_PATH, BASE_URL, GAKKAI)
+    cache.save()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup
+
+from cache_files import atomic_write_json, cache_path
+from date_parser import parse_date
+from fetch_scheduler import FetchScheduler, default_scheduler
+from instrumentation import count, log, span
+from scraper_utils import DEFAULT_MAX_AGE_DAYS
+
+DEFAULT_DETAILS_PATH = cache_path("article_details.json")
+DEFAULT_TIMEOUT = 15
+DEFAULT_CONCURRENCY = 8
+# 同じホストへの同時接続数（学会サイトは小規模なサーバが多いため控えめに）
+DEFAULT_PER_HOST = 2
+# description に入れる要約の最大文字数
+DEFAULT_SUMMARY_CHARS = 300
+# この日数以上参照されていないエントリは evict() で削除
+DEFAULT_EVICT_DAYS = 30
+# ブラウザで再取得するときの読み込み待ちの上限
+BROWSER_TIMEOUT_MS = 20000
+
+_SUMMARY_META = ('meta[property="og:description"]', 'meta[name="description"]')
+_DATE_META = (
+    ('meta[property="article:published_time"]', "content"),
+    ('meta[itemprop="datePublished"]', "content"),
+    ("time[datetime]", "datetime"),
+)
+
+
+class DetailCache:
+    """記事 URL → {summary, pub_date(ISO 8601), checked_at} を JSON ファイルに永続化する"""
+
+    def __init__(self, path: str = DEFAULT_DETAILS_PATH):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries: Dict[str, Dict[str, Any]] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(url)
+        if entry is not None:
+            entry["checked_at"] = time.time()
+        return entry
+
+    def put(self, url: str, detail: Dict[str, Any]) -> None:
+        self.entries[url] = {**detail, "checked_at": time.time()}
+
+    def evict(self, max_age_days: int = DEFAULT_EVICT_DAYS) -> int:
+        """max_age_days 以上参照されていないエントリを削除し、削除件数を返す"""
+        threshold = time.time() - timedelta(days=max_age_days).total_seconds()
+        stale = [url for url, e in self.entries.items() if e.get("checked_at", 0) < threshold]
+        for url in stale:
+            del self.entries[url]
+        return len(stale)
+
+    def save(self) -> None:
+        atomic_write_json(self.path, self.entries)
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+class DetailFetcher:
+    """記事ページの要約・日付を並行取得して items に補完する"""
+
+    def __init__(
+        self,
+        summary_selector: Optional[str] = None,
+        date_selector: Optional[str] = None,
+        date_regex: str = "",
+        concurrency: int = DEFAULT_CONCURRENCY,
+        per_host: int = DEFAULT_PER_HOST,
+        timeout: int = DEFAULT_TIMEOUT,
+        summary_chars: int = DEFAULT_SUMMARY_CHARS,
+        cache: Optional[DetailCache] = None,
+        http: bool = True,
+        scheduler: Optional[FetchScheduler] = None,
+    ):
+        self.summary_selector = summary_selector
+        self.date_selector = date_selector
+        self.date_regex = date_regex
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.summary_chars = summary_chars
+        self.cache = cache
+        self.http = http
+        self.scheduler = scheduler or default_scheduler()
+        self.stats = {"cached": 0, "fetched": 0, "browser": 0, "failed": 0}
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._hosts_lock = threading.Lock()
+
+    # ---- 解析
+
+    def parse(self, html) -> Dict[str, Any]:
+        """記事ページの HTML から {"summary", "pub_date"(ISO 8601)} を取り出す（見つからなければ None）"""
+        soup = html if isinstance(html, BeautifulSoup) else BeautifulSoup(html, "lxml")
+
+        summary = None
+        if self.summary_selector:
+            for el in soup.select(self.summary_selector):
+                txt = el.get_text(" ").strip()
+                if txt:
+                    summary = txt
+                    break
+        else:
+            for selector in _SUMMARY_META:
+                el = soup.select_one(selector)
+                if el is not None and (el.get("content") or "").strip():
+                    summary = el["content"].strip()
+                    break
+
+        pub_date = None
+        if self.date_selector:
+            for el in soup.select(self.date_selector):
+                pub_date = parse_date(el.get_text(), self.date_regex)
+                if pub_date is not None:
+                    break
+        else:
+            for selector, attr in _DATE_META:
+                el = soup.select_one(selector)
+                if el is not None and el.get(attr):
+                    pub_date = parse_date(el[attr])
+                    if pub_date is not None:
+                        break
+
+        return {
+            "summary": _clip(summary, self.summary_chars) if summary else None,
+            "pub_date": pub_date.isoformat() if pub_date is not None else None,
+        }
+
+    @staticmethod
+    def _found(detail: Optional[Dict[str, Any]]) -> bool:
+        return detail is not None and (detail["summary"] is not None or detail["pub_date"] is not None)
+
+    # ---- HTTP（並行）
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = _host(url)
+        with self._hosts_lock:
+            slot = self._hosts.get(host)
+            if slot is None:
+                slot = self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return slot
+
+    def _fetch_many(self, urls: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """urls を並行に HTTP 取得して解析する。取得・解析に失敗した URL は None"""
+        if not urls:
+            return {}
+
+        def fetch(url: str) -> Optional[Dict[str, Any]]:
+            try:
+                with self._host_slot(url), span("detail.fetch"):
+                    resp = self.scheduler.get(url, timeout=self.timeout)
+                resp.raise_for_status()
+                declared = "charset=" in (resp.headers.get("Content-Type") or "").lower()
+                return self.parse(BeautifulSoup(resp.content, "lxml", from_encoding=resp.encoding if declared else None))
+            except Exception as e:
+                log(f"⚠ 記事ページの取得に失敗: {url} ({e})", row=True)
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(urls))) as pool:
+            return dict(zip(urls, pool.map(fetch, urls)))
+
+    # ---- ブラウザ（フォールバック）
+
+    def _fetch_browser(self, page, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with span("detail.browser"):
+                page.goto(url, wait_until="domcontentloaded", timeout=BROWSER_TIMEOUT_MS)
+                html = page.content()
+            return self.parse(html)
+        except Exception as e:
+            log(f"⚠ 記事ページをブラウザでも取得できませんでした: {url} ({e})", row=True)
+            return None
+
+    async def _fetch_browser_async(self, context, url: str, slot: asyncio.Semaphore) -> Optional[Dict[str, Any]]:
+        async with slot:
+            tab = await context.new_page()
+            try:
+                with span("detail.browser"):
+                    await tab.goto(url, wait_until="domcontentloaded", timeout=BROWSER_TIMEOUT_MS)
+                    html = await tab.content()
+                return self.parse(html)
+            except Exception as e:
+                log(f"⚠ 記事ページをブラウザでも取得できませんでした: {url} ({e})", row=True)
+                return None
+            finally:
+                await tab.close()
+
+    # ---- items への補完
+
+    def _lookup(self, items: List[Dict[str, Any]]):
+        """(キャッシュ済みの結果, 未取得の URL) を返す"""
+        details: Dict[str, Optional[Dict[str, Any]]] = {}
+        pending: List[str] = []
+        for item in items:
+            url = item.get("link")
+            if not url or url in details or url in pending:
+                continue
+            cached = self.cache.get(url) if self.cache is not None else None
+            if cached is not None:
+                self.stats["cached"] += 1
+                details[url] = cached
+            else:
+                pending.append(url)
+        return details, pending
+
+    def _record(self, details, fetched, browser: bool = False) -> None:
+        for url, detail in fetched.items():
+            if detail is None:
+                continue
+            self.stats["browser" if browser else "fetched"] += 1
+            details[url] = detail
+            if self.cache is not None:
+                self.cache.put(url, detail)
+
+    def _apply(self, items, details, max_age_days: int) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        out = []
+        for item in items:
+            detail = details.get(item.get("link") or "")
+            if detail is None:
+                if item.get("link"):
+                    self.stats["failed"] += 1
+                    count("detail_failures")
+                out.append(item)
+                continue
+            if detail["summary"]:
+                item["description"] = detail["summary"]
+            if item.get("pub_date") is None and detail["pub_date"]:
+                pub_date = datetime.fromisoformat(detail["pub_date"])
+                if (now - pub_date).days > max_age_days:
+                    count("rows_skipped_old")
+                    log(f"⏳ 記事ページの日付 {pub_date} は{max_age_days}日より古いためスキップ: {item['title']}", row=True)
+                    continue
+                item["pub_date"] = pub_date
+                count("detail_dates_filled")
+            out.append(item)
+        return out
+
+    def enrich(
+        self,
+        items: List[Dict[str, Any]],
+        page=None,
+        max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    ) -> List[Dict[str, Any]]:
+        """
+        items の記事ページから要約・日付を補完して返す（items の dict はその場で更新）。
+        page（Playwright の sync Page）を渡すと、HTTP で取れなかった記事をそのページで再取得する。
+        """
+        details, pending = self._lookup(items)
+        fetched = self._fetch_many(pending) if self.http else dict.fromkeys(pending)
+        self._record(details, fetched)
+        if page is not None:
+            retry = [url for url, d in fetched.items() if not self._found(d)]
+            self._record(details, {url: self._fetch_browser(page, url) for url in retry}, browser=True)
+        return self._apply(items, details, max_age_days)
+
+    async def enrich_async(
+        self,
+        items: List[Dict[str, Any]],
+        context=None,
+        max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    ) -> List[Dict[str, Any]]:
+        """enrich の async 版。context（async Playwright の BrowserContext）で再取得する"""
+        details, pending = self._lookup(items)
+        fetched = await asyncio.to_thread(self._fetch_many, pending) if self.http else dict.fromkeys(pending)
+        self._record(details, fetched)
+        if context is not None:
+            retry = [url for url, d in fetched.items() if not self._found(d)]
+            slot = asyncio.Semaphore(self.per_host)
+            results = await asyncio.gather(*(self._fetch_browser_async(context, url, slot) for url in retry))
+            self._record(details, dict(zip(retry, results)), browser=True)
+        return self._apply(items, details, max_age_days)
+
+    def report(self, name: str = "") -> Dict[str, int]:
+        """キャッシュ hit / HTTP 取得 / ブラウザ再取得 / 失敗 の件数を表示して返す"""
+        s = self.stats
+        prefix = f"[{name}] " if name else ""
+        log(f"📰 {prefix}記事ページ: キャッシュ {s['cached']} / 取得 {s['fetched']}"
+            f" / ブラウザ {s['browser']} / 失敗 {s['failed']}")
+        return dict(s)
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+抽出からフィード書き出しまでを流れる記事 1 件の型（FeedItem）と、ジェネレータで組み立てるパイプライン
+
+- FeedItem は __slots__ で属性を固定した軽量オブジェクト（dict より小さい）
+- GUID（rss_utils.make_guid と同じ規則）と日付文字列は最初に必要になった時点で 1 回だけ計算して保持する
+  （title / link / pub_date / base_url が変わった場合だけ計算し直す）
+- item["title"] / item.get("pub_date") / item["guid"] = ... など dict と同じ書き方もできるため、
+  seen_store / detail_fetcher / http_cache など dict を前提にした既存コードにそのまま渡せる
+- パイプラインの各段はジェネレータで、前段から 1 件受け取るたびに次段へ流す
+  （抽出 → 日付の正規化 → 経過日数フィルタ → GUID 重複除去 → 件数上限 → 書き出し）。
+  generate_rss(backend="stream") に渡せば、抽出が終わる前から書き出しが進み、全件をリストに持たない
+
+例:
+    items = pipeline(iter_items(page, ...), BASE_URL, max_age_days=3, limit=100)
+    generate_rss(items, OUTPUT_PATH, BASE_URL, GAKKAI, backend="stream")
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from hashlib import sha1
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+FIELDS = ("title", "link", "description", "pub_date", "guid")
+
+_MISSING = object()
+
+
+def compute_guid(title: str, link: Optional[str], ymd: Optional[str], base_url: str) -> str:
+    """GUID の規則（ymd は pub_date の YYYYMMDD、日付なしなら None）。rss_utils.make_guid と共通"""
+    if ymd is not None:
+        if link:
+            return f"{link}#{ymd}"
+        digest = sha1(f"{title}|{ymd}".encode('utf-8')).hexdigest()
+        return f"urn:newsitem:{digest}"
+    if link:
+        return link
+    digest = sha1(f"{base_url}|{title}".encode('utf-8')).hexdigest()
+    return f"urn:newsitem:{digest}"
+
+
+class FeedItem:
+    """
+    記事 1 件（title / link / description / pub_date / guid）
+    guid は既存フィードから読み込んだ記事や既読ストアが固定した値で、None なら guid_for() で計算する
+    """
+
+    __slots__ = FIELDS + ("_date_key", "_date_str", "_guid_key", "_guid")
+
+    def __init__(
+        self,
+        title: str = "",
+        link: Optional[str] = None,
+        description: Optional[str] = None,
+        pub_date: Optional[datetime] = None,
+        guid: Optional[str] = None,
+    ):
+        self.title = title
+        self.link = link
+        self.description = description
+        self.pub_date = pub_date
+        self.guid = guid
+        self._date_key = _MISSING
+        self._date_str = None
+        self._guid_key = None
+        self._guid = None
+
+    @classmethod
+    def from_dict(cls, d) -> "FeedItem":
+        """dict（または FeedItem）から作る。FeedItem はそのまま返す"""
+        if isinstance(d, cls):
+            return d
+        return cls(d.get("title") or "", d.get("link"), d.get("description"), d.get("pub_date"), d.get("guid"))
+
+    def as_dict(self) -> Dict[str, Any]:
+        """従来の dict 形式（guid が無ければキーも含めない）"""
+        d = {"title": self.title, "link": self.link, "description": self.description, "pub_date": self.pub_date}
+        if self.guid is not None:
+            d["guid"] = self.guid
+        return d
+
+    # --- 1 回だけ計算する値
+
+    @property
+    def date_str(self) -> Optional[str]:
+        """pub_date の YYYY-MM-DD（タイトルの【】と GUID に使う）。pub_date が無ければ None"""
+        if self._date_key is not self.pub_date:
+            self._date_key = self.pub_date
+            self._date_str = self.pub_date.strftime('%Y-%m-%d') if self.pub_date is not None else None
+        return self._date_str
+
+    def guid_for(self, base_url: str) -> str:
+        """generate_rss が出力する GUID（guid が設定済みならその値）"""
+        if self.guid:
+            return self.guid
+        key = (base_url, self.title, self.link, self.pub_date)
+        if self._guid_key != key:
+            ymd = self.date_str
+            self._guid = compute_guid(self.title or '', self.link or None, ymd.replace('-', '') if ymd else None, base_url)
+            self._guid_key = key
+        return self._guid
+
+    def full_title(self) -> str:
+        """フィードに書き出すタイトル（日付があれば先頭に【YYYY-MM-DD】）"""
+        ymd = self.date_str
+        return f"【{ymd}】{self.title} " if ymd is not None else self.title
+
+    # --- dict 互換のアクセス
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return key in FIELDS and (key != "guid" or self.guid is not None)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # dict と同じく、キーがあれば値が None でもそのまま返す（guid は未設定ならキー自体が無い扱い）
+        if key not in self:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return self.as_dict().keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (FeedItem, dict)):
+            return self.as_dict() == dict(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"FeedItem({self.as_dict()!r})"
+
+
+# --- パイプラインの段（いずれも 1 件ずつ受け取って 1 件ずつ返すジェネレータ）
+
+
+def as_feed_items(items: Iterable[Any]) -> Iterator[FeedItem]:
+    """dict / FeedItem の混在を FeedItem に揃える"""
+    for item in items:
+        yield FeedItem.from_dict(item)
+
+
+def normalize_dates(items: Iterable[Any]) -> Iterator[FeedItem]:
+    """pub_date を UTC の aware datetime に揃える（ISO 8601 文字列・naive は UTC とみなす）"""
+    for item in as_feed_items(items):
+        pub_date = item.pub_date
+        if isinstance(pub_date, str):
+            try:
+                pub_date = datetime.fromisoformat(pub_date)
+            except ValueError:
+                pub_date = None
+        if pub_date is not None and pub_date.tzinfo is None:
+            pub_date = pub_date.replace(tzinfo=timezone.utc)
+        elif pub_date is not None and pub_date.utcoffset():
+            pub_date = pub_date.astimezone(timezone.utc)
+        item.pub_date = pub_date
+        yield item
+
+
+def filter_age(items: Iterable[Any], max_age_days: int, now: Optional[datetime] = None) -> Iterator[FeedItem]:
+    """pub_date が max_age_days より古い記事を除く（delta.days > max_age_days。日付の無い記事は残す）"""
+    now = now or datetime.now(timezone.utc)
+    for item in as_feed_items(items):
+        if item.pub_date is not None and (now - item.pub_date).days > max_age_days:
+            continue
+        yield item
+
+
+def dedup(items: Iterable[Any], base_url: str, seen: Optional[set] = None) -> Iterator[FeedItem]:
+    """GUID が同じ記事は先に出たものだけ残す（seen を渡すと既存の GUID も除外し、通過した GUID を追加する）"""
+    seen = set() if seen is None else seen
+    for item in as_feed_items(items):
+        guid = item.guid_for(base_url)
+        if guid in seen:
+            continue
+        seen.add(guid)
+        yield item
+
+
+def pipeline(
+    items: Iterable[Any],
+    base_url: str,
+    max_age_days: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> Iterator[FeedItem]:
+    """
+    抽出結果（dict / FeedItem のイテラブル）に 日付の正規化 → 経過日数フィルタ → GUID 重複除去 → 件数上限 をつなぐ
+    max_age_days / limit が None の段は省略する
+    """
+    stream: Iterator[FeedItem] = normalize_dates(items)
+    if max_age_days is not None:
+        stream = filter_age(stream, max_age_days)
+    stream = dedup(stream, base_url)
+    if limit:
+        stream = islice(stream, limit)
+    return stream
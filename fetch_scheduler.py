@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP 取得（一覧ページの静的取得・条件付き GET・記事ページ）で共有する、ホスト単位の礼儀正しい取得スケジューラ
+
+- ホストごとの同時接続数（per_host）と、リクエスト開始の最小間隔（min_interval 秒）を守る。
+  別ホストへのリクエストは互いに待たないため、スループットはホスト数に比例して伸びる
+- ホストごとに keep-alive の requests.Session をプールして使い回す（同時接続数と同じ本数まで）
+- Accept-Encoding は gzip / deflate（brotli / brotlicffi が import できれば br も）。展開は urllib3 が行う
+- 429 / 503 の Retry-After（秒数または HTTP-date）を守り、そのホストへの後続リクエストもその時刻まで待たせる。
+  Retry-After が max_retry_after を超える場合と再試行を使い切った場合は、その応答をそのまま返す
+- ホストごとの件数・レイテンシ（p50 / p95）・スロットリング回数を集計し、report() で表示
+
+既定のスケジューラ（default_scheduler()）はプロセス内で 1 つを共有する。サイトごとの上書きは configure_host() で行う。
+
+例:
+    scheduler = default_scheduler()
+    resp = scheduler.get("https://example.org/news/", timeout=15)
+    results = scheduler.get_many(urls)   # {url: Response or Exception}
+    scheduler.report()
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Iterator, List, Optional, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from browser_utils import DEFAULT_UA
+from instrumentation import count, log, span
+from scheduler import Budget, BudgetExceeded
+
+DEFAULT_PER_HOST = 2
+# 同じホストへのリクエスト開始の最小間隔（秒）
+DEFAULT_MIN_INTERVAL = 0.5
+DEFAULT_TIMEOUT = 15
+# 429 / 503 を受けたときの再試行回数と、待つ Retry-After の上限（秒）
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_MAX_RETRY_AFTER = 60.0
+# Retry-After が無い 429 / 503 の待ち時間（秒）。再試行ごとに倍にする
+DEFAULT_BACKOFF = 2.0
+# get_many の全体のワーカー数の上限
+DEFAULT_MAX_WORKERS = 16
+# ホストごとに保持するレイテンシの件数
+LATENCY_SAMPLES = 500
+
+_THROTTLE_STATUSES = (429, 503)
+
+
+def _accept_encoding() -> str:
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+        except ImportError:
+            return "gzip, deflate"
+    return "gzip, deflate, br"
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Retry-After ヘッダ（秒数または HTTP-date）を待ち秒数に。解釈できなければ None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - (now if now is not None else time.time()))
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Host:
+    """1 ホスト分の同時接続枠・開始間隔・Session プール・集計"""
+
+    def __init__(self, per_host: int, min_interval: float):
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self.slot = threading.BoundedSemaphore(per_host)
+        self.lock = threading.Lock()
+        # 次のリクエストを開始してよい時刻（monotonic）。Retry-After で先送りされる
+        self.next_start = 0.0
+        self.sessions: "queue.LifoQueue[requests.Session]" = queue.LifoQueue()
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.stats = {"requests": 0, "errors": 0, "throttled": 0, "retries": 0, "bytes": 0, "waited_s": 0.0}
+
+    def reserve(self) -> float:
+        """開始時刻を予約して、それまでの待ち秒数を返す"""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + self.min_interval
+            return start - now
+
+    def add(self, key: str, n: float = 1) -> None:
+        with self.lock:
+            self.stats[key] += n
+
+    def defer(self, seconds: float) -> None:
+        """Retry-After 等で、このホストへの以降のリクエストを seconds 秒後まで止める"""
+        with self.lock:
+            self.next_start = max(self.next_start, time.monotonic() + seconds)
+
+
+class FetchScheduler:
+    """ホスト単位の同時接続数・開始間隔・Retry-After を守って requests で取得する（スレッドセーフ）"""
+
+    def __init__(
+        self,
+        per_host: int = DEFAULT_PER_HOST,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        max_retry_after: float = DEFAULT_MAX_RETRY_AFTER,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        user_agent: str = DEFAULT_UA,
+    ):
+        self.per_host = max(1, per_host)
+        self.min_interval = max(0.0, min_interval)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.max_workers = max(1, max_workers)
+        self.headers = {"User-Agent": user_agent, "Accept-Encoding": _accept_encoding()}
+        self._hosts: Dict[str, _Host] = {}
+        self._overrides: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    # ---- ホストごとの状態
+
+    def configure_host(self, host: str, per_host: Optional[int] = None, min_interval: Optional[float] = None) -> None:
+        """host（例: "www.example.org"）だけ同時接続数 / 開始間隔を変える（そのホストへの最初の取得より前に呼ぶ）"""
+        with self._lock:
+            override = self._overrides.setdefault(host.lower(), {})
+            if per_host is not None:
+                override["per_host"] = max(1, per_host)
+            if min_interval is not None:
+                override["min_interval"] = max(0.0, min_interval)
+
+    def _host(self, host: str) -> _Host:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                override = self._overrides.get(host, {})
+                state = self._hosts[host] = _Host(
+                    int(override.get("per_host", self.per_host)), override.get("min_interval", self.min_interval)
+                )
+            return state
+
+    def _new_session(self, state: _Host) -> requests.Session:
+        s = requests.Session()
+        s.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        return s
+
+    @contextmanager
+    def _session(self, state: _Host) -> Iterator[requests.Session]:
+        """ホストの Session プールから 1 本借りる（同時接続枠の中で呼ぶので per_host 本を超えない）"""
+        try:
+            s = state.sessions.get_nowait()
+        except queue.Empty:
+            s = self._new_session(state)
+        try:
+            yield s
+        finally:
+            state.sessions.put(s)
+
+    # ---- 取得
+
+    def _wait(self, state: _Host, seconds: float, budget: Optional[Budget]) -> None:
+        if seconds <= 0:
+            return
+        if budget is not None and budget.remaining() < seconds:
+            count("budget_exceeded")
+            raise BudgetExceeded(f"ホストの待ち時間 {seconds:.1f}s が時間予算の残りを超えます")
+        state.add("waited_s", seconds)
+        time.sleep(seconds)
+
+    def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        budget: Optional[Budget] = None,
+    ) -> requests.Response:
+        """
+        url を GET する。ステータスは検査しない（呼び出し側で raise_for_status 等を行う）。
+        429 / 503 は Retry-After（無ければ指数バックオフ）を待って max_retries 回まで再試行する
+        """
+        host = host_of(url)
+        state = self._host(host)
+        timeout = self.timeout if timeout is None else timeout
+        attempt = 0
+        while True:
+            with state.slot:
+                self._wait(state, state.reserve(), budget)
+                if budget is not None:
+                    timeout = min(timeout, max(0.001, budget.remaining()))
+                started = time.monotonic()
+                try:
+                    with self._session(state) as s, span("http.fetch"):
+                        resp = s.get(url, headers=headers, timeout=timeout)
+                except Exception:
+                    state.add("errors")
+                    count("http_errors")
+                    raise
+                finally:
+                    state.latencies.append(time.monotonic() - started)
+                    state.add("requests")
+                state.add("bytes", len(resp.content))
+
+            if resp.status_code not in _THROTTLE_STATUSES:
+                return resp
+
+            state.add("throttled")
+            count("http_throttled")
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            delay = retry_after if retry_after is not None else DEFAULT_BACKOFF * (2 ** attempt)
+            if delay > self.max_retry_after:
+                log(f"⚠ {host} が {delay:.0f}s 後の再試行を求めているため、このリクエストは諦めます: {url}")
+                state.defer(self.max_retry_after)
+                return resp
+            state.defer(delay)
+            if attempt >= self.max_retries:
+                return resp
+            attempt += 1
+            state.add("retries")
+            log(f"⏳ {host} から {resp.status_code}。{delay:.1f}s 待って再試行します（{attempt}/{self.max_retries}）", row=True)
+
+    def get_many(
+        self,
+        urls: List[str],
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        budget: Optional[Budget] = None,
+    ) -> Dict[str, Union[requests.Response, Exception]]:
+        """
+        urls を並行に GET して {url: Response または例外} を返す。
+        ワーカー数は ホスト数 × per_host（max_workers まで）。同じホストの URL は per_host 本ずつ順番に流れる
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        hosts = {host_of(u) for u in urls}
+        workers = min(self.max_workers, len(urls), sum(self._host(h).per_host for h in hosts))
+
+        def fetch(url: str) -> Union[requests.Response, Exception]:
+            try:
+                return self.get(url, headers=headers, timeout=timeout, budget=budget)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(urls, pool.map(fetch, urls)))
+
+    # ---- 集計
+
+    def host_stats(self) -> Dict[str, Dict[str, float]]:
+        """ホストごとの件数・エラー・スロットリング・再試行・受信バイト・待ち時間・レイテンシ（p50 / p95 秒）"""
+        out = {}
+        with self._lock:
+            hosts = dict(self._hosts)
+        for host, state in sorted(hosts.items()):
+            latencies = list(state.latencies)
+            out[host] = {
+                **state.stats,
+                "waited_s": round(state.stats["waited_s"], 3),
+                "p50_s": round(_percentile(latencies, 0.5) or 0.0, 3),
+                "p95_s": round(_percentile(latencies, 0.95) or 0.0, 3),
+            }
+        return out
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """ホストごとの集計を表示して返す"""
+        stats = self.host_stats()
+        if not stats:
+            return stats
+        total = sum(s["requests"] for s in stats.values())
+        throttled = sum(s["throttled"] for s in stats.values())
+        log(f"🌐 HTTP 取得: {len(stats)} ホスト / {total} リクエスト（429・503 {throttled} 回）")
+        for host, s in stats.items():
+            log(f"   {host}: {s['requests']} 件 p50 {s['p50_s']:.2f}s / p95 {s['p95_s']:.2f}s"
+                f" エラー {s['errors']} / 429・503 {s['throttled']} / 間隔待ち {s['waited_s']:.1f}s")
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            hosts = list(self._hosts.values())
+        for state in hosts:
+            while True:
+                try:
+                    state.sessions.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+_default: Optional[FetchScheduler] = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> FetchScheduler:
+    """プロセス内で共有する既定のスケジューラ（初回呼び出し時に作る）"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = FetchScheduler()
+        return _default
+
+
+def report_default() -> Optional[Dict[str, Dict[str, float]]]:
+    """既定のスケジューラを使っていれば集計を表示して返す（使っていなければ None）"""
+    return _default.report() if _default is not None else None
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+一覧ページの HTTP バリデータ（ETag / Last-Modified / 本文ダイジェスト）を保存し、
+ページが変わっていなければ前回抽出した items を再利用するためのキャッシュ
+
+- check(url): 条件付き GET を 1 回送り、304 または本文ダイジェスト一致なら True（ブラウザ不要）
+  session を渡さなければ fetch_scheduler の既定スケジューラ（ホスト単位の同時接続数・間隔）で送る
+- store(url, items): 抽出結果と、check() で得たバリデータを保存
+- cached_items(url): 前回の items（古くなった記事は除外）
+- evict(): 一定期間確認されていないエントリを削除
+- report(): 今回の hit / miss と、省略できたブラウザ起動回数を表示
+
+例:
+    cache = ValidatorCache()
+    if cache.check(BASE_URL):
+        items = cache.cached_items(BASE_URL)
+    else:
+        ...  # 従来どおりブラウザで抽出
+        cache.store(BASE_URL, items)
+    cache.save()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from browser_utils import DEFAULT_UA
+from cache_files import atomic_write_json, cache_path
+from instrumentation import log
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_CACHE_PATH = cache_path("http_validators.json")
+DEFAULT_TIMEOUT = 15
+# この日数以上 check されていないエントリは evict() で削除
+DEFAULT_EVICT_DAYS = 14
+# cached_items() で除外する記事の経過日数（extract_items の 3 日ルールと同じ）
+DEFAULT_MAX_AGE_DAYS = 3
+
+
+def serialize_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """items を JSON に保存できる形へ（pub_date は ISO 8601 文字列）"""
+    out = []
+    for item in items:
+        d = dict(item)
+        if d.get("pub_date") is not None:
+            d["pub_date"] = d["pub_date"].isoformat()
+        out.append(d)
+    return out
+
+
+def deserialize_items(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """serialize_items の逆変換"""
+    out = []
+    for d in data:
+        item = dict(d)
+        if item.get("pub_date"):
+            item["pub_date"] = datetime.fromisoformat(item["pub_date"])
+        out.append(item)
+    return out
+
+
+class ValidatorCache:
+    """URL ごとの HTTP バリデータと抽出済み items を JSON ファイルに永続化する"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, timeout: int = DEFAULT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self.hits: List[str] = []
+        self.misses: List[str] = []
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries: Dict[str, Dict[str, Any]] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def check(self, url: str, session: Optional[requests.Session] = None) -> bool:
+        """
+        条件付き GET で一覧ページが前回から変わっていないか確認する。
+        変わっていない（304 / 本文ダイジェスト一致）かつ前回の items があれば True。
+        """
+        entry = self.entries.get(url) or {}
+        headers = {"User-Agent": DEFAULT_UA}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        if session is None:
+            from fetch_scheduler import default_scheduler
+
+        getter = session.get if session is not None else default_scheduler().get
+        try:
+            resp = getter(url, headers=headers, timeout=self.timeout)
+        except Exception as e:
+            log(f"⚠ 条件付きリクエストに失敗: {url} ({e})")
+            return self._miss(url)
+
+        now = time.time()
+        if resp.status_code == 304:
+            unchanged = True
+            validators = {k: entry.get(k) for k in ("etag", "last_modified", "digest")}
+        elif resp.ok:
+            digest = hashlib.sha256(resp.content).hexdigest()
+            unchanged = digest == entry.get("digest")
+            validators = {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "digest": digest,
+            }
+        else:
+            return self._miss(url)
+
+        if unchanged and "items" in entry:
+            entry.update(validators)
+            entry["checked_at"] = now
+            self.hits.append(url)
+            return True
+
+        # 抽出に成功したら store() でまとめて反映する
+        self._pending[url] = validators
+        return self._miss(url)
+
+    def _miss(self, url: str) -> bool:
+        self.misses.append(url)
+        return False
+
+    def cached_items(self, url: str, max_age_days: int = DEFAULT_MAX_AGE_DAYS) -> List[Dict[str, Any]]:
+        """前回保存した items を返す（pub_date が max_age_days より古いものは除外）"""
+        items = deserialize_items((self.entries.get(url) or {}).get("items", []))
+        now = datetime.now(timezone.utc)
+        return [
+            item for item in items
+            if item.get("pub_date") is None or (now - item["pub_date"]).days <= max_age_days
+        ]
+
+    def store(self, url: str, items: List[Dict[str, Any]]) -> None:
+        """抽出結果を保存する。check() で取得したバリデータが無い場合は items のみ更新"""
+        now = time.time()
+        entry = self.entries.setdefault(url, {})
+        entry.update(self._pending.pop(url, {}))
+        entry["items"] = serialize_items(items)
+        entry["checked_at"] = now
+        entry["updated_at"] = now
+
+    def evict(self, max_age_days: int = DEFAULT_EVICT_DAYS) -> int:
+        """max_age_days 以上確認されていないエントリを削除し、削除件数を返す"""
+        threshold = time.time() - timedelta(days=max_age_days).total_seconds()
+        stale = [url for url, e in self.entries.items() if e.get("checked_at", 0) < threshold]
+        for url in stale:
+            del self.entries[url]
+        return len(stale)
+
+    def save(self) -> None:
+        atomic_write_json(self.path, self.entries)
+
+    def report(self) -> Dict[str, int]:
+        """今回の hit / miss を表示して返す（hit 数 = 省略できたブラウザ起動回数）"""
+        stats = {"hits": len(self.hits), "misses": len(self.misses), "entries": len(self.entries)}
+        total = stats["hits"] + stats["misses"]
+        rate = (stats["hits"] / total * 100) if total else 0.0
+        log(f"🗂 HTTPキャッシュ: hit {stats['hits']} / miss {stats['misses']} ({rate:.0f}%)"
+            f" → ブラウザ起動を {stats['hits']} 回省略")
+        return stats
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+スクレイピング処理のフェーズ別計測（スパン / カウンタ）とログ出力
+
+- span(name): with ブロックの所要時間を記録（navigate / wait_for_load_state / extract.row / parse_date など）
+- timed(name): 関数全体をスパンとして記録するデコレータ（popup.dismiss など）
+- count(name): 件数を加算（rows_seen / rows_skipped_old / date_parse_failures など）
+- labels(site=...): 以降のスパン・カウンタにサイト名等のラベルを付ける（contextvars なので async でも安全）
+- log(msg, row=False): 従来の print の置き換え。quiet モードでは row=True（行ごとのログ）を出力しない
+- 計測結果は sink に送る。JsonLinesSink は 1 イベント 1 行の JSON、SummarySink は終了時に集計表を表示
+
+環境変数でも設定できる（RSS*.py を変更せずに CI で有効化するため）:
+    RSS_QUIET=1                         行ごとのログを出さない
+    RSS_INSTRUMENT=summary              終了時に集計表を表示
+    RSS_INSTRUMENT=jsonl:timings.jsonl  スパン・カウンタを JSON lines で追記
+    （カンマ区切りで併用可）
+
+例:
+    configure(quiet=True, sinks=[SummarySink()])
+    with labels(site="RSS_example"), span("navigate"):
+        page.goto(url)
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+_labels: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("instrumentation_labels", default={})
+
+
+class JsonLinesSink:
+    """スパンは終了時に、カウンタは flush 時に 1 行の JSON として書き出す"""
+
+    def __init__(self, target: Any = sys.stderr):
+        self._own = isinstance(target, str)
+        self._stream: IO[str] = open(target, "a", encoding="utf-8") if self._own else target
+        self._lock = threading.Lock()
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            self._stream.write(line + "\n")
+
+    def close(self, recorder: "Recorder") -> None:
+        for (name, labels), value in recorder.counters.items():
+            self.emit({"type": "counter", "name": name, "value": value, **dict(labels)})
+        with self._lock:
+            if self._own:
+                self._stream.close()
+            else:
+                self._stream.flush()
+
+
+class SummarySink:
+    """終了時にスパン（回数・合計・最大）とカウンタの集計表を表示する"""
+
+    def __init__(self, stream: IO[str] = sys.stdout):
+        self._stream = stream
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        pass
+
+    def close(self, recorder: "Recorder") -> None:
+        w = self._stream.write
+        if recorder.spans:
+            w(f"\n⏱ フェーズ別の所要時間\n{'span':<28}{'labels':<28}{'n':>7}{'total ms':>12}{'max ms':>10}\n")
+            rows = sorted(recorder.spans.items(), key=lambda kv: -kv[1][1])
+            for (name, labels), (n, total, peak) in rows:
+                w(f"{name:<28}{_fmt_labels(labels):<28}{n:>7}{total:>12.1f}{peak:>10.1f}\n")
+        if recorder.counters:
+            w(f"\n🔢 カウンタ\n{'counter':<28}{'labels':<28}{'value':>7}\n")
+            for (name, labels), value in sorted(recorder.counters.items()):
+                w(f"{name:<28}{_fmt_labels(labels):<28}{value:>7}\n")
+        self._stream.flush()
+
+
+def _fmt_labels(labels: Tuple[Tuple[str, Any], ...]) -> str:
+    return ",".join(f"{k}={v}" for k, v in labels) or "-"
+
+
+class Recorder:
+    """スパンとカウンタをラベルごとに集計し、sink に転送する"""
+
+    def __init__(self, sinks: Optional[List[Any]] = None, quiet: bool = False):
+        self.sinks: List[Any] = list(sinks or [])
+        self.quiet = quiet
+        # (name, labels) -> [回数, 合計 ms, 最大 ms]
+        self.spans: Dict[Tuple[str, Tuple], List[float]] = {}
+        self.counters: Dict[Tuple[str, Tuple], int] = {}
+        self._lock = threading.Lock()
+
+    def record_span(self, name: str, ms: float, fields: Dict[str, Any]) -> None:
+        labels = _labels.get()
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            agg = self.spans.get(key)
+            if agg is None:
+                self.spans[key] = [1, ms, ms]
+            else:
+                agg[0] += 1
+                agg[1] += ms
+                if ms > agg[2]:
+                    agg[2] = ms
+        if self.sinks:
+            event = {"type": "span", "name": name, "ms": round(ms, 3), **labels, **fields}
+            for sink in self.sinks:
+                sink.emit(event)
+
+    def add(self, name: str, n: int) -> None:
+        key = (name, tuple(sorted(_labels.get().items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def summary(self) -> Dict[str, Any]:
+        """集計結果を dict で返す（{"spans": [...], "counters": [...]}）"""
+        with self._lock:
+            return {
+                "spans": [
+                    {"name": name, **dict(labels), "n": n, "total_ms": round(total, 3), "max_ms": round(peak, 3)}
+                    for (name, labels), (n, total, peak) in self.spans.items()
+                ],
+                "counters": [
+                    {"name": name, **dict(labels), "value": value}
+                    for (name, labels), value in self.counters.items()
+                ],
+            }
+
+    def close(self) -> None:
+        sinks, self.sinks = self.sinks, []
+        for sink in sinks:
+            try:
+                sink.close(self)
+            except Exception as e:
+                print(f"⚠ 計測結果の出力に失敗: {e}")
+
+
+def _sinks_from_env(spec: str) -> List[Any]:
+    sinks: List[Any] = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        kind, _, arg = part.partition(":")
+        if kind == "summary":
+            sinks.append(SummarySink())
+        elif kind == "jsonl":
+            sinks.append(JsonLinesSink(arg) if arg else JsonLinesSink())
+        else:
+            print(f"⚠ 不明な RSS_INSTRUMENT の指定を無視します: {part}")
+    return sinks
+
+
+_recorder = Recorder(
+    sinks=_sinks_from_env(os.environ.get("RSS_INSTRUMENT", "")),
+    quiet=os.environ.get("RSS_QUIET", "") not in ("", "0"),
+)
+atexit.register(lambda: _recorder.close())
+
+
+def configure(quiet: Optional[bool] = None, sinks: Optional[List[Any]] = None) -> Recorder:
+    """
+    quiet / sinks を設定する。sinks を渡すと既存の sink を閉じて置き換え、集計もリセットする
+    """
+    global _recorder
+    if sinks is not None:
+        _recorder.close()
+        _recorder = Recorder(sinks, _recorder.quiet)
+    if quiet is not None:
+        _recorder.quiet = quiet
+    return _recorder
+
+
+def get_recorder() -> Recorder:
+    return _recorder
+
+
+def is_quiet() -> bool:
+    return _recorder.quiet
+
+
+@contextlib.contextmanager
+def span(name: str, **fields) -> Iterator[None]:
+    """with ブロックの所要時間を name のスパンとして記録する（例外時も記録）"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _recorder.record_span(name, (time.perf_counter() - started) * 1000, fields)
+
+
+def timed(name: str):
+    """関数の呼び出し全体を name のスパンとして記録するデコレータ"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, n: int = 1) -> None:
+    _recorder.add(name, n)
+
+
+@contextlib.contextmanager
+def labels(**values) -> Iterator[None]:
+    """with ブロック内のスパン・カウンタにラベル（site など）を付ける"""
+    token = _labels.set({**_labels.get(), **values})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def log(message: Any = "", row: bool = False) -> None:
+    """print の置き換え。row=True は行ごとの詳細ログで、quiet モードでは出力しない"""
+    if row and _recorder.quiet:
+        return
+    print(message)
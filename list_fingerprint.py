@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+一覧ページの行（SELECTOR_TITLE / SELECTOR_DATE に一致する先頭 max_items 行）のテキストと href から
+ページ内でフィンガープリントを計算し、前回から変わっていなければ前回の items を再利用するためのストア
+
+- JS 描画のサイトでは HTTP バリデータ（http_cache）が使えないが、一覧の行そのものは変わっていないことが多い
+- フィンガープリントは 1 回の page.evaluate で計算する（cyrb53。行ごとのロケータ呼び出し・日付パースは不要）
+- check(page, ...): 一致すれば前回の items（古くなった記事は除外）、不一致・未登録なら None
+- store(url, items): 抽出結果を check() で計算したフィンガープリントとともに保存
+- unchanged(url): 今回 check() が一致したか（呼び出し側はフィードの書き出しを省略できる）
+- 抽出条件（セレクタ・正規表現等）が変わった場合と、最後の抽出から max_reuse_hours を過ぎた場合は
+  一致とみなさない（フィードから古い記事を落とすため、少なくともその間隔で書き出し直す）
+
+例:
+    fingerprints = FingerprintStore()
+    items = extract_items(page, ..., fingerprints=fingerprints)
+    if not fingerprints.unchanged(page.url):
+        generate_rss(items, OUTPUT_PATH, BASE_URL, GAKKAI)
+    fingerprints.save()
+    fingerprints.report()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from cache_files import atomic_write_json, cache_path
+from http_cache import deserialize_items, serialize_items
+from instrumentation import count, log, span
+
+DEFAULT_FINGERPRINT_PATH = cache_path("list_fingerprints.json")
+# 最後に抽出してからこの時間を過ぎたら、一致しても抽出とフィードの書き出しをやり直す
+DEFAULT_MAX_REUSE_HOURS = 24
+# この日数以上 check されていないエントリは evict() で削除
+DEFAULT_EVICT_DAYS = 14
+# cached_items() で除外する記事の経過日数（extract_items の 3 日ルールと同じ）
+DEFAULT_MAX_AGE_DAYS = 3
+
+# 先頭 maxItems 行のテキスト（空白を正規化）と a[href] を連結して cyrb53 で 53bit のハッシュにする。
+# セレクタが querySelectorAll で解釈できない場合は null（呼び出し側は未一致として扱う）
+_FINGERPRINT_JS = """
+(args) => {
+  const cyrb53 = (str, seed = 0) => {
+    let h1 = 0xdeadbeef ^ seed, h2 = 0x41c6ce57 ^ seed;
+    for (let i = 0, ch; i < str.length; i++) {
+      ch = str.charCodeAt(i);
+      h1 = Math.imul(h1 ^ ch, 2654435761);
+      h2 = Math.imul(h2 ^ ch, 1597334677);
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507);
+    h1 ^= Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507);
+    h2 ^= Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    return 4294967296 * (2097151 & h2) + (h1 >>> 0);
+  };
+  const describe = (el) => {
+    const text = (el.textContent || "").replace(/\\s+/g, " ").trim();
+    const links = [el, ...el.querySelectorAll("a[href]")]
+      .map((a) => a.getAttribute && a.getAttribute("href"))
+      .filter(Boolean);
+    return text + "\\u0001" + links.join("\\u0002");
+  };
+
+  let titles, dates;
+  try {
+    titles = Array.from(document.querySelectorAll(args.rowSel)).slice(0, args.maxItems);
+    dates = args.dateRowSel ? Array.from(document.querySelectorAll(args.dateRowSel)).slice(0, args.maxItems) : [];
+  } catch (e) {
+    return null;
+  }
+  const parts = [titles.length + ":" + dates.length];
+  for (const el of titles) parts.push(describe(el));
+  for (const el of dates) parts.push(describe(el));
+  return titles.length + "-" + cyrb53(parts.join("\\u0003")).toString(16);
+}
+"""
+
+
+def _js_args(SELECTOR_TITLE: str, SELECTOR_DATE: Optional[str], max_items: int) -> Dict[str, Any]:
+    return {"rowSel": SELECTOR_TITLE, "dateRowSel": SELECTOR_DATE, "maxItems": max_items}
+
+
+def page_fingerprint(page, SELECTOR_TITLE: str, SELECTOR_DATE: Optional[str], max_items: int) -> Optional[str]:
+    """一覧の先頭 max_items 行のフィンガープリント（計算できなければ None）。行の待機は呼び出し側で行う"""
+    try:
+        with span("fingerprint"):
+            return page.evaluate(_FINGERPRINT_JS, _js_args(SELECTOR_TITLE, SELECTOR_DATE, max_items))
+    except Exception as e:
+        log(f"⚠ 一覧のフィンガープリントを計算できませんでした: {e}")
+        return None
+
+
+async def page_fingerprint_async(
+    page, SELECTOR_TITLE: str, SELECTOR_DATE: Optional[str], max_items: int
+) -> Optional[str]:
+    """page_fingerprint の async Playwright 版"""
+    try:
+        with span("fingerprint"):
+            return await page.evaluate(_FINGERPRINT_JS, _js_args(SELECTOR_TITLE, SELECTOR_DATE, max_items))
+    except Exception as e:
+        log(f"⚠ 一覧のフィンガープリントを計算できませんでした: {e}")
+        return None
+
+
+def config_digest(config: Dict[str, Any]) -> str:
+    """抽出条件（セレクタ・インデックス・正規表現等）のダイジェスト。条件が変われば前回の items は使わない"""
+    blob = json.dumps(config, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def _page_key(url: str) -> str:
+    return url.split("#", 1)[0]
+
+
+class FingerprintStore:
+    """一覧ページの URL ごとのフィンガープリントと抽出済み items を JSON ファイルに永続化する"""
+
+    def __init__(self, path: str = DEFAULT_FINGERPRINT_PATH, max_reuse_hours: float = DEFAULT_MAX_REUSE_HOURS):
+        self.path = path
+        self.max_reuse_hours = max_reuse_hours
+        self.hits: Set[str] = set()
+        self.misses: Set[str] = set()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries: Dict[str, Dict[str, Any]] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def lookup(
+        self, url: str, fingerprint: Optional[str], config: Dict[str, Any], max_age_days: int = DEFAULT_MAX_AGE_DAYS
+    ) -> Optional[List[Dict[str, Any]]]:
+        """fingerprint と抽出条件が前回と同じなら前回の items、そうでなければ None（store() 用に保留）"""
+        key = _page_key(url)
+        digest = config_digest(config)
+        entry = self.entries.get(key) or {}
+        now = time.time()
+        fresh = now - entry.get("updated_at", 0) <= self.max_reuse_hours * 3600
+        if fingerprint is not None and fresh and "items" in entry and (
+            entry.get("fingerprint"), entry.get("config")
+        ) == (fingerprint, digest):
+            entry["checked_at"] = now
+            self.hits.add(key)
+            self.misses.discard(key)
+            count("fingerprint_hits")
+            log(f"🧬 一覧に変更なし（{fingerprint}）。行の抽出を省略: {key}")
+            return self.cached_items(key, max_age_days)
+
+        if fingerprint is not None:
+            self._pending[key] = {"fingerprint": fingerprint, "config": digest}
+        self.misses.add(key)
+        return None
+
+    def check(
+        self,
+        page,
+        SELECTOR_TITLE: str,
+        SELECTOR_DATE: Optional[str],
+        max_items: int,
+        config: Dict[str, Any],
+        max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """page（一覧の行を待機済み）のフィンガープリントを計算して lookup する"""
+        fingerprint = page_fingerprint(page, SELECTOR_TITLE, SELECTOR_DATE, max_items)
+        return self.lookup(page.url, fingerprint, config, max_age_days)
+
+    async def check_async(
+        self,
+        page,
+        SELECTOR_TITLE: str,
+        SELECTOR_DATE: Optional[str],
+        max_items: int,
+        config: Dict[str, Any],
+        max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """check の async Playwright 版"""
+        fingerprint = await page_fingerprint_async(page, SELECTOR_TITLE, SELECTOR_DATE, max_items)
+        return self.lookup(page.url, fingerprint, config, max_age_days)
+
+    def unchanged(self, url: str) -> bool:
+        """今回の check() で url の一覧が前回と一致したか"""
+        return _page_key(url) in self.hits
+
+    def cached_items(self, url: str, max_age_days: int = DEFAULT_MAX_AGE_DAYS) -> List[Dict[str, Any]]:
+        """前回保存した items を返す（pub_date が max_age_days より古いものは除外）"""
+        items = deserialize_items((self.entries.get(_page_key(url)) or {}).get("items", []))
+        now = datetime.now(timezone.utc)
+        return [
+            item for item in items
+            if item.get("pub_date") is None or (now - item["pub_date"]).days <= max_age_days
+        ]
+
+    def store(self, url: str, items: List[Dict[str, Any]]) -> None:
+        """抽出結果を check() で計算したフィンガープリントとともに保存（フィンガープリントが無ければ何もしない）"""
+        key = _page_key(url)
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        now = time.time()
+        self.entries[key] = {**pending, "items": serialize_items(items), "checked_at": now, "updated_at": now}
+
+    def evict(self, max_age_days: int = DEFAULT_EVICT_DAYS) -> int:
+        """max_age_days 以上確認されていないエントリを削除し、削除件数を返す"""
+        threshold = time.time() - timedelta(days=max_age_days).total_seconds()
+        stale = [key for key, e in self.entries.items() if e.get("checked_at", 0) < threshold]
+        for key in stale:
+            del self.entries[key]
+        return len(stale)
+
+    def save(self) -> None:
+        atomic_write_json(self.path, self.entries)
+
+    def report(self) -> Dict[str, int]:
+        """今回の一致 / 不一致を表示して返す（一致 = 行の抽出とフィードの書き出しを省略したページ）"""
+        stats = {"unchanged": len(self.hits), "changed": len(self.misses), "entries": len(self.entries)}
+        log(f"🧬 一覧フィンガープリント: 変更なし {stats['unchanged']} ページ（抽出・フィード書き出しを省略）"
+            f" / 変更あり・未登録 {stats['changed']} ページ")
+        return stats
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+一覧ページのページ送り（2 ページ目以降）をまとめて取得するユーティリティ
+
+- url_template（例: "https://example.org/news/page/{page}/"）なら 2〜max_pages ページ目を、
+  next_selector（「次へ」またはページ番号リンク）なら現在のページのリンク先をたどる
+- 次に読むページは同じコンテキストの別タブで全ページのナビゲーションを先に開始し（sync API の goto は
+  1 件ずつ commit まで待つため location の代入で開始）、各タブの commit を待ってから順番に extract_items する
+  （ナビゲーション自体も並行するため、N ページでもほぼ 1 ページ分の待ち時間）
+- 結果はページ順に連結し、GUID（rss_utils.make_guid）が同じ記事は先に出たものだけ残す
+- あるページの記事が 0 件（すべて max_age_days より古い、または行が無い）になった時点で打ち切り、
+  先行して開いたタブは閉じる
+- budget（extract_items と同じ引数）を使い切ったら、それまでのページの記事を返す
+
+例:
+    items = extract_items_paginated(
+        page, SELECTOR_DATE, SELECTOR_TITLE, "a", 0, "a", 0, BASE_URL, "span.date", 0, None, DATE_REGEX,
+        url_template="https://example.org/news/page/{page}/", max_pages=5,
+    )
+"""
+
+from __future__ import annotations
+
+from types import ModuleType
+from typing import Any, Dict, Iterable, List, Optional
+
+import scraper_utils
+from browser_utils import install_resource_blocking
+from instrumentation import count, log, span
+from rss_utils import make_guid
+from scheduler import resolve_budget, timeout_ms
+
+DEFAULT_MAX_PAGES = 5
+# 2 ページ目以降で一覧の行が現れるのを待つ上限（最終ページの先は空ページのことが多いため短め）
+FOLLOWING_PAGE_TIMEOUT_MS = 10000
+
+# selector に一致する要素（またはその中の最初の a[href]）の絶対 URL を文書順に返す
+_LINKS_JS = """
+(els) => els.map((el) => {
+  const a = el.href ? el : el.querySelector("a[href]");
+  return a ? a.href : null;
+}).filter(Boolean)
+"""
+
+
+def template_urls(url_template: str, max_pages: int, start: int = 2) -> List[str]:
+    """url_template の {page} を start〜max_pages で埋めた URL のリスト"""
+    return [url_template.format(page=n) for n in range(start, max_pages + 1)]
+
+
+def page_links(page, selector: str) -> List[str]:
+    """ページ送りリンクの URL を 1 回の往復で取得する（Playwright のセレクタ構文も可）"""
+    try:
+        return page.locator(selector).evaluate_all(_LINKS_JS)
+    except Exception as e:
+        log(f"⚠ ページ送りリンクの取得に失敗: {e}")
+        return []
+
+
+async def page_links_async(page, selector: str) -> List[str]:
+    """page_links の async Playwright 版"""
+    try:
+        return await page.locator(selector).evaluate_all(_LINKS_JS)
+    except Exception as e:
+        log(f"⚠ ページ送りリンクの取得に失敗: {e}")
+        return []
+
+
+def next_urls(links: Iterable[str], visited: set, budget: int) -> List[str]:
+    """未訪問のリンクを文書順・重複なしで最大 budget 件返す（ページ内アンカーの違いは同一視）"""
+    out: List[str] = []
+    for url in links:
+        key = url.split("#", 1)[0]
+        if key in visited or key in out:
+            continue
+        out.append(key)
+        if len(out) >= budget:
+            break
+    return out
+
+
+def merge_pages(pages: Iterable[List[Dict[str, Any]]], base_url: str) -> List[Dict[str, Any]]:
+    """ページごとの items をページ順に連結し、同じ GUID の記事は最初の 1 件だけ残す"""
+    seen = set()
+    merged: List[Dict[str, Any]] = []
+    for items in pages:
+        for item in items:
+            guid = make_guid(item, base_url)
+            if guid in seen:
+                continue
+            seen.add(guid)
+            merged.append(item)
+    return merged
+
+
+# ナビゲーションを開始するだけで完了を待たない（evaluate の応答前にページが切り替わらないよう次のタスクで代入）
+_NAVIGATE_JS = "(url) => { setTimeout(() => { window.location.href = url; }, 0); }"
+
+
+def _start_navigation(tab, url: str) -> List[Any]:
+    """tab で url へのナビゲーションを開始し、メインフレームのナビゲーション応答を受け取るリストを返す"""
+    responses: List[Any] = []
+
+    def _on_response(resp) -> None:
+        if resp.request.is_navigation_request() and resp.frame == tab.main_frame:
+            responses.append(resp)
+
+    tab.on("response", _on_response)
+    tab.evaluate(_NAVIGATE_JS, url)
+    return responses
+
+
+def _open_pages(context, urls: List[str], block: Optional[dict], budget=None) -> List[Any]:
+    """
+    urls をそれぞれ新しいタブで開き始める（レスポンスのコミットまで待ち、読み込み完了は待たない）
+    全タブのナビゲーションを先に開始してから順に commit を待つため、ページの取得はブラウザ側で並行する
+    開けなかった URL やエラー応答（404 等）のタブは None
+    """
+    started = []
+    for url in urls:
+        tab = context.new_page()
+        if block is not None:
+            install_resource_blocking(tab, block)
+        try:
+            started.append((url, tab, _start_navigation(tab, url), None))
+        except Exception as e:
+            started.append((url, tab, [], e))
+
+    opened = []
+    with span("navigate"):
+        for url, tab, responses, error in started:
+            try:
+                if error is not None:
+                    raise error
+                tab.wait_for_url(lambda u: u != "about:blank", wait_until="commit", timeout=timeout_ms(budget, 30000))
+                if not responses:
+                    raise RuntimeError("応答がありません")
+                if responses[-1].status >= 400:
+                    raise RuntimeError(f"HTTP {responses[-1].status}")
+            except Exception as e:
+                count("pagination_failures")
+                log(f"⚠ ページを開けませんでした: {url} ({e})")
+                tab.close()
+                tab = None
+            opened.append((url, tab))
+    return opened
+
+
+def _has_rows(tab, selector: str, budget=None) -> bool:
+    """一覧の行が FOLLOWING_PAGE_TIMEOUT_MS 以内に現れるか（extract_items の長い待機を避ける）"""
+    try:
+        tab.wait_for_selector(selector, state="attached", timeout=timeout_ms(budget, FOLLOWING_PAGE_TIMEOUT_MS))
+        return True
+    except Exception:
+        return False
+
+
+def extract_items_paginated(
+    page,
+    *args,
+    next_selector: Optional[str] = None,
+    url_template: Optional[str] = None,
+    max_pages: int = DEFAULT_MAX_PAGES,
+    engine: ModuleType = scraper_utils,
+    block: Optional[dict] = None,
+    **kwargs,
+) -> List[Dict[str, Any]]:
+    """
+    page（1 ページ目を表示済み）と 2 ページ目以降から記事を抽出して連結する。
+
+    args / kwargs は engine.extract_items の page 以降の引数（max_items はページごとの上限）。
+    url_template と next_selector の両方を指定した場合は url_template を使う。
+    next_selector が複数のリンク（ページ番号）に一致すれば、それらをまとめて並行に開く。
+    block を渡すと、追加で開くタブにも install_resource_blocking を適用する。
+    """
+    selector_title = args[1] if len(args) > 1 else kwargs["SELECTOR_TITLE"]
+    base_url = args[6] if len(args) > 6 else kwargs["base_url"]
+    budget = kwargs["budget"] = resolve_budget(kwargs.get("budget"))
+    pages = [engine.extract_items(page, *args, **kwargs)]
+    visited = {page.url.split("#", 1)[0]}
+    count("pages_crawled")
+    if not pages[0] or not (url_template or next_selector):
+        return pages[0]
+
+    queue = template_urls(url_template, max_pages) if url_template else []
+    current = page
+    stale = False
+    while not stale and len(visited) < max_pages:
+        if budget is not None and budget.expired():
+            count("budget_exceeded")
+            log("⏱ 時間予算を使い切ったため、ページ送りを終了")
+            break
+        n = max_pages - len(visited)
+        if url_template:
+            batch, queue = queue[:n], queue[n:]
+        else:
+            batch = next_urls(page_links(current, next_selector), visited, n)
+        if current is not page:
+            current.close()
+            current = page
+        if not batch:
+            break
+        visited.update(batch)
+
+        opened = _open_pages(page.context, batch, block, budget)
+        last = None
+        try:
+            for url, tab in opened:
+                if tab is None:
+                    continue
+                if not _has_rows(tab, selector_title, budget):
+                    log(f"⏹ {url} に一覧の行が無いため、ページ送りを終了")
+                    stale = True
+                    break
+                try:
+                    items = engine.extract_items(tab, *args, **kwargs)
+                except Exception as e:
+                    count("pagination_failures")
+                    log(f"⚠ ページの抽出に失敗: {url} ({e})")
+                    continue
+                count("pages_crawled")
+                if not items:
+                    log(f"⏹ {url} に対象期間内の記事が無いため、ページ送りを終了")
+                    stale = True
+                    break
+                pages.append(items)
+                last = tab
+        finally:
+            # 最後に読んだタブは次のリンク探索に使うため残す
+            for _, tab in opened:
+                if tab is not None and tab is not last:
+                    tab.close()
+        if last is not None:
+            current = last
+    if current is not page:
+        current.close()
+
+    merged = merge_pages(pages, base_url)
+    log(f"📚 {len(pages)} ページから {len(merged)} 件を取得")
+    return merged
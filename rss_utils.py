@@ -1,16 +1,258 @@
-from feedgen.feed import FeedGenerator
+from collections import deque
 from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from hashlib import sha1
+from xml.etree.ElementTree import iterparse
+import calendar
+import glob
+import heapq
 import os
+import re
+import tempfile
+import unicodedata
+
+from feed_item import FeedItem, compute_guid
+from instrumentation import log, span, timed
+
+# feedgen（lxml を読み込む）と feedparser は初回使用時に import する。
+# merge_feeds / stream バックエンドだけを使う実行ではどちらも読み込まない
+_LAZY_ATTRS = {"FeedGenerator": ("feedgen.feed", "FeedGenerator"), "feedparser": ("feedparser", None)}
+
+
+def __getattr__(name):
+    # 互換のため rss_utils.FeedGenerator / rss_utils.feedparser も参照できるようにする
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    module_name, attr = _LAZY_ATTRS[name]
+    module = importlib.import_module(module_name)
+    return getattr(module, attr) if attr else module
+
+
+# incremental=True のとき既存フィードから引き継ぐ最大件数
+DEFAULT_MAX_HISTORY = 100
+# merge_feeds で統合フィードに残す最大件数
+DEFAULT_MERGE_TOP_N = 200
+RSS_DOCS_URL = "http://www.rssboard.org/rss-specification"
+
+_TITLE_DATE_PREFIX = re.compile(r"^【\d{4}-\d{2}-\d{2}】")
+
+
+def make_guid(item, base_url):
+    """
+    generate_rss が出力する GUID（既存フィードから読み込んだ item は元の GUID をそのまま使う）
+    item は dict または feed_item.FeedItem（FeedItem は計算済みの GUID を再利用する）
+    """
+    if isinstance(item, FeedItem):
+        return item.guid_for(base_url)
+    if item.get('guid'):
+        return item['guid']
+
+    pub_date = item.get('pub_date')
+    ymd = pub_date.strftime('%Y%m%d') if pub_date is not None else None
+    return compute_guid(item.get('title') or '', item.get('link') or None, ymd, base_url)
+
+
+def _full_title(title, pub_date):
+    if pub_date is not None:
+        ymd = pub_date.strftime('%Y-%m-%d')
+        return f"【{ymd}】{title} "
+    return title
+
+
+def _item_title(item):
+    """フィードに書き出すタイトル（FeedItem は計算済みの日付文字列を使う）"""
+    if isinstance(item, FeedItem):
+        return item.full_title()
+    return _full_title(item.get('title') or '', item.get('pub_date'))
+
+
+def read_feed_items(path):
+    """
+    generate_rss が出力したフィードを item の dict リストに戻す（書き出した items と同じ並び順）
+    feedgen / stream のどちらで書き出したフィードかは pubDate の並びから判定する
+    タイトル先頭の【YYYY-MM-DD】は取り除き、GUID は 'guid' キーに保持する
+    長い履歴のフィードを全件メモリに載せたくない場合は iter_feed_items を使う
+    """
+    if not os.path.exists(path):
+        return []
+
+    import feedparser
+
+    # description は HTML としてではなく書き出した文字列のまま読み戻す
+    parsed = feedparser.parse(path, sanitize_html=False, resolve_relative_uris=False)
+    items = []
+    for e in parsed.entries:
+        t = e.get('published_parsed')
+        pub_date = datetime.fromtimestamp(calendar.timegm(t), timezone.utc) if t else None
+        title = (e.get('title') or '').strip()
+        if pub_date is not None:
+            title = _TITLE_DATE_PREFIX.sub('', title)
+        items.append({
+            'title': title,
+            'link': e.get('link') or None,
+            'description': e.get('summary') or title,
+            'pub_date': pub_date,
+            'guid': e.get('id') or e.get('link'),
+        })
+    if _is_oldest_first(items):
+        items.reverse()
+    return items
+
+
+class _DateOrder:
+    """
+    ファイル中の記事の pubDate を順に受け取り、並びが古い順かを判定する（隣り合う組で昇順が降順より多いか）
+    feedgen バックエンドは add_entry した順の逆（items が新しい順なら古い順）で、stream バックエンドは items の順で出力する。
+    日付で判定できない場合は feedgen の出力とみなす
+    """
+
+    def __init__(self):
+        self.ascending = 0
+        self.descending = 0
+        self._last = None
+
+    def add(self, pub_date):
+        if pub_date is None:
+            return
+        if self._last is not None:
+            self.ascending += self._last < pub_date
+            self.descending += self._last > pub_date
+        self._last = pub_date
+
+    @property
+    def oldest_first(self):
+        return self.ascending >= self.descending
+
+
+def _is_oldest_first(items):
+    """ファイル中の並びが古い順か（_DateOrder を参照）"""
+    order = _DateOrder()
+    for item in items:
+        order.add(item['pub_date'])
+    return order.oldest_first
+
+
+def iter_feed_items(path):
+    """
+    RSS ファイルの記事をファイル中の並び順で 1 件ずつ FeedItem として返す（存在しなければ何も返さない）
+    read_feed_items と同じくタイトル先頭の【YYYY-MM-DD】は取り除く。iterparse で逐次読むため記事数に依存しないメモリで済む
+    """
+    if not os.path.exists(path):
+        return
+    for entry in iter_feed_entries(path):
+        item = FeedItem.from_dict(entry)
+        if item.pub_date is not None:
+            item.title = _TITLE_DATE_PREFIX.sub('', item.title).strip()
+        item.description = item.description or item.title
+        yield item
+
+
+def merge_items(new_items, old_items, base_url, max_history=DEFAULT_MAX_HISTORY):
+    """新しい items を先頭に、GUID が重複しない既存 items を後ろに連結して max_history 件に切り詰める"""
+    merged = list(new_items)
+    seen = {make_guid(item, base_url) for item in merged}
+    for item in old_items:
+        guid = make_guid(item, base_url)
+        if guid not in seen:
+            seen.add(guid)
+            merged.append(item)
+    return merged[:max_history] if max_history else merged
+
+
+_HASH_MOD = 1 << 160
+
+
+def _item_digest(item, base_url):
+    """1 件分の出力内容（GUID・タイトル・リンク・説明・pubDate）のハッシュ値"""
+    title = item.get('title') or ''
+    pub_date = item.get('pub_date')
+    fields = (
+        make_guid(item, base_url),
+        _item_title(item).strip(),
+        item.get('link') or base_url,
+        item.get('description') or title,
+        str(int(pub_date.timestamp())) if pub_date is not None else '',
+    )
+    return int.from_bytes(sha1("\x1f".join(fields).encode('utf-8')).digest(), 'big')
+
+
+class _ContentHash:
+    """
+    lastBuildDate を除いたフィード内容のハッシュ（記事の並び順には依存しない）
+    記事ごとのハッシュの和なので、書き出しながら逐次計算できる
+    """
+
+    def __init__(self, base_url, gakkai_name):
+        self.base_url = base_url
+        self.channel = sha1(f"{gakkai_name}|{base_url}".encode('utf-8')).hexdigest()
+        self.total = 0
+        self.count = 0
+
+    def add(self, item):
+        self.total = (self.total + _item_digest(item, self.base_url)) % _HASH_MOD
+        self.count += 1
+
+    def hexdigest(self):
+        return f"{self.channel}:{self.count}:{self.total:040x}"
+
+
+def _content_hash(items, base_url, gakkai_name):
+    h = _ContentHash(base_url, gakkai_name)
+    for item in items:
+        h.add(item)
+    return h.hexdigest()
+
+
+def generate_rss(
+    items,
+    output_path,
+    base_url,
+    gakkai_name,
+    incremental=False,
+    max_history=DEFAULT_MAX_HISTORY,
+    backend="feedgen",
+):
+    """
+    items から RSS を生成して output_path に保存する。書き込んだ場合 True を返す。
+
+    incremental=True の場合は既存の output_path を読み込んで GUID 単位でマージし（最大 max_history 件）、
+    内容が既存フィードと同一なら書き込みをスキップする（lastBuildDate だけの差分コミットを防ぐ）。
+
+    backend="stream" の場合は feedgen を使わず、items（ジェネレータ可）を 1 件ずつ
+    一時ファイルへ書き出して最後に rename する。タイトル書式・GUID・チャンネル情報は同じだが、
+    記事は items の順で出力される（feedgen は逆順）。incremental=True でも既存フィードは逐次読み、
+    書き出し中に保持するのは最大 2 × max_history 件分の既存記事だけ（feedgen で書いたフィードも新しい順に残す）。
+
+    items は dict または feed_item.FeedItem（混在可）。feed_item.pipeline の出力をそのまま渡せば
+    抽出しながら書き出せる。
+    """
+    if backend not in ("feedgen", "stream"):
+        raise ValueError(f"unknown backend: {backend}")
+    write = _generate_rss_stream if backend == "stream" else _generate_rss_feedgen
+    with span("feed.write", backend=backend):
+        return write(items, output_path, base_url, gakkai_name, incremental, max_history)
+
+
+def _generate_rss_feedgen(items, output_path, base_url, gakkai_name, incremental, max_history):
+    """generate_rss(backend="feedgen") の本体"""
+    if incremental:
+        old_items = read_feed_items(output_path)
+        items = merge_items(items, old_items, base_url, max_history)
+        if old_items and _content_hash(items, base_url, gakkai_name) == _content_hash(old_items, base_url, gakkai_name):
+            log(f"\nℹ RSSフィードに変更がないため書き込みをスキップ: {output_path}")
+            return False
+
+    from feedgen.feed import FeedGenerator
 
-def generate_rss(items, output_path, base_url, gakkai_name):
     fg = FeedGenerator()
     fg.title(f"{gakkai_name}トピックス")
     fg.link(href=base_url)
     fg.description(f"{gakkai_name}の最新トピック情報")
     fg.language("ja")
     fg.generator("python-feedgen")
-    fg.docs("http://www.rssboard.org/rss-specification")
+    fg.docs(RSS_DOCS_URL)
     fg.lastBuildDate(datetime.now(timezone.utc))
 
     for item in items:
@@ -19,42 +261,319 @@ def generate_rss(items, output_path, base_url, gakkai_name):
         link = item.get('link') or None
         desc = item.get('description') or title
         pub_date = item.get('pub_date')
-    
+
         # --- タイトル + 日付 ---
-        if pub_date is not None:
-            ymd = pub_date.strftime('%Y-%m-%d')
-            full_title = f"【{ymd}】{title} "
-        else:
-            full_title = title
-        entry.title(full_title)
-    
+        entry.title(_item_title(item))
+
         entry.description(desc)
-    
+
         # --- リンク ---
         if link:
             entry.link(href=link)
         else:
             entry.link(href=base_url)
-    
+
         # --- GUID ---
+        entry.guid(make_guid(item, base_url), permalink=False)
         if pub_date is not None:
-            ymd = pub_date.strftime('%Y%m%d')
-            if link:
-                entry.guid(f"{link}#{ymd}", permalink=False)
-            else:
-                digest = sha1(f"{title}|{ymd}".encode('utf-8')).hexdigest()
-                entry.guid(f"urn:newsitem:{digest}", permalink=False)
             entry.pubDate(pub_date)
-        else:
-            if link:
-                entry.guid(link, permalink=False)
-            else:
-                digest = sha1(f"{base_url}|{title}".encode('utf-8')).hexdigest()
-                entry.guid(f"urn:newsitem:{digest}", permalink=False)
 
     dirpath = os.path.dirname(output_path)
     if dirpath:
         os.makedirs(dirpath, exist_ok=True)
 
-    fg.rss_file(output_path)
-    print(f"\n✅ RSSフィード生成完了！📄 保存先: {output_path}")
+    # 一時ファイルに書いてから置き換える（hedge で止められたプロセスが書きかけのフィードを残さないように）
+    fd, tmp = tempfile.mkstemp(dir=dirpath or ".", prefix=".tmp-", suffix=".xml")
+    os.close(fd)
+    try:
+        fg.rss_file(tmp)
+        os.replace(tmp, output_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    log(f"\n✅ RSSフィード生成完了！📄 保存先: {output_path}")
+    return True
+
+
+def _generate_rss_stream(items, output_path, base_url, gakkai_name, incremental, max_history):
+    """
+    generate_rss(backend="stream") の本体
+    既存フィードは iter_feed_items で 1 回だけ逐次読み、変更判定用のハッシュと並び順（_DateOrder）を同時に求める。
+    既存フィードが古い順（feedgen の出力）か新しい順（stream の出力）かは読み終えるまで分からないため、
+    未出力の記事を先頭と末尾から空き件数分ずつ保持し、新しい順に並ぶ方を書き足す（保持は最大 2 × max_history 件）
+    """
+    limit = max_history if incremental and max_history else None
+    content = _ContentHash(base_url, gakkai_name)
+    old_content = _ContentHash(base_url, gakkai_name)
+    seen = set()
+
+    with RssStreamWriter(
+        output_path,
+        f"{gakkai_name}トピックス",
+        base_url,
+        f"{gakkai_name}の最新トピック情報",
+    ) as w:
+        def _write(item, guid):
+            title = item.get('title') or ''
+            w.write_item(
+                _item_title(item),
+                item.get('link') or base_url,
+                item.get('description') or title,
+                guid,
+                item.get('pub_date'),
+            )
+            content.add(item)
+
+        for item in items:
+            if limit is not None and w.count >= limit:
+                break
+            guid = make_guid(item, base_url)
+            seen.add(guid)
+            _write(item, guid)
+
+        if incremental:
+            room = None if limit is None else max(limit - w.count, 0)
+            head, tail = [], deque(maxlen=room)
+            order = _DateOrder()
+            for item in iter_feed_items(output_path):
+                old_content.add(item)
+                order.add(item.pub_date)
+                guid = make_guid(item, base_url)
+                if guid in seen:
+                    continue
+                if room is None or len(head) < room:
+                    head.append((guid, item))
+                if room is not None:
+                    tail.append((guid, item))
+            if order.oldest_first:
+                kept = reversed(tail) if room is not None else reversed(head)
+            else:
+                kept = head
+            for guid, item in kept:
+                if guid not in seen:
+                    seen.add(guid)
+                    _write(item, guid)
+
+        if old_content.count and content.hexdigest() == old_content.hexdigest():
+            w.discard = True
+
+    if w.discard:
+        log(f"\nℹ RSSフィードに変更がないため書き込みをスキップ: {output_path}")
+        return False
+    log(f"\n✅ RSSフィード生成完了！📄 保存先: {output_path}（{w.count} 件）")
+    return True
+
+
+class RssStreamWriter:
+    """
+    RSS 2.0 を <item> 単位で逐次書き出すライタ（フィード全体をメモリに持たない）
+    一時ファイルに書き、with を正常に抜けたときだけ output_path へ rename する
+
+    例:
+        with RssStreamWriter(path, title, link, description) as w:
+            w.write_item(title, link, description, guid, pub_date)
+    """
+
+    def __init__(self, output_path, title, link, description, language="ja", last_build_date=None):
+        self.output_path = output_path
+        self.channel = [
+            ("title", title),
+            ("link", link),
+            ("description", description),
+            ("docs", RSS_DOCS_URL),
+            ("generator", "python-feedgen"),
+            ("language", language),
+            ("lastBuildDate", format_datetime(last_build_date or datetime.now(timezone.utc))),
+        ]
+        self.count = 0
+        # True にすると with を抜けても output_path を置き換えない
+        self.discard = False
+        self._file = None
+        self._tmp = None
+        self._xml = None
+
+    def __enter__(self):
+        dirpath = os.path.dirname(self.output_path) or "."
+        os.makedirs(dirpath, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(dir=dirpath, prefix=".tmp-", suffix=".xml")
+        self._file = os.fdopen(fd, "w", encoding="utf-8")
+        # xml.sax.saxutils は urllib.request を読み込むため、書き出すときまで import しない
+        from xml.sax.saxutils import XMLGenerator
+
+        self._xml = XMLGenerator(self._file, encoding="utf-8", short_empty_elements=True)
+        self._xml.startDocument()
+        self._xml.startElement("rss", {
+            "xmlns:atom": "http://www.w3.org/2005/Atom",
+            "xmlns:content": "http://purl.org/rss/1.0/modules/content/",
+            "version": "2.0",
+        })
+        self._xml.startElement("channel", {})
+        for name, value in self.channel:
+            self._element(name, value)
+        return self
+
+    def _element(self, name, value, attrs=None):
+        self._xml.startElement(name, attrs or {})
+        self._xml.characters(value)
+        self._xml.endElement(name)
+
+    def write_item(self, title, link, description, guid, pub_date=None):
+        self._xml.startElement("item", {})
+        self._element("title", title)
+        self._element("link", link)
+        self._element("description", description)
+        self._element("guid", guid, {"isPermaLink": "false"})
+        if pub_date is not None:
+            self._element("pubDate", format_datetime(pub_date))
+        self._xml.endElement("item")
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._xml.endElement("channel")
+                self._xml.endElement("rss")
+                self._xml.endDocument()
+            self._file.close()
+            if exc_type is None and not self.discard:
+                os.replace(self._tmp, self.output_path)
+        finally:
+            if os.path.exists(self._tmp):
+                os.unlink(self._tmp)
+        return False
+
+
+def iter_feed_entries(path):
+    """
+    RSS ファイルを先頭から逐次パースし、<item> ごとに dict を返す
+    {'title', 'link', 'description', 'guid', 'pub_date'}
+    読み終えた <item> は親（<channel>）から外すため、メモリはフィードの件数に依存しない
+    """
+    parent = None
+    for event, elem in iterparse(path, events=("start", "end")):
+        if event == "start":
+            if elem.tag == "channel":
+                parent = elem
+            continue
+        if elem.tag != "item":
+            continue
+        fields = {child.tag: (child.text or "").strip() for child in elem}
+        pub_date = None
+        if fields.get("pubDate"):
+            try:
+                pub_date = parsedate_to_datetime(fields["pubDate"])
+            except (TypeError, ValueError):
+                pub_date = None
+        yield {
+            "title": fields.get("title", ""),
+            "link": fields.get("link") or None,
+            "description": fields.get("description", ""),
+            "guid": fields.get("guid") or fields.get("link") or None,
+            "pub_date": pub_date,
+        }
+        elem.clear()
+        if parent is not None:
+            parent.remove(elem)
+
+
+_DEDUP_PUNCT = re.compile(r"[\s\W_]+")
+
+
+def _dedup_keys(entry):
+    """
+    GUID、リンクを持つ記事のリンク、リンクを持たない記事（urn:newsitem）の正規化タイトル
+    （リンクを持たない記事の <link> はサイトのトップページなのでキーにしない）
+    """
+    keys = []
+    guid = entry.get("guid")
+    if guid:
+        keys.append(("guid", guid))
+    if not guid or not guid.startswith("urn:newsitem:"):
+        if entry.get("link"):
+            keys.append(("link", entry["link"]))
+    if not guid or guid.startswith("urn:newsitem:"):
+        title = _TITLE_DATE_PREFIX.sub("", entry.get("title") or "")
+        norm = _DEDUP_PUNCT.sub("", unicodedata.normalize("NFKC", title)).lower()
+        if norm:
+            keys.append(("title", norm))
+    return keys
+
+
+@timed("feed.merge")
+def merge_feeds(
+    inputs="rss_output/*.xml",
+    output_path="rss_output/combined.xml",
+    top_n=DEFAULT_MERGE_TOP_N,
+    title="新着トピックス",
+    link="",
+    description="各サイトの最新トピック情報をまとめたフィード",
+):
+    """
+    複数の RSS を pubDate の新しい順に統合し、上位 top_n 件を output_path に書き出す。件数を返す。
+
+    - inputs は glob パターンまたはパスのリスト（output_path 自身は除外）
+    - 各フィードは逐次パースし、サイズ top_n の最小ヒープで上位だけを保持する（保持する記事は FeedItem）
+      （サイトごとのフィードは日付順とは限らないため、ソート済み前提の k-way マージではなくヒープで選別）
+    - GUID またはリンクが同じ記事、リンクの無い記事でタイトルが正規化後に一致するものは新しい方だけ残す。
+      キーの一部だけが重なる記事どうしも 1 つのグループにまとめ、残った記事が全員分のキーを引き継ぐ
+    - 書き出しは RssStreamWriter（一時ファイル → rename）
+    """
+    paths = sorted(glob.glob(inputs)) if isinstance(inputs, str) else list(inputs)
+    out_abs = os.path.abspath(output_path)
+    paths = [p for p in paths if os.path.abspath(p) != out_abs]
+
+    heap = []   # [timestamp, seq, entry, keys, alive]
+    live = {}   # dedup key -> heap item
+    alive = 0
+    seq = 0
+
+    for path in paths:
+        try:
+            entries = iter_feed_entries(path)
+            for entry in entries:
+                seq += 1
+                ts = entry["pub_date"].timestamp() if entry["pub_date"] is not None else float("-inf")
+                keys = _dedup_keys(entry)
+
+                item = [ts, -seq, FeedItem.from_dict(entry), keys, True]
+                dups = list({id(live[k]): live[k] for k in keys if k in live}.values())
+                if dups:
+                    # 重なったグループ全体で最も新しい記事だけを残し、キーはすべてその記事に集める
+                    best = max(dups + [item], key=lambda it: it[:2])
+                    merged = list(dict.fromkeys(k for it in dups + [item] for k in it[3]))
+                    for dup in dups:
+                        if dup is not best:
+                            dup[4] = False
+                            alive -= 1
+                    if best is not item:
+                        best[3] = merged
+                        for k in merged:
+                            live[k] = best
+                        continue
+                    for k in merged:
+                        live.pop(k, None)
+                    item[3] = keys = merged
+                if alive < top_n:
+                    heapq.heappush(heap, item)
+                    alive += 1
+                else:
+                    while heap and not heap[0][4]:
+                        heapq.heappop(heap)
+                    if not heap or item[:2] <= heap[0][:2]:
+                        continue
+                    evicted = heapq.heapreplace(heap, item)
+                    for k in evicted[3]:
+                        live.pop(k, None)
+                for k in keys:
+                    live[k] = item
+        except Exception as e:
+            log(f"⚠ フィードの読み込みに失敗: {path} ({e})")
+
+    selected = sorted((it for it in heap if it[4]), reverse=True)
+    with RssStreamWriter(output_path, title, link, description) as w:
+        for _, _, e, _, _ in selected:
+            w.write_item(e.title, e.link or link, e.description or e.title, e.guid or e.link or "", e.pub_date)
+
+    log(f"\n✅ 統合フィード生成完了！{len(paths)} フィード → {w.count} 件 📄 保存先: {output_path}")
+    return w.count
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+実行全体の締め切り（deadline）とサイトごとの時間予算（Budget）を扱うスケジューラ
+
+- Budget: 締め切り時刻（UNIX 時刻）を持ち、Playwright の各タイムアウトを残り時間で頭打ちにする
+  （timeout_ms(budget, 120000) → min(120000, 残りミリ秒)。使い切っていれば BudgetExceeded）
+- DurationHistory: サイト / スクリプトごとの過去の所要時間から予算と hedge（再試行の先行開始）の
+  タイミングを決める。.cache に JSON で保存
+- 環境変数 RSS_RUN_DEADLINE（実行全体）/ RSS_DEADLINE（このプロセス）に UNIX 時刻を入れておくと、
+  budget を渡さずに呼んだ extract_items / click_button_in_order もその締め切りに従う
+- python scheduler.py RSS*.py: スクリプトを順に実行し、過去の所要時間から決めた予算を超えたら打ち切る
+  （履歴の無いスクリプトは予算で打ち切らず、実行全体の締め切りだけに従う）。
+  --hedge を付けた場合だけ、中央値 × HEDGE_FACTOR を過ぎても終わらなければ 2 本目を先行開始し、先に成功した方を
+  採用する（2 本のプロセスが同じフィード・.cache・既読ストアに書くため、共有状態を持たないスクリプト専用）。
+  再試行は残り時間が想定所要時間以上ある場合だけ行い、締め切りを過ぎたスクリプトは実行せずに errors.log へ
+- 予算の上限は MAX_SITE_BUDGET（環境変数 RSS_MAX_SITE_BUDGET / --max-budget で変更可）
+
+例:
+    run = Budget.after(1500)
+    budget = run.child(history.budget_for("RSS_example"))
+    page.wait_for_selector(sel, timeout=timeout_ms(budget, 120000))
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from cache_files import atomic_write_json
+from instrumentation import count, log
+
+DEFAULT_HISTORY_PATH = os.path.join(".cache", "durations.json")
+DEFAULT_ERRORS_LOG = "errors.log"
+# 履歴が無いサイトの予算（秒）
+DEFAULT_SITE_BUDGET = 180.0
+# 予算 = 直近の最大所要時間 × BUDGET_FACTOR + BUDGET_SLACK を [MIN, MAX] に収める
+BUDGET_FACTOR = 2.0
+BUDGET_SLACK = 10.0
+MIN_SITE_BUDGET = 30.0
+MAX_SITE_BUDGET = 300.0
+# 直近の所要時間の中央値 × HEDGE_FACTOR を過ぎても終わらなければ 2 本目を先行開始
+HEDGE_FACTOR = 2.0
+# サイトごとに保持する所要時間の件数
+HISTORY_SIZE = 10
+# 予算切れ後にスクリプトが後片付け（フィードの書き出し等）をするための猶予（秒）
+SCRIPT_GRACE = 15.0
+# 子プロセスの終了・hedge の開始を確認する間隔（秒）
+POLL_INTERVAL = 0.2
+
+ENV_RUN_DEADLINE = "RSS_RUN_DEADLINE"
+ENV_DEADLINE = "RSS_DEADLINE"
+ENV_MAX_SITE_BUDGET = "RSS_MAX_SITE_BUDGET"
+
+
+class BudgetExceeded(TimeoutError):
+    """時間予算を使い切った"""
+
+
+class Budget:
+    """締め切り時刻（UNIX 時刻）。None なら無制限"""
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+
+    @classmethod
+    def after(cls, seconds: Optional[float]) -> "Budget":
+        return cls(time.time() + seconds if seconds is not None else None)
+
+    def child(self, seconds: Optional[float]) -> "Budget":
+        """今から seconds 秒後と自身の締め切りの早い方を締め切りとする予算"""
+        candidates = [d for d in (self.deadline, time.time() + seconds if seconds is not None else None) if d is not None]
+        return Budget(min(candidates) if candidates else None)
+
+    def remaining(self) -> float:
+        """残り秒数（無制限なら inf、使い切っていれば 0 以下）"""
+        return float("inf") if self.deadline is None else self.deadline - time.time()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout_ms(self, cap_ms: int) -> int:
+        """cap_ms と残り時間の小さい方（ミリ秒）。使い切っていれば BudgetExceeded"""
+        left = self.remaining()
+        if left <= 0:
+            count("budget_exceeded")
+            raise BudgetExceeded("時間予算を使い切りました")
+        return max(1, min(cap_ms, int(left * 1000))) if left != float("inf") else cap_ms
+
+    def __repr__(self) -> str:
+        return f"Budget(remaining={self.remaining():.1f}s)"
+
+
+def default_budget() -> Optional[Budget]:
+    """環境変数 RSS_DEADLINE / RSS_RUN_DEADLINE（UNIX 時刻）の早い方の予算。どちらも無ければ None"""
+    deadlines = []
+    for name in (ENV_DEADLINE, ENV_RUN_DEADLINE):
+        value = os.environ.get(name)
+        if value:
+            try:
+                deadlines.append(float(value))
+            except ValueError:
+                log(f"⚠ {name} の値を解釈できないため無視します: {value}")
+    return Budget(min(deadlines)) if deadlines else None
+
+
+def resolve_budget(budget: Optional[Budget]) -> Optional[Budget]:
+    """budget が None なら環境変数の締め切り（default_budget）を使う"""
+    return budget if budget is not None else default_budget()
+
+
+def timeout_ms(budget: Optional[Budget], cap_ms: int) -> int:
+    """Playwright に渡すタイムアウト。budget が None なら cap_ms のまま"""
+    return cap_ms if budget is None else budget.timeout_ms(cap_ms)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        log(f"⚠ {name} の値を解釈できないため無視します: {value}")
+        return default
+
+
+class DurationHistory:
+    """名前（サイト / スクリプト）ごとの直近の所要時間（秒）を JSON に保存する"""
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, max_budget: Optional[float] = None):
+        self.path = path
+        # 予算の上限（秒）。省略時は環境変数 RSS_MAX_SITE_BUDGET、それも無ければ MAX_SITE_BUDGET
+        self.max_budget = max_budget if max_budget is not None else _env_float(ENV_MAX_SITE_BUDGET, MAX_SITE_BUDGET)
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries: Dict[str, List[float]] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        self.entries[name] = (self.entries.get(name, []) + [round(seconds, 3)])[-HISTORY_SIZE:]
+
+    def expected(self, name: str) -> Optional[float]:
+        """直近の所要時間の中央値（履歴が無ければ None）"""
+        if not self.entries.get(name):
+            return None
+        durations = sorted(self.entries[name])
+        mid = len(durations) // 2
+        return durations[mid] if len(durations) % 2 else (durations[mid - 1] + durations[mid]) / 2
+
+    def budget_for(self, name: str) -> float:
+        """直近の最大所要時間から決めた予算（秒）"""
+        durations = self.entries.get(name)
+        if not durations:
+            return DEFAULT_SITE_BUDGET
+        return min(self.max_budget, max(MIN_SITE_BUDGET, max(durations) * BUDGET_FACTOR + BUDGET_SLACK))
+
+    def hedge_after(self, name: str) -> Optional[float]:
+        """2 本目の試行を先行開始するまでの秒数（履歴が無ければ None = hedge しない）"""
+        expected = self.expected(name)
+        return expected * HEDGE_FACTOR if expected is not None else None
+
+    def save(self) -> None:
+        atomic_write_json(self.path, self.entries)
+
+
+def _append_error(path: str, name: str, reason: str) -> None:
+    # ワークフローの detailed_errors.csv は行頭のスクリプト名（空白区切り 1 列目）を使う
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f"{name} failed: {reason}\n")
+
+
+def _run_hedged(
+    script: str, env: Dict[str, str], timeout: Optional[float], hedge_after: Optional[float], run: Budget, expected: float
+) -> Tuple[str, float, bool]:
+    """
+    script を実行し、hedge_after 秒を過ぎても終わらなければ（残り時間が expected 以上あれば）2 本目を先行開始する。
+    どちらかが成功した時点でもう一方は止める。timeout 秒を過ぎたらすべて止める。
+    戻り値は (失敗理由（成功なら ""）, 所要秒数, 打ち切ったか)
+    """
+    import subprocess
+
+    started = time.time()
+    procs = [(subprocess.Popen([sys.executable, script], env=env), started)]
+    hedged = False
+    reason = ""
+
+    def _stop_all() -> None:
+        for proc, _ in procs:
+            proc.kill()
+            proc.wait()
+
+    while procs:
+        now = time.time()
+        for proc, t0 in list(procs):
+            rc = proc.poll()
+            if rc is None:
+                continue
+            procs.remove((proc, t0))
+            if rc == 0:
+                _stop_all()
+                return "", now - t0, False
+            reason = f"exit {rc}"
+        if not procs:
+            break
+        if timeout is not None and now - started >= timeout:
+            _stop_all()
+            return f"timed out after {now - started:.0f}s", now - started, True
+        if not hedged and hedge_after is not None and now - started >= hedge_after and run.remaining() >= expected:
+            hedged = True
+            count("hedged_attempts")
+            log(f"🪂 {script} が {hedge_after:.1f}s 以内に終わらないため 2 本目を開始")
+            procs.append((subprocess.Popen([sys.executable, script], env=env), now))
+        time.sleep(POLL_INTERVAL)
+    return reason, time.time() - started, False
+
+
+def run_scripts(
+    scripts: List[str],
+    run: Budget,
+    history: DurationHistory,
+    retries: int = 0,
+    errors_log: str = DEFAULT_ERRORS_LOG,
+    hedge: bool = False,
+) -> Dict[str, str]:
+    """
+    スクリプトを順に実行する。戻り値は {script: "ok" / 失敗理由}
+
+    - 履歴のあるスクリプトは予算を history から決めて RSS_DEADLINE で子プロセスに渡し、
+      予算 + SCRIPT_GRACE を過ぎても終わらなければ打ち切る
+    - 履歴の無いスクリプトは予算で打ち切らない（実行全体の締め切り + SCRIPT_GRACE だけに従う）
+    - hedge=True なら history.hedge_after を過ぎた時点で 2 本目を先行開始し、先に成功した方を採用する。
+      負けた方は書き込みの途中で止められ、.cache の JSON や既読ストアの更新も競合するため、
+      フィード・キャッシュ等の共有状態を持たないスクリプトだけで使うこと（site_runner が既読ストア使用時に
+      hedge しないのと同じ理由）
+    """
+    results: Dict[str, str] = {}
+    for script in scripts:
+        if run.expired():
+            results[script] = "skipped: run deadline exceeded"
+            log(f"⏭ 締め切りを過ぎたため実行しません: {script}")
+            _append_error(errors_log, script, results[script])
+            continue
+
+        reason = ""
+        for attempt in range(retries + 1):
+            known = history.expected(script) is not None
+            expected = history.expected(script) or 0.0
+            if attempt > 0 and run.remaining() < expected:
+                log(f"⏭ 残り {run.remaining():.0f}s が想定所要時間 {expected:.0f}s に満たないため再試行しません: {script}")
+                break
+            budget = run.child(history.budget_for(script) if known else None)
+            if known:
+                log(f"▶ Running {script} ...（予算 {budget.remaining():.0f}s）")
+            else:
+                log(f"▶ Running {script} ...（履歴なし。予算で打ち切りません）")
+            env = {**os.environ, ENV_DEADLINE: f"{budget.deadline:.3f}"} if known and budget.deadline else dict(os.environ)
+            timeout = budget.remaining() + SCRIPT_GRACE if budget.deadline is not None else None
+            reason, seconds, timed_out = _run_hedged(
+                script, env, timeout, history.hedge_after(script) if hedge else None, run, expected,
+            )
+            if timed_out:
+                count("budget_exceeded")
+            if not reason or timed_out:
+                # 打ち切った時間も下限として記録し、慢性的に遅いスクリプトの予算を上限まで広げる
+                history.record(script, seconds)
+            if not reason:
+                break
+            log(f"⚠️  {script} failed (attempt {attempt + 1}): {reason}")
+
+        results[script] = reason or "ok"
+        if reason:
+            log(f"::error file={script}::{script} failed after {attempt + 1} attempt ({reason})")
+            _append_error(errors_log, script, f"{reason} after {attempt + 1} attempt")
+    return results
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="RSS スクリプトを締め切りと時間予算つきで順に実行する")
+    parser.add_argument("scripts", nargs="+", help="実行するスクリプト")
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDS",
+                        help=f"実行全体の締め切り（今からの秒数）。省略時は {ENV_RUN_DEADLINE}（UNIX 時刻）")
+    parser.add_argument("--retries", type=int, default=0, help="失敗時の再試行回数（残り時間がある場合のみ）")
+    parser.add_argument("--errors-log", default=DEFAULT_ERRORS_LOG)
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH, metavar="PATH", help="所要時間の履歴の保存先")
+    parser.add_argument("--max-budget", type=float, default=None, metavar="SECONDS",
+                        help=f"スクリプトごとの予算の上限（省略時は {ENV_MAX_SITE_BUDGET} または {MAX_SITE_BUDGET:.0f}）")
+    parser.add_argument("--hedge", action="store_true",
+                        help="遅いスクリプトの 2 本目を先行開始する（共有状態を持たないスクリプトのみ）")
+    args = parser.parse_args()
+
+    run = Budget.after(args.deadline) if args.deadline is not None else (default_budget() or Budget())
+    history = DurationHistory(args.history, max_budget=args.max_budget)
+    try:
+        results = run_scripts(
+            args.scripts, run, history, retries=args.retries, errors_log=args.errors_log, hedge=args.hedge,
+        )
+    finally:
+        history.save()
+    failed = sum(1 for r in results.values() if r != "ok")
+    log(f"\n🏁 {len(results)} スクリプト中 {len(results) - failed} 成功 / {failed} 失敗")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,16 @@ Playwright ロケータからニュース記事を抽出するユーティリテ
 
 - hidden 要素対策として text_content() を使用
 - タイトル列と日付列の行ズレにある程度耐性あり
-- 日本語(YYYY-MM-DD 等)／英語月名(Mon DD, YYYY)を正規表現でパース
+- 日本語(YYYY-MM-DD / 和暦 等)／英語月名(Mon DD, YYYY)を date_parser の共通ルールでパース
 - href は base_url と結合して絶対URL化
+- bulk=True で全行を 1 回の page.evaluate で取得（Playwright との往復回数を行数に依存させない）
+- 待機・行の読み取り・日付パースは instrumentation のスパンで計測（行ごとのログは quiet モードで抑制）
+- iter_items で記事を 1 件ずつ遅延取得。sort_order="desc" なら古い行が出た時点で打ち切り
+- budget（scheduler.Budget）を渡すと待機のタイムアウトを残り時間で頭打ちにし、
+  行の読み取り中に使い切ったらそこまでの記事を返す（省略時は環境変数の締め切りに従う）
+- fingerprints（list_fingerprint.FingerprintStore）を渡すと一覧の行のフィンガープリントを 1 回の evaluate で計算し、
+  前回と同じなら行の読み取り・日付パースを省略して前回の items を返す
+- feed_items=True で記事を dict ではなく feed_item.FeedItem で返す（GUID・日付文字列を 1 回だけ計算。dict と同じキーで読み書き可）
 
 Note:
 - `date_format` は後方互換のための未使用引数として残しています。
@@ -13,10 +21,23 @@ Note:
 
 from __future__ import annotations
 
-import re
 from datetime import datetime, timezone
 from urllib.parse import urljoin
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from date_parser import DEFAULT_RULES, parse_date
+from feed_item import FeedItem
+from instrumentation import count, log, span
+from scheduler import Budget, BudgetExceeded, resolve_budget, timeout_ms
+
+# この日数より古い記事は除外する（delta.days > max_age_days）
+DEFAULT_MAX_AGE_DAYS = 3
+# sort_order に指定できる値（None: 並び順を仮定しない / "desc": 新しい順で、古い行が出たら打ち切り）
+SORT_ORDERS = (None, "desc")
+# 一覧の読み込み・行セレクタの待機の上限（ミリ秒。budget の残り時間でさらに頭打ちにする）
+LIST_TIMEOUT_MS = 120000
+# 日付テキストがあるのに解釈できなかった行のログ
+DATE_FAILURE_MESSAGE = "⚠ 日付の抽出に失敗しました（正規表現にマッチしません）"
 
 
 def _get_first_text_in_parent(parent_locator, selector: Optional[str], start_index: int = 0) -> str:
@@ -76,235 +97,618 @@ def _get_first_attr_in_parent(
             return None
 
 
-def extract_items(
-    page,
-    SELECTOR_DATE: Optional[str],
-    SELECTOR_TITLE: str,
+def _read_row_locator(
+    block1,
+    block2,
     title_selector: Optional[str],
     title_index: int,
     href_selector: Optional[str],
     href_index: int,
-    base_url: str,
     date_selector: Optional[str],
     date_index: int,
-    date_format: Optional[str],  # 互換のため残す（未使用）
-    date_regex: str,
-    max_items: int = 10,
-) -> List[Dict[str, Any]]:
+) -> Tuple[str, Optional[str], str]:
     """
-    Playwright の `page` から記事リストを抽出する。
-
-    Returns:
-        List[Dict]: [{"title": str, "link": str, "description": str, "pub_date": datetime|None}, ...]
+    ロケータ経由で 1 行分の (タイトル, href, 日付テキスト) を取得する
+    block2 が None の場合は日付も block1 から探す
     """
-    # --- ページ安定化 & 可視を要求しない待機（DOMにアタッチされればOK）
-    page.wait_for_load_state("domcontentloaded")
-    page.wait_for_selector(SELECTOR_TITLE, state="attached", timeout=120000)
-    
-    blocks1 = page.locator(SELECTOR_TITLE)
-    count_titles = blocks1.count()
-    print(f"📦 発見した記事数(タイトル側): {count_titles}")
+    # --- タイトル（hidden対策: text_content()）
+    if title_selector:
+        title = _get_first_text_in_parent(block1, title_selector, title_index)
+    else:
+        try:
+            title = (block1.text_content() or "").strip()
+        except Exception:
+            title = ""
 
-    items: List[Dict[str, Any]] = []
+    if not title and title_selector:
+        # a要素のtitle属性フォールバック
+        try:
+            maybe_title = block1.locator(title_selector).nth(title_index).get_attribute("title")
+            if maybe_title:
+                title = maybe_title.strip()
+        except Exception:
+            pass
 
-    # 日付セレクタは存在しない/別行数の可能性があるため独立して扱う
-    blocks2 = page.locator(SELECTOR_DATE) if SELECTOR_DATE else None
-    count_dates = blocks2.count() if blocks2 else 0
-    print(f"🗓 取得可能な日付ブロック数: {count_dates}")
+    # --- URL
+    href = _get_first_attr_in_parent(block1, href_selector, "href", href_index)
 
-    row_count = min(count_titles, max_items)
+    # --- 日付テキスト（title列とdate列の行ズレに耐える）
+    target_for_date = block2 if block2 else block1
+    if date_selector:
+        date_text = _get_first_text_in_parent(target_for_date, date_selector, date_index)
+    else:
+        try:
+            date_text = (target_for_date.text_content() or "").strip()
+        except Exception as e:
+            log(f"⚠ 直接日付取得に失敗: {e}", row=True)
+            date_text = ""
+
+    return title, href, date_text
 
+
+def _iter_rows_locator(
+    blocks1,
+    blocks2,
+    count_dates: int,
+    row_count: int,
+    title_selector: Optional[str],
+    title_index: int,
+    href_selector: Optional[str],
+    href_index: int,
+    date_selector: Optional[str],
+    date_index: int,
+    budget: Optional[Budget] = None,
+) -> Iterator[Optional[Tuple[str, Optional[str], str]]]:
+    """
+    ロケータ経路で先頭 row_count 行を 1 行ずつ読み取る（取得に失敗した行は None）
+    budget を使い切った時点で打ち切る
+    """
     for i in range(row_count):
+        if budget is not None and budget.expired():
+            count("budget_exceeded")
+            log(f"⏱ 時間予算を使い切ったため、{i}行目までで打ち切り")
+            return
         try:
             block1 = blocks1.nth(i)
             block2 = blocks2.nth(i) if (blocks2 and i < count_dates) else None
+            with span("extract.row"):
+                row = _read_row_locator(
+                    block1, block2,
+                    title_selector, title_index,
+                    href_selector, href_index,
+                    date_selector, date_index,
+                )
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            count("row_failures")
+            log(f"⚠ 行{i+1}の解析に失敗: {e}", row=True)
+            row = None
+        yield row
+
+
+# ページ内で全行を一括取得する。_read_row_locator と同じ規則を DOM API で再現し、
+# セレクタが querySelectorAll で解釈できない場合は null を返す（呼び出し側でロケータ経路へ）
+_BULK_ROWS_JS = """
+(args) => {
+  const all = (root, sel) => Array.from(root.querySelectorAll(sel));
+  const firstText = (root, sel, start) => {
+    const els = all(root, sel);
+    for (let k = start; k < els.length; k++) {
+      const t = els[k].textContent || "";
+      if (t.trim()) return t;
+    }
+    return "";
+  };
+  const firstAttr = (root, sel, attr, start) => {
+    if (!sel) return root.getAttribute(attr);
+    const els = all(root, sel);
+    for (let k = start; k < els.length; k++) {
+      const v = els[k].getAttribute(attr);
+      if (v) return v;
+    }
+    return null;
+  };
+
+  let titles, dates;
+  try {
+    titles = all(document, args.rowSel);
+    dates = args.dateRowSel ? all(document, args.dateRowSel) : [];
+    for (const sel of [args.titleSel, args.hrefSel, args.dateSel]) {
+      if (sel) document.querySelector(sel);
+    }
+  } catch (e) {
+    return null;
+  }
+
+  const rows = [];
+  const n = Math.min(titles.length, args.maxItems);
+  for (let i = 0; i < n; i++) {
+    const b1 = titles[i];
+    const b2 = i < dates.length ? dates[i] : null;
+
+    let title = args.titleSel ? firstText(b1, args.titleSel, args.titleIdx) : (b1.textContent || "");
+    if (!title.trim() && args.titleSel) {
+      const el = all(b1, args.titleSel)[args.titleIdx];
+      title = (el && el.getAttribute("title")) || "";
+    }
+    const href = firstAttr(b1, args.hrefSel, "href", args.hrefIdx);
+    const target = b2 || b1;
+    const dateText = args.dateSel ? firstText(target, args.dateSel, args.dateIdx) : (target.textContent || "");
+    rows.push([title, href, dateText]);
+  }
+  return { countTitles: titles.length, countDates: dates.length, rows };
+}
+"""
 
-            # --- タイトル（hidden対策: text_content()）
-            if title_selector:
-                title = _get_first_text_in_parent(block1, title_selector, title_index)
-            else:
-                try:
-                    title = (block1.text_content() or "").strip()
-                except Exception:
-                    title = ""
-
-            if not title and title_selector:
-                # a要素のtitle属性フォールバック
-                try:
-                    maybe_title = block1.locator(title_selector).nth(title_index).get_attribute("title")
-                    if maybe_title:
-                        title = maybe_title.strip()
-                except Exception:
-                    pass
-            print(title)
 
-            # --- URL
-            href = _get_first_attr_in_parent(block1, href_selector, "href", href_index)
-            full_link = urljoin(base_url, href) if href else None
-            print(full_link)
+def _bulk_rows_args(
+    SELECTOR_TITLE: str,
+    SELECTOR_DATE: Optional[str],
+    title_selector: Optional[str],
+    title_index: int,
+    href_selector: Optional[str],
+    href_index: int,
+    date_selector: Optional[str],
+    date_index: int,
+    max_items: int,
+) -> Dict[str, Any]:
+    return {
+        "rowSel": SELECTOR_TITLE,
+        "dateRowSel": SELECTOR_DATE,
+        "titleSel": title_selector,
+        "titleIdx": title_index,
+        "hrefSel": href_selector,
+        "hrefIdx": href_index,
+        "dateSel": date_selector,
+        "dateIdx": date_index,
+        "maxItems": max_items,
+    }
+
+
+def _bulk_rows_result(result: Dict[str, Any]) -> Tuple[int, int, List[Tuple[str, Optional[str], str]]]:
+    rows = [
+        ((title or "").strip(), href, (date_text or "").strip())
+        for title, href, date_text in result["rows"]
+    ]
+    return result["countTitles"], result["countDates"], rows
+
+
+def _collect_rows_bulk(
+    page,
+    SELECTOR_TITLE: str,
+    SELECTOR_DATE: Optional[str],
+    title_selector: Optional[str],
+    title_index: int,
+    href_selector: Optional[str],
+    href_index: int,
+    date_selector: Optional[str],
+    date_index: int,
+    max_items: int,
+) -> Optional[Tuple[int, int, List[Tuple[str, Optional[str], str]]]]:
+    """
+    1 回の page.evaluate で先頭 max_items 行の (タイトル, href, 日付テキスト) を取得する
+    戻り値: (タイトル側件数, 日付側件数, 行リスト)。CSS として扱えないセレクタを含む場合は None
+    """
+    try:
+        with span("extract.bulk"):
+            result = page.evaluate(
+                _BULK_ROWS_JS,
+                _bulk_rows_args(
+                    SELECTOR_TITLE, SELECTOR_DATE,
+                    title_selector, title_index,
+                    href_selector, href_index,
+                    date_selector, date_index,
+                    max_items,
+                ),
+            )
+    except Exception as e:
+        log(f"⚠ 一括抽出に失敗したためロケータ経路で抽出します: {e}")
+        return None
 
-            # --- 日付テキスト（title列とdate列の行ズレに耐える）
-            # --- 日付テキスト（title列とdate列の行ズレに耐える）
-            date_text = ""
-            
-            target_for_date = block2 if block2 else block1
-            
-            if date_selector:
-                date_text = _get_first_text_in_parent(target_for_date, date_selector, date_index)
-            else:
-                try:
-                    date_text = (target_for_date.text_content() or "").strip()
-                except Exception as e:
-                    print(f"⚠ 直接日付取得に失敗: {e}")
-                    date_text = ""
-            print(date_text)
-
-
-            # --- 日付パース（日本語 or 英語の月名に対応）
-                        # --- 日付パース（日本語 or 英語の月名に対応）
-                        # --- 日付パース（日本語 or 英語の月名に対応）
-                      # --- 日付パース（日本語 or 英語の月名に対応）
-            
-                        # --- 日付パース（日本語 or 英語の月名に対応）
-                        # --- 日付パース ---
-                        # --- 日付パース（日本語 or 英語の月名に対応）
-            # --- 日付パース（まず Y年M月D日 を最優先 → その後 MDY/DMY/英語/月欠損の順でフォールバック）---
-            # --- 日付パース（日本語 or 英語の月名に対応）---------------------------------
-            # --- 日付パース（日本語 or 英語の月名に対応）---------------------------------
-                        # --- 日付パース（日本語 or 英語の月名に対応）---------------------------------
-            pub_date: Optional[datetime] = None
+    if result is None:
+        log("ℹ CSS 以外のセレクタを含むためロケータ経路で抽出します")
+        return None
 
-            # 連続スペースなどを正規化（"22  November  2023" → "22 November 2023"）
-            date_text_norm = re.sub(r"\s+", " ", date_text or "").strip()
+    return _bulk_rows_result(result)
 
-            def _num(s: str) -> int:
-                return int(re.sub(r"\D", "", s or ""))
 
-            try:
-                # まずは呼び出し側から渡された正規表現で試す
-                match = re.search(date_regex, date_text_norm) if date_regex else None
-
-                if match:
-                    groups = match.groups()
-                    effective = [g for g in groups if g is not None]
-
-                    if len(effective) == 3:
-                        a, b, c = effective
-
-                        # DMY（例: 22 November 2023 / 22 Nov 2023）
-                        if re.match(r"^[A-Za-z]{3,}$", b):
-                            # まずフル月名 %B、失敗したら短縮 %b
-                            try:
-                                pub_date = datetime.strptime(f"{a} {b} {c}", "%d %B %Y").replace(tzinfo=timezone.utc)
-                            except ValueError:
-                                pub_date = datetime.strptime(f"{a} {b} {c}", "%d %b %Y").replace(tzinfo=timezone.utc)
-
-                        # MDY（例: Aug 6, 2025）※カンマ入りは別ルートで掴むことが多いが保険で対応
-                        elif re.match(r"^[A-Za-z]{3,}$", a) and ("," in date_text_norm):
-                            # "Aug 6, 2025" / "August 6, 2025"
-                            try:
-                                pub_date = datetime.strptime(f"{a} {int(_num(b))}, {int(_num(c))}", "%b %d, %Y").replace(tzinfo=timezone.utc)
-                            except ValueError:
-                                pub_date = datetime.strptime(f"{a} {int(_num(b))}, {int(_num(c))}", "%B %d, %Y").replace(tzinfo=timezone.utc)
-
-                        else:
-                            # 数値系（YMD 等）フォールバック
-                            year, month, day = _num(a), _num(b), _num(c)
-                            if year < 100:
-                                year += 2000
-                            pub_date = datetime(year, month, day, tzinfo=timezone.utc)
-
-                    elif len(effective) == 2:
-                        # 年月だけのケース（順不同対応）
-                        x, y = effective
-                        xn, yn = _num(x), _num(y)
-                        if len(str(xn)) == 4:
-                            year, mo = xn, yn
-                        elif len(str(yn)) == 4:
-                            year, mo = yn, xn
-                        else:
-                            raise ValueError("Year not found in two-group date")
-                        if year < 100:
-                            year += 2000
-                        pub_date = datetime(year, mo, 1, tzinfo=timezone.utc)
-
-                    else:
-                        print("⚠ 想定外のグループ構成でした（date_regexを見直してください）")
-
-                else:
-                    # ---------- セカンダリの複合フォールバック ----------
-                    # 1) DMY（フル/短縮月名）
-                    m = re.search(r"(\d{1,2})\s+([A-Za-z]{3,})\s+(\d{4})", date_text_norm)
-                    if m:
-                        d, mon, y = m.groups()
-                        try:
-                            pub_date = datetime.strptime(f"{d} {mon} {y}", "%d %B %Y").replace(tzinfo=timezone.utc)
-                        except ValueError:
-                            pub_date = datetime.strptime(f"{d} {mon} {y}", "%d %b %Y").replace(tzinfo=timezone.utc)
-                    else:
-                        # 2) MDY（英語月名 + 日, 年）
-                        m2 = re.search(r"([A-Za-z]{3,})\s+(\d{1,2}),\s+(\d{4})", date_text_norm)
-                        if m2:
-                            mon, d, y = m2.groups()
-                            try:
-                                pub_date = datetime.strptime(f"{mon} {d}, {y}", "%b %d, %Y").replace(tzinfo=timezone.utc)
-                            except ValueError:
-                                pub_date = datetime.strptime(f"{mon} {d}, {y}", "%B %d, %Y").replace(tzinfo=timezone.utc)
-                        else:
-                            # 3) 日本語「M月 YYYY」→ day=1 補完
-                            m3 = re.search(r"(\d{1,2})月\s+(\d{4})", date_text_norm)
-                            if m3:
-                                mo, y = map(_num, m3.groups())
-                                if y < 100:
-                                    y += 2000
-                                pub_date = datetime(y, mo, 1, tzinfo=timezone.utc)
-                            else:
-                                # 4) 数値 Y-M-D
-                                m4 = re.search(r"(\d{4})[./-](\d{1,2})[./-](\d{1,2})", date_text_norm)
-                                if m4:
-                                    y, mo, d = map(_num, m4.groups())
-                                    pub_date = datetime(y, mo, d, tzinfo=timezone.utc)
-                                else:
-                                    print("⚠ 日付の抽出に失敗しました（正規表現にマッチしません）")
-            except Exception as e:
-                print(f"⚠ 日付パースに失敗: {e}")
-                pub_date = None
-
-# --------------------------------------------------------------------------
-
-            if SELECTOR_DATE is None:
-                pub_date = None
-
-            print(pub_date)
+async def collect_rows_bulk_async(
+    page,
+    SELECTOR_TITLE: str,
+    SELECTOR_DATE: Optional[str],
+    title_selector: Optional[str],
+    title_index: int,
+    href_selector: Optional[str],
+    href_index: int,
+    date_selector: Optional[str],
+    date_index: int,
+    max_items: int,
+) -> Optional[Tuple[int, int, List[Tuple[str, Optional[str], str]]]]:
+    """_collect_rows_bulk の async Playwright 版（evaluate の例外はそのまま送出する）"""
+    with span("extract.bulk"):
+        result = await page.evaluate(
+            _BULK_ROWS_JS,
+            _bulk_rows_args(
+                SELECTOR_TITLE, SELECTOR_DATE,
+                title_selector, title_index,
+                href_selector, href_index,
+                date_selector, date_index,
+                max_items,
+            ),
+        )
+    return _bulk_rows_result(result) if result is not None else None
+
+
+def _check_sort_order(sort_order: Optional[str]) -> None:
+    if sort_order not in SORT_ORDERS:
+        raise ValueError(f"sort_order は {SORT_ORDERS} のいずれかを指定してください: {sort_order!r}")
+
+
+def _iter_candidates(
+    rows: Iterable[Optional[Tuple[str, Optional[str], str]]],
+    base_url: str,
+    SELECTOR_DATE: Optional[str],
+    date_regex: Optional[str],
+    max_age_days: int,
+    sort_order: Optional[str],
+    feed_items: bool,
+    rules: Tuple[str, ...],
+    date_failure_message: str,
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """_iter_built_items の前段。既読ストア以外の条件を満たした記事を (行番号, item) で返す"""
+    now = datetime.now(timezone.utc)
+
+    for i, row in enumerate(rows):
+        if row is None:
+            continue
+        count("rows_seen")
+        try:
+            title, href, date_text = row
+            log(title, row=True)
+
+            # --- URL
+            full_link = urljoin(base_url, href) if href else None
+            log(full_link, row=True)
+            log(date_text, row=True)
+
+            # --- 日付パース（date_parser の共通ルール）
+            pub_date: Optional[datetime] = None
+            if SELECTOR_DATE is not None:
+                with span("parse_date"):
+                    pub_date = parse_date(date_text, date_regex, rules)
+                if pub_date is None and date_text:
+                    count("date_parse_failures")
+                    log(date_failure_message, row=True)
+
+            log(pub_date, row=True)
             
             if pub_date:
-                now = datetime.now(timezone.utc)
                 delta = now - pub_date
-                if delta.days > 3:
-                    print(f"⏳ {pub_date} は3日より古いためスキップ")
+                if delta.days > max_age_days:
+                    count("rows_skipped_old")
+                    if sort_order == "desc":
+                        count("early_stops")
+                        log(f"⏹ {pub_date} は{max_age_days}日より古いため、以降の行は読み取らずに終了（{i+1}行目）")
+                        return
+                    log(f"⏳ {pub_date} は{max_age_days}日より古いためスキップ", row=True)
                     continue
             
             # --- 必須フィールドチェック
             if not title:
-                print(f"⚠ タイトルが空のためスキップ（{i+1}行目）")
-                continue
-            
-            # --- 必須フィールドチェック
-            if not title:
-                print(f"⚠ タイトルが空のためスキップ（{i+1}行目）")
+                count("rows_skipped_empty_title")
+                log(f"⚠ タイトルが空のためスキップ（{i+1}行目）", row=True)
                 continue
 
-            items.append(
-                {
-                    "title": title,
-                    "link": full_link,         # ← 絶対URLを格納
-                    "description": title,
-                    "pub_date": pub_date,
-                }
+            # feed_items=True なら feed_item.FeedItem（dict と同じキーで読み書きできる）
+            item = (FeedItem if feed_items else dict)(
+                title=title,
+                link=full_link,         # ← 絶対URLを格納
+                description=title,
+                pub_date=pub_date,
             )
+            yield i, item
 
         except Exception as e:
-            print(f"⚠ 行{i+1}の解析に失敗: {e}")
+            count("row_failures")
+            log(f"⚠ 行{i+1}の解析に失敗: {e}", row=True)
             continue
 
+
+def _iter_built_items(
+    rows: Iterable[Optional[Tuple[str, Optional[str], str]]],
+    base_url: str,
+    SELECTOR_DATE: Optional[str],
+    date_regex: Optional[str],
+    max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    sort_order: Optional[str] = None,
+    seen=None,
+    feed_items: bool = False,
+    rules: Tuple[str, ...] = DEFAULT_RULES,
+    date_failure_message: str = DATE_FAILURE_MESSAGE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    行ごとの (タイトル, href, 日付テキスト) から記事を 1 件ずつ組み立てて返す
+    日付パース・古い記事の除外・必須フィールドチェックはここで行う（行取得の経路に依存しない）
+    None の行は取得失敗としてスキップする
+    sort_order="desc"（新しい順の一覧）の場合は max_age_days より古い最初の行で打ち切り、
+    以降の行は読み取らない（rows がロケータ経路のジェネレータならブラウザとの往復も発生しない）
+    rules / date_failure_message は日付パースの組み込みルールと失敗時のログ（scraper_utils2 は和暦用を渡す）
+    既読ストアの照会は seen.prefetch で 1 ページ分をまとめて 1 回にする（sort_order="desc" でロケータ経路の
+    ジェネレータが渡された場合だけは、打ち切り後の行を読まないよう 1 行ずつ照会する）
+    """
+    _check_sort_order(sort_order)
+    candidates: Iterable[Tuple[int, Dict[str, Any]]] = _iter_candidates(
+        rows, base_url, SELECTOR_DATE, date_regex, max_age_days, sort_order, feed_items, rules, date_failure_message,
+    )
+    if seen is not None and hasattr(seen, "prefetch") and (sort_order != "desc" or isinstance(rows, (list, tuple))):
+        candidates = list(candidates)
+        seen.prefetch([item for _, item in candidates], base_url)
+
+    for i, item in candidates:
+        try:
+            # --- 既読ストアにある記事は除外（新しい順の一覧なら以降も既知なので打ち切り）
+            if seen is not None and seen.check(item, base_url):
+                count("rows_skipped_seen")
+                if sort_order == "desc":
+                    count("early_stops")
+                    log(f"⏹ 既知の記事に到達したため、以降の行は読み取らずに終了（{i+1}行目）")
+                    return
+                log(f"♻ 既知の記事のためスキップ: {item['title']}", row=True)
+                continue
+        except Exception as e:
+            count("row_failures")
+            log(f"⚠ 行{i+1}の解析に失敗: {e}", row=True)
+            continue
+
+        yield item
+
+
+def _build_items(
+    rows: Iterable[Optional[Tuple[str, Optional[str], str]]],
+    base_url: str,
+    SELECTOR_DATE: Optional[str],
+    date_regex: Optional[str],
+    max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    sort_order: Optional[str] = None,
+    seen=None,
+    feed_items: bool = False,
+    rules: Tuple[str, ...] = DEFAULT_RULES,
+    date_failure_message: str = DATE_FAILURE_MESSAGE,
+) -> List[Dict[str, Any]]:
+    """_iter_built_items の結果をリストで返す"""
+    return list(_iter_built_items(
+        rows, base_url, SELECTOR_DATE, date_regex, max_age_days, sort_order, seen, feed_items,
+        rules, date_failure_message,
+    ))
+
+
+def _wait_for_list(
+    page, SELECTOR_TITLE: str, budget: Optional[Budget] = None, timeout: int = LIST_TIMEOUT_MS
+) -> None:
+    # --- ページ安定化 & 可視を要求しない待機（DOMにアタッチされればOK）
+    with span("wait_for_load_state"):
+        page.wait_for_load_state("domcontentloaded", timeout=timeout_ms(budget, timeout))
+    with span("wait_for_selector"):
+        page.wait_for_selector(SELECTOR_TITLE, state="attached", timeout=timeout_ms(budget, timeout))
+
+
+def _until_budget(items: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    一覧の待機後に BudgetExceeded で打ち切られた場合は、それまでに組み立てた記事だけで終える
+    （一覧の待機自体が間に合わなかった場合は呼び出し側で送出させるため、待機の後に使う）
+    """
+    built = 0
+    try:
+        for item in items:
+            built += 1
+            yield item
+    except BudgetExceeded:
+        count("budget_exceeded")
+        log(f"⏱ 時間予算を使い切ったため、{built} 件で抽出を打ち切り")
+
+
+def _extract_fingerprinted(
+    page,
+    fingerprints,
+    config: Dict[str, Any],
+    SELECTOR_TITLE: str,
+    SELECTOR_DATE: Optional[str],
+    max_items: int,
+    max_age_days: int,
+    seen,
+    budget: Optional[Budget],
+    extract,
+) -> List[Dict[str, Any]]:
+    """
+    一覧の行のフィンガープリントが前回と同じなら前回の items を返し、違えば extract(waited=True) の結果を保存して返す
+    既読ストア（seen）を使う場合、前回の記事はすべて既知なので一致時は空リスト
+    """
+    _wait_for_list(page, SELECTOR_TITLE, budget)
+    cached = fingerprints.check(page, SELECTOR_TITLE, SELECTOR_DATE, max_items, config, max_age_days)
+    if cached is not None:
+        return [] if seen is not None else cached
+    # 一覧は上で待機済みなので extract 側では待たない
+    items = extract(waited=True)
+    # 時間予算を使い切って途中で打ち切った結果は保存しない
+    if budget is None or not budget.expired():
+        fingerprints.store(page.url, items)
     return items
+
+
+def _iter_rows(
+    page,
+    SELECTOR_DATE: Optional[str],
+    SELECTOR_TITLE: str,
+    title_selector: Optional[str],
+    title_index: int,
+    href_selector: Optional[str],
+    href_index: int,
+    date_selector: Optional[str],
+    date_index: int,
+    max_items: int,
+    bulk: bool,
+    budget: Optional[Budget] = None,
+    waited: bool = False,
+) -> Iterator[Optional[Tuple[str, Optional[str], str]]]:
+    """
+    ページの待機後、先頭 max_items 行の (タイトル, href, 日付テキスト) を順に返す
+    bulk=True なら 1 回の evaluate で全行を取得（CSS 以外のセレクタなら従来経路へ）
+    ロケータ経路は消費された行だけを読み取る
+    待機のタイムアウトは budget の残り時間で頭打ちにする（waited=True なら呼び出し側で待機済みとして省略）
+    """
+    if not waited:
+        _wait_for_list(page, SELECTOR_TITLE, budget)
+
+    bulk_result = _collect_rows_bulk(
+        page, SELECTOR_TITLE, SELECTOR_DATE,
+        title_selector, title_index,
+        href_selector, href_index,
+        date_selector, date_index,
+        max_items,
+    ) if bulk else None
+
+    if bulk_result is not None:
+        count_titles, count_dates, bulk_rows = bulk_result
+        blocks1 = blocks2 = None
+    else:
+        bulk_rows = None
+        blocks1 = page.locator(SELECTOR_TITLE)
+        count_titles = blocks1.count()
+        # 日付セレクタは存在しない/別行数の可能性があるため独立して扱う
+        blocks2 = page.locator(SELECTOR_DATE) if SELECTOR_DATE else None
+        count_dates = blocks2.count() if blocks2 else 0
+    log(f"📦 発見した記事数(タイトル側): {count_titles}")
+    log(f"🗓 取得可能な日付ブロック数: {count_dates}")
+
+    if bulk_rows is not None:
+        yield from bulk_rows
+    else:
+        yield from _iter_rows_locator(
+            blocks1, blocks2, count_dates, min(count_titles, max_items),
+            title_selector, title_index,
+            href_selector, href_index,
+            date_selector, date_index,
+            budget,
+        )
+
+
+def iter_items(
+    page,
+    SELECTOR_DATE: Optional[str],
+    SELECTOR_TITLE: str,
+    title_selector: Optional[str],
+    title_index: int,
+    href_selector: Optional[str],
+    href_index: int,
+    base_url: str,
+    date_selector: Optional[str],
+    date_index: int,
+    date_format: Optional[str],  # 互換のため残す（未使用）
+    date_regex: str,
+    max_items: int = 10,
+    bulk: bool = False,
+    max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    sort_order: Optional[str] = None,
+    seen=None,
+    budget: Optional[Budget] = None,
+    feed_items: bool = False,
+    waited: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    extract_items のジェネレータ版。記事を 1 件ずつ返し、行は必要になった時点で読み取る。
+
+    sort_order="desc" を指定すると（一覧が新しい順に並んでいる前提で）max_age_days より
+    古い最初の行で打ち切る。ロケータ経路ではそれ以降の行に対するブラウザとの往復が発生しない。
+    先頭に古い固定記事がある一覧では打ち切られてしまうため None（既定）のままにすること。
+    budget（scheduler.Budget）を省略すると環境変数 RSS_DEADLINE / RSS_RUN_DEADLINE の締め切りに従う。
+    一覧の表示を待つ間に使い切った場合は BudgetExceeded を送出し、行の読み取り中に使い切った場合は
+    それまでの記事で終える。
+    waited=True なら一覧の待機（_wait_for_list）を呼び出し側で済ませたものとして省略する。
+    """
+    _check_sort_order(sort_order)
+    budget = resolve_budget(budget)
+    if not waited:
+        _wait_for_list(page, SELECTOR_TITLE, budget)
+    rows = _iter_rows(
+        page, SELECTOR_DATE, SELECTOR_TITLE,
+        title_selector, title_index,
+        href_selector, href_index,
+        date_selector, date_index,
+        max_items, bulk, budget, waited=True,
+    )
+    yield from _until_budget(
+        _iter_built_items(rows, base_url, SELECTOR_DATE, date_regex, max_age_days, sort_order, seen, feed_items)
+    )
+
+
+def extract_items(
+    page,
+    SELECTOR_DATE: Optional[str],
+    SELECTOR_TITLE: str,
+    title_selector: Optional[str],
+    title_index: int,
+    href_selector: Optional[str],
+    href_index: int,
+    base_url: str,
+    date_selector: Optional[str],
+    date_index: int,
+    date_format: Optional[str],  # 互換のため残す（未使用）
+    date_regex: str,
+    max_items: int = 10,
+    bulk: bool = False,
+    max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    sort_order: Optional[str] = None,
+    seen=None,
+    budget: Optional[Budget] = None,
+    fingerprints=None,
+    feed_items: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Playwright の `page` から記事リストを抽出する。
+
+    bulk=True の場合は行セレクタ・インデックス・属性名をページへ一度だけ送り、
+    全行の (タイトル, href, 日付テキスト) を 1 回の `page.evaluate` で受け取る。
+    日付パースとフィルタは従来どおり Python 側で行うため、戻り値は bulk=False と同一。
+    セレクタが素の CSS として解釈できない場合（text= / xpath= / :has-text 等）は
+    自動的に従来のロケータ経路で抽出する。
+
+    max_age_days より古い記事は除外する。sort_order="desc" / budget の挙動は iter_items を参照。
+
+    fingerprints（list_fingerprint.FingerprintStore）を渡すと、一覧の先頭 max_items 行が前回と同じ場合は
+    行を読み取らずに前回の items を返す（fingerprints.unchanged(page.url) が True になる）。
+
+    feed_items=True の場合は各記事を feed_item.FeedItem で返す（キーは dict と同じ）。
+
+    Returns:
+        List[Dict]: [{"title": str, "link": str, "description": str, "pub_date": datetime|None}, ...]
+    """
+    budget = resolve_budget(budget)
+
+    def _extract(waited: bool = False) -> List[Dict[str, Any]]:
+        return list(iter_items(
+            page, SELECTOR_DATE, SELECTOR_TITLE,
+            title_selector, title_index,
+            href_selector, href_index,
+            base_url,
+            date_selector, date_index,
+            date_format, date_regex,
+            max_items=max_items, bulk=bulk,
+            max_age_days=max_age_days, sort_order=sort_order, seen=seen, budget=budget, feed_items=feed_items,
+            waited=waited,
+        ))
+
+    if fingerprints is None:
+        return _extract()
+    config = {
+        "engine": __name__, "SELECTOR_DATE": SELECTOR_DATE, "SELECTOR_TITLE": SELECTOR_TITLE,
+        "title_selector": title_selector, "title_index": title_index,
+        "href_selector": href_selector, "href_index": href_index, "base_url": base_url,
+        "date_selector": date_selector, "date_index": date_index, "date_regex": date_regex,
+        "max_items": max_items, "sort_order": sort_order,
+    }
+    items = _extract_fingerprinted(
+        page, fingerprints, config, SELECTOR_TITLE, SELECTOR_DATE, max_items, max_age_days, seen, budget, _extract,
+    )
+    # 前回の items（フィンガープリント一致時）は dict で保存されている
+    return [FeedItem.from_dict(item) for item in items] if feed_items else items
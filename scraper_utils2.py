@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 """
-Playwright ロケータからニュース記事を抽出するユーティリティ（令和専用簡易版）
+Playwright ロケータからニュース記事を抽出するユーティリティ（和暦専用簡易版）
 
 - hidden 要素対策として text_content() を使用
 - タイトル列と日付列の行ズレにある程度耐性あり
-- 日付は「令和N年M月D日」のみ対応（それ以外は pub_date=None）
+- 日付は和暦「令和/平成N年M月D日」（元年・全角数字可）のみ対応（それ以外は pub_date=None）
 - href は base_url と結合して絶対URL化
+- bulk=True で全行を 1 回の page.evaluate で取得（行の読み取りは scraper_utils と共通）
+- 記事の組み立て（日付パース・フィルタ・既読判定）も scraper_utils._iter_built_items に和暦ルールを渡して共用
+- iter_items で記事を 1 件ずつ遅延取得。sort_order="desc" なら古い行が出た時点で打ち切り
 
 Note:
 - `date_format` / `date_regex` は後方互換のための未使用引数として残しています。
@@ -13,67 +16,97 @@ Note:
 
 from __future__ import annotations
 
-import re
-from datetime import datetime, timezone
-from urllib.parse import urljoin
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from date_parser import WAREKI_RULES
+from feed_item import FeedItem
+from scheduler import Budget, resolve_budget
+from scraper_utils import (
+    DEFAULT_MAX_AGE_DAYS,
+    _check_sort_order,
+    _extract_fingerprinted,
+    _iter_built_items as _iter_built_items_common,
+    _iter_rows,
+    _until_budget,
+    _wait_for_list,
+)
 
-def _get_first_text_in_parent(parent_locator, selector: Optional[str], start_index: int = 0) -> str:
-    """
-    親ロケータ内の selector に一致する要素を start_index から順に調べ、
-    最初にテキストを取得できた要素のテキストを返す（親範囲外には出ない）
-    ※ hidden 対応のため inner_text() ではなく text_content() を使用
-    """
-    try:
-        elements = parent_locator.locator(selector)
-        count = elements.count()
-    except Exception:
-        return ""
-
-    for idx in range(start_index, count):
-        try:
-            txt = (elements.nth(idx).text_content() or "").strip()
-            if txt:
-                return txt
-        except Exception:
-            continue
-    return ""
-
-
-def _get_first_attr_in_parent(
-    parent_locator,
-    selector: Optional[str],
-    attr: str,
-    start_index: int = 0,
-) -> Optional[str]:
+
+# 和暦の日付テキストがあるのに解釈できなかった行のログ
+DATE_FAILURE_MESSAGE = "⚠ 和暦形式の日付が見つかりませんでした（pub_date=None）"
+
+
+def _iter_built_items(
+    rows: Iterable[Optional[Tuple[str, Optional[str], str]]],
+    base_url: str,
+    SELECTOR_DATE: Optional[str],
+    date_regex: Optional[str],   # 互換のため残す（未使用）
+    max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    sort_order: Optional[str] = None,
+    seen=None,
+    feed_items: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """scraper_utils._iter_built_items の和暦版（日付は WAREKI_RULES だけで解釈し、date_regex は使わない）"""
+    return _iter_built_items_common(
+        rows, base_url, SELECTOR_DATE, None, max_age_days, sort_order, seen, feed_items,
+        rules=WAREKI_RULES, date_failure_message=DATE_FAILURE_MESSAGE,
+    )
+
+
+def _build_items(
+    rows: Iterable[Optional[Tuple[str, Optional[str], str]]],
+    base_url: str,
+    SELECTOR_DATE: Optional[str],
+    date_regex: Optional[str],   # 互換のため残す（未使用）
+    max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    sort_order: Optional[str] = None,
+    seen=None,
+    feed_items: bool = False,
+) -> List[Dict[str, Any]]:
+    """_iter_built_items の結果をリストで返す"""
+    return list(_iter_built_items(rows, base_url, SELECTOR_DATE, date_regex, max_age_days, sort_order, seen, feed_items))
+
+
+def iter_items(
+    page,
+    SELECTOR_DATE: Optional[str],
+    SELECTOR_TITLE: str,
+    title_selector: Optional[str],
+    title_index: int,
+    href_selector: Optional[str],
+    href_index: int,
+    base_url: str,
+    date_selector: Optional[str],
+    date_index: int,
+    date_format: Optional[str],  # 互換のため残す（未使用）
+    date_regex: str,             # 互換のため残す（未使用）
+    max_items: int = 500,
+    bulk: bool = False,
+    max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    sort_order: Optional[str] = None,
+    seen=None,
+    budget: Optional[Budget] = None,
+    feed_items: bool = False,
+    waited: bool = False,
+) -> Iterator[Dict[str, Any]]:
     """
-    親ロケータ内の selector に一致する要素を start_index から順に調べ、
-    最初に attr を取得できた要素の値を返す（親範囲外には出ない）
-    selector が空/None の場合は親自身から attr を取得する
+    extract_items のジェネレータ版（和暦表記専用簡易版）。
+    sort_order="desc" / budget / waited の挙動は scraper_utils.iter_items と同じ。
     """
-    if selector:
-        try:
-            elements = parent_locator.locator(selector)
-            count = elements.count()
-        except Exception:
-            return None
-
-        for idx in range(start_index, count):
-            try:
-                val = elements.nth(idx).get_attribute(attr)
-                if val:
-                    return val
-            except Exception:
-                continue
-        return None
-    else:
-        # 親自身が <a> 等で href を持つケース
-        try:
-            val = parent_locator.get_attribute(attr)
-            return val
-        except Exception:
-            return None
+    _check_sort_order(sort_order)
+    budget = resolve_budget(budget)
+    if not waited:
+        _wait_for_list(page, SELECTOR_TITLE, budget)
+    rows = _iter_rows(
+        page, SELECTOR_DATE, SELECTOR_TITLE,
+        title_selector, title_index,
+        href_selector, href_index,
+        date_selector, date_index,
+        max_items, bulk, budget, waited=True,
+    )
+    yield from _until_budget(
+        _iter_built_items(rows, base_url, SELECTOR_DATE, date_regex, max_age_days, sort_order, seen, feed_items)
+    )
 
 
 def extract_items(
@@ -90,148 +123,49 @@ def extract_items(
     date_format: Optional[str],  # 互換のため残す（未使用）
     date_regex: str,             # 互換のため残す（未使用）
     max_items: int = 500,
+    bulk: bool = False,
+    max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    sort_order: Optional[str] = None,
+    seen=None,
+    budget: Optional[Budget] = None,
+    fingerprints=None,
+    feed_items: bool = False,
 ) -> List[Dict[str, Any]]:
     """
-    Playwright の `page` から記事リストを抽出する（令和表記専用簡易版）。
+    Playwright の `page` から記事リストを抽出する（和暦表記専用簡易版）。
+
+    bulk=True / fingerprints / feed_items の挙動は scraper_utils.extract_items と同じ（戻り値は bulk=False と同一）。
+    max_age_days より古い記事は除外する。sort_order="desc" / budget の挙動は scraper_utils.iter_items を参照。
 
     Returns:
         List[Dict]: [{"title": str, "link": str, "description": str, "pub_date": datetime|None}, ...]
     """
-    # --- ページ安定化 & 可視を要求しない待機（DOMにアタッチされればOK）
-    page.wait_for_load_state("domcontentloaded")
-    page.wait_for_selector(SELECTOR_TITLE, state="attached", timeout=120000)
-
-    blocks1 = page.locator(SELECTOR_TITLE)
-    count_titles = blocks1.count()
-    print(f"📦 発見した記事数(タイトル側): {count_titles}")
-
-    items: List[Dict[str, Any]] = []
-
-    # 日付セレクタは存在しない/別行数の可能性があるため独立して扱う
-    blocks2 = page.locator(SELECTOR_DATE) if SELECTOR_DATE else None
-    count_dates = blocks2.count() if blocks2 else 0
-    print(f"🗓 取得可能な日付ブロック数: {count_dates}")
-
-    row_count = min(count_titles, max_items)
-
-    for i in range(row_count):
-        try:
-            block1 = blocks1.nth(i)
-            block2 = blocks2.nth(i) if (blocks2 and i < count_dates) else None
-
-            # --- タイトル（hidden対策: text_content()）
-            if title_selector:
-                title = _get_first_text_in_parent(block1, title_selector, title_index)
-            else:
-                try:
-                    title = (block1.text_content() or "").strip()
-                except Exception:
-                    title = ""
-
-            if not title and title_selector:
-                # a要素のtitle属性フォールバック
-                try:
-                    maybe_title = block1.locator(title_selector).nth(title_index).get_attribute("title")
-                    if maybe_title:
-                        title = maybe_title.strip()
-                except Exception:
-                    pass
-            print(title)
-
-            # --- URL
-            href = _get_first_attr_in_parent(block1, href_selector, "href", href_index)
-            full_link = urljoin(base_url, href) if href else None
-            print(full_link)
-
-            # --- 日付テキスト（title列とdate列の行ズレに耐える）
-            date_text = ""
-            target_for_date = block2 if block2 else block1
-
-            if date_selector:
-                date_text = _get_first_text_in_parent(target_for_date, date_selector, date_index)
-            else:
-                try:
-                    date_text = (target_for_date.text_content() or "").strip()
-                except Exception as e:
-                    print(f"⚠ 直接日付取得に失敗: {e}")
-                    date_text = ""
-            print(date_text)
-
-            # --- 日付パース（令和のみ対応）---------------------------------
-            pub_date: Optional[datetime] = None
-
-            # 連続スペースなどを正規化
-            date_text_norm = re.sub(r"\s+", " ", date_text or "").strip()
-
-            # 全角数字 → 半角数字
-            def _to_ascii_digits(s: str) -> str:
-                table = str.maketrans({chr(ord("０") + i): str(i) for i in range(10)})
-                return (s or "").translate(table)
-
-            def _num(s: str) -> int:
-                s = _to_ascii_digits(s)
-                return int(re.sub(r"\D", "", s))
-
-            try:
-                # 令和N年M月D日 / 令和Ｎ年Ｍ月Ｄ日 / 令和元年M月D日 だけを扱う
-                m_reiwa = re.search(
-                    r"令和\s*([0-9０-９]{1,2}|元)年\s*([0-9０-９]{1,2})月\s*([0-9０-９]{1,2})日",
-                    date_text_norm,
-                )
-
-                if m_reiwa:
-                    nen, mo, d = m_reiwa.groups()
-
-                    # 「元年」対応（想定しないなら常に _num でもOK）
-                    if nen == "元":
-                        nen_i = 1
-                    else:
-                        nen_i = _num(nen)
-
-                    mo_i = _num(mo)
-                    d_i = _num(d)
-
-                    # 令和1年 = 2019年 → 2018 + N
-                    year = 2018 + nen_i
-                    pub_date = datetime(year, mo_i, d_i, tzinfo=timezone.utc)
-                else:
-                    # 令和表記が無ければ pub_date は None のまま
-                    print("⚠ 令和形式の日付が見つかりませんでした（pub_date=None）")
-
-            except Exception as e:
-                print(f"⚠ 日付パースに失敗: {e}")
-                pub_date = None
-
-            # ------------------------------------------------------------------
-            if SELECTOR_DATE is None:
-                pub_date = None
-
-            print(pub_date)
-
-            # pub_date がある場合のみ「3日以内」フィルタを適用
-            if pub_date:
-                now = datetime.now(timezone.utc)
-                delta = now - pub_date
-                if delta.days > 3:
-                    print(f"⏳ {pub_date} は3日より古いためスキップ")
-                    continue
-
-            # --- 必須フィールドチェック
-            if not title:
-                print(f"⚠ タイトルが空のためスキップ（{i+1}行目）")
-                continue
-
-            items.append(
-                {
-                    "title": title,
-                    "link": full_link,   # ← 絶対URLを格納
-                    "description": title,
-                    "pub_date": pub_date,
-                }
-            )
-
-        except Exception as e:
-            print(f"⚠ 行{i+1}の解析に失敗: {e}")
-            continue
-
-    return items
+    budget = resolve_budget(budget)
+
+    def _extract(waited: bool = False) -> List[Dict[str, Any]]:
+        return list(iter_items(
+            page, SELECTOR_DATE, SELECTOR_TITLE,
+            title_selector, title_index,
+            href_selector, href_index,
+            base_url,
+            date_selector, date_index,
+            date_format, date_regex,
+            max_items=max_items, bulk=bulk,
+            max_age_days=max_age_days, sort_order=sort_order, seen=seen, budget=budget, feed_items=feed_items,
+            waited=waited,
+        ))
+
+    if fingerprints is None:
+        return _extract()
+    config = {
+        "engine": __name__, "SELECTOR_DATE": SELECTOR_DATE, "SELECTOR_TITLE": SELECTOR_TITLE,
+        "title_selector": title_selector, "title_index": title_index,
+        "href_selector": href_selector, "href_index": href_index, "base_url": base_url,
+        "date_selector": date_selector, "date_index": date_index,
+        "max_items": max_items, "sort_order": sort_order,
+    }
+    items = _extract_fingerprinted(
+        page, fingerprints, config, SELECTOR_TITLE, SELECTOR_DATE, max_items, max_age_days, seen, budget, _extract,
+    )
+    # 前回の items（フィンガープリント一致時）は dict で保存されている
+    return [FeedItem.from_dict(item) for item in items] if feed_items else items
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+取得済み記事の GUID を SQLite に保存し、実行をまたいで重複を除くためのストア
+
+- キーは generate_rss が出力する GUID（rss_utils.make_guid）。初回確認日時と最終確認日時を保持
+- check(item, base_url): 既知なら True。未知なら保留として記録し、日付の無い記事には
+  初回確認日時を pub_date として付与する（GUID は日付なしで計算した値を item["guid"] に固定）
+- prefetch(items, base_url): 1 ページ分の GUID を known() でまとめて引き、続く check() で行ごとの SELECT を省く
+- commit(): 保留分を 1 回の executemany でまとめて upsert（フィードを書き出した後に呼ぶ）
+- for_site(site): 保留を site 単位で記録するビュー。commit(site) / discard(site) が他のサイトの保留に触れない
+- prune(): 一定期間確認されていない GUID を削除
+
+既知の記事は抽出結果から除かれるため、generate_rss(incremental=True) と組み合わせて使う
+（既存フィードの記事はマージで残る）。
+
+例:
+    with SeenStore() as seen:
+        items = extract_items(page, ..., seen=seen)
+        generate_rss(items, OUTPUT_PATH, BASE_URL, GAKKAI, incremental=True)
+        seen.commit()
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from instrumentation import log
+from rss_utils import make_guid
+
+DEFAULT_SEEN_PATH = os.path.join(".cache", "seen_items.sqlite3")
+# この日数以上確認されていない GUID は prune() で削除
+DEFAULT_PRUNE_DAYS = 90
+# IN 句 1 回あたりの GUID 数（SQLite のパラメータ数上限より十分小さく）
+_LOOKUP_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_items (
+    guid       TEXT PRIMARY KEY,
+    site       TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen  REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS seen_items_last_seen ON seen_items (last_seen);
+CREATE INDEX IF NOT EXISTS seen_items_site ON seen_items (site);
+"""
+
+
+class SeenStore:
+    """GUID → 初回/最終確認日時 を保持する SQLite ストア（書き込みは commit() でまとめて行う）"""
+
+    def __init__(self, path: str = DEFAULT_SEEN_PATH):
+        self.path = path
+        dirpath = os.path.dirname(path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+        # guid -> (site, first_seen, last_seen)。first_seen が None なら既知（last_seen のみ更新）
+        self._pending: Dict[str, Tuple[str, Optional[float], float]] = {}
+        # prefetch() で引いた guid -> 登録済みか（次の check() で 1 回だけ使う）
+        self._prefetched: Dict[str, bool] = {}
+        self.stats = {"known": 0, "new": 0}
+
+    def __enter__(self) -> "SeenStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # 例外で抜けた場合は保留分を書き込まない（フィード未出力の記事を既読にしない）
+        self.close(commit=exc_type is None)
+
+    def for_site(self, site: str) -> "SiteSeen":
+        """check() の保留を site として記録するビュー（同じ base_url の別サイトと保留を分ける）"""
+        return SiteSeen(self, site)
+
+    def first_seen(self, guid: str) -> Optional[float]:
+        """guid の初回確認日時（UNIX 時刻）。未登録なら None（保留中の新規分も含む）"""
+        pending = self._pending.get(guid)
+        if pending is not None and pending[1] is not None:
+            return pending[1]
+        row = self._conn.execute("SELECT first_seen FROM seen_items WHERE guid = ?", (guid,)).fetchone()
+        return row[0] if row else None
+
+    def known(self, guids: Iterable[str]) -> Set[str]:
+        """guids のうち登録済み（保留中の新規分を含む）のものを返す"""
+        guids = list(guids)
+        found = {g for g in guids if g in self._pending}
+        rest = [g for g in guids if g not in found]
+        for i in range(0, len(rest), _LOOKUP_CHUNK):
+            chunk = rest[i:i + _LOOKUP_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            found.update(r[0] for r in self._conn.execute(
+                f"SELECT guid FROM seen_items WHERE guid IN ({marks})", chunk
+            ))
+        return found
+
+    def prefetch(self, items: Iterable[Dict[str, Any]], base_url: str) -> None:
+        """items の GUID をまとめて引いておき、続く check() では SELECT しない（1 ページ分の行に使う）"""
+        guids = [make_guid(item, base_url) for item in items]
+        found = self.known(guids)
+        self._prefetched.update((g, g in found) for g in guids)
+
+    def _is_known(self, guid: str) -> bool:
+        pending = self._pending.get(guid)
+        if pending is not None and pending[1] is not None:
+            return True
+        if guid in self._prefetched:
+            return self._prefetched.pop(guid)
+        return self.first_seen(guid) is not None
+
+    def check(self, item: Dict[str, Any], base_url: str, site: Optional[str] = None) -> bool:
+        """
+        item が既知なら True（最終確認日時を更新）。未知なら False を返して保留に記録する。
+        pub_date が無い item には初回確認日時を pub_date として付与し、GUID を item["guid"] に固定する
+        """
+        guid = make_guid(item, base_url)
+        now = time.time()
+        if self._is_known(guid):
+            if guid not in self._pending:
+                self._pending[guid] = (site or base_url, None, now)
+            self.stats["known"] += 1
+            return True
+
+        self._pending[guid] = (site or base_url, now, now)
+        self.stats["new"] += 1
+        if item.get("pub_date") is None:
+            item["guid"] = guid
+            item["pub_date"] = datetime.fromtimestamp(now, timezone.utc).replace(microsecond=0)
+        return False
+
+    def commit(self, site: Optional[str] = None) -> int:
+        """保留分（site を指定した場合はそのサイト分のみ）を upsert して件数を返す"""
+        rows = [
+            (guid, s, first if first is not None else last, last)
+            for guid, (s, first, last) in self._pending.items()
+            if site is None or s == site
+        ]
+        if not rows:
+            return 0
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO seen_items (guid, site, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(guid) DO UPDATE SET last_seen = excluded.last_seen",
+                rows,
+            )
+        for guid, *_ in rows:
+            del self._pending[guid]
+        self._prefetched.clear()
+        return len(rows)
+
+    def discard(self, site: Optional[str] = None) -> None:
+        """保留分を破棄する（抽出後にフィードの書き出しに失敗した場合など）"""
+        if site is None:
+            self._pending.clear()
+        else:
+            self._pending = {g: v for g, v in self._pending.items() if v[0] != site}
+
+    def prune(self, max_age_days: int = DEFAULT_PRUNE_DAYS) -> int:
+        """max_age_days 以上確認されていない GUID を削除し、削除件数を返す"""
+        threshold = time.time() - timedelta(days=max_age_days).total_seconds()
+        with self._conn:
+            cur = self._conn.execute("DELETE FROM seen_items WHERE last_seen < ?", (threshold,))
+        return cur.rowcount
+
+    def close(self, commit: bool = True) -> None:
+        if commit:
+            self.commit()
+        self._conn.close()
+
+    def report(self) -> Dict[str, int]:
+        """今回の既知 / 新規件数を表示して返す"""
+        total = self._conn.execute("SELECT COUNT(*) FROM seen_items").fetchone()[0]
+        stats = {**self.stats, "entries": total}
+        log(f"🗃 既読ストア: 既知 {stats['known']} 件をスキップ / 新規 {stats['new']} 件（登録 {total} 件）")
+        return stats
+
+
+class SiteSeen:
+    """SeenStore.for_site() のビュー。check() の保留を site として記録する（extract_items の seen にそのまま渡せる）"""
+
+    def __init__(self, store: SeenStore, site: str):
+        self.store = store
+        self.site = site
+
+    def prefetch(self, items: Iterable[Dict[str, Any]], base_url: str) -> None:
+        self.store.prefetch(items, base_url)
+
+    def check(self, item: Dict[str, Any], base_url: str, site: Optional[str] = None) -> bool:
+        return self.store.check(item, base_url, site or self.site)
+
+    def commit(self) -> int:
+        return self.store.commit(self.site)
+
+    def discard(self) -> None:
+        self.store.discard(self.site)
@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+"""
+RSS スクリプト（またはサイト定義のサイト）を過去の所要時間で N 個のシャードに決定的に分割し、
+別プロセス / 別の matrix ジョブで並行に実行して結果を集約する
+
+- 分割は LPT（想定所要時間の長い順に、その時点で合計が最も短いシャードへ割り当て）。想定所要時間は
+  scheduler.DurationHistory の中央値（履歴が無ければ既知の中央値）。同じ入力と履歴なら常に同じ分割になる
+- 各シャードは <out>/shard-<i>/ に plan.json・errors.log・timings.jsonl・durations.json と、
+  実行中に書き出されたフィード（feeds/）を残す
+- merge はシャードのフィードを rss_output に、errors.log・timings.jsonl を連結し、所要時間の履歴を統合する。
+  丸ごと読み書きする JSON キャッシュ（HTTP バリデータ・フィンガープリント・記事詳細・ポップアップの探索方式）は
+  シャードごとに shard-<i>/cache/ で更新し、変わったキーだけを .cache に書き戻す
+  終了記録の無いシャード（ジョブが落ちた等）のスクリプトは失敗として errors.log に追記する
+- errors-csv はワークフローと同じ detailed_errors.csv（script,site,url）を、スクリプトの GAKKAI / BASE_URL から作る
+
+使い方:
+    # このランナーで 4 プロセスに分けて実行し、集約まで行う
+    python sharding.py pool RSS*.py --shards 4 --history .cache/durations.json
+    # matrix ジョブ: plan を作って各ジョブで 1 シャードずつ実行し、最後のジョブで集約
+    python sharding.py plan RSS*.py --shards 4 --output shards/plan.json
+    python sharding.py run --plan shards/plan.json --index 2
+    python sharding.py merge --out shards --plan shards/plan.json
+    python sharding.py errors-csv errors.log detailed_errors.csv
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from cache_files import DEFAULT_CACHE_DIR, ENV_SHARD_CACHE_DIR, merge_json_caches, seed_shard_caches
+from instrumentation import log
+from scheduler import DEFAULT_ERRORS_LOG, DEFAULT_HISTORY_PATH, Budget, DurationHistory, default_budget, run_scripts
+
+DEFAULT_SHARDS_DIR = "shards"
+DEFAULT_FEEDS_DIR = "rss_output"
+DEFAULT_TIMINGS_PATH = "timings.jsonl"
+DEFAULT_ERRORS_CSV = "detailed_errors.csv"
+# 履歴がどれにも無い場合の想定所要時間（秒）
+DEFAULT_EXPECTED = 60.0
+
+ENV_INSTRUMENT = "RSS_INSTRUMENT"
+
+
+# ---- 分割
+
+
+def expected_durations(names: Sequence[str], history: DurationHistory) -> Dict[str, float]:
+    """名前ごとの想定所要時間（履歴の中央値。無ければ既知の値の中央値、それも無ければ DEFAULT_EXPECTED）"""
+    known = {n: history.expected(n) for n in names}
+    values = sorted(v for v in known.values() if v is not None)
+    fallback = values[len(values) // 2] if values else DEFAULT_EXPECTED
+    return {n: (v if v is not None else fallback) for n, v in known.items()}
+
+
+def plan_shards(names: Sequence[str], count: int, history: DurationHistory) -> Dict[str, Any]:
+    """
+    names を count 個のシャードに LPT で分割する。
+    戻り値: {"count": N, "shards": [[name, ...], ...], "expected": [シャードごとの想定秒数, ...]}
+    """
+    count = max(1, count)
+    expected = expected_durations(list(dict.fromkeys(names)), history)
+    shards: List[List[str]] = [[] for _ in range(count)]
+    loads = [0.0] * count
+    # 所要時間の降順・同じなら名前順に並べて、合計が最も短いシャード（同じなら番号の小さい方）へ
+    for name in sorted(expected, key=lambda n: (-expected[n], n)):
+        i = min(range(count), key=lambda k: (loads[k], k))
+        shards[i].append(name)
+        loads[i] += expected[name]
+    # シャード内は元の指定順で実行する
+    order = {n: k for k, n in enumerate(names)}
+    return {
+        "count": count,
+        "shards": [sorted(s, key=order.__getitem__) for s in shards],
+        "expected": [round(v, 3) for v in loads],
+    }
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """"INDEX/COUNT"（例: "2/4"、INDEX は 0 始まり）を (index, count) に"""
+    index, _, total = spec.partition("/")
+    index, total = int(index), int(total)
+    if not 0 <= index < total:
+        raise ValueError(f"シャードの指定が不正です（0 <= INDEX < COUNT）: {spec}")
+    return index, total
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Any) -> None:
+    dirpath = os.path.dirname(path)
+    if dirpath:
+        os.makedirs(dirpath, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def shard_dir(out_dir: str, index: int) -> str:
+    return os.path.join(out_dir, f"shard-{index}")
+
+
+def _shard_dirs(out_dir: str) -> List[str]:
+    """out_dir 直下の shard-<i> ディレクトリ名（番号順）"""
+    names = os.listdir(out_dir) if os.path.isdir(out_dir) else []
+    return sorted((d for d in names if re.fullmatch(r"shard-\d+", d)), key=lambda d: int(d.split("-")[1]))
+
+
+# ---- 1 シャードの実行
+
+
+def _instrument_spec(spec: str, timings_path: str) -> str:
+    """RSS_INSTRUMENT の jsonl の出力先をシャードのファイルに差し替える（jsonl が無ければそのまま）"""
+    parts = [p.strip() for p in spec.split(",") if p.strip()]
+    return ",".join(f"jsonl:{timings_path}" if p.partition(":")[0] == "jsonl" else p for p in parts)
+
+
+def _collect_feeds(feeds_dir: str, since: float, dest: str) -> List[str]:
+    """feeds_dir で since 以降に更新されたフィードを dest にコピーし、ファイル名を返す"""
+    copied = []
+    if not os.path.isdir(feeds_dir):
+        return copied
+    os.makedirs(dest, exist_ok=True)
+    for name in sorted(os.listdir(feeds_dir)):
+        path = os.path.join(feeds_dir, name)
+        if name.endswith(".xml") and os.path.isfile(path) and os.path.getmtime(path) >= since:
+            shutil.copy2(path, os.path.join(dest, name))
+            copied.append(name)
+    return copied
+
+
+def run_shard(
+    plan: Dict[str, Any],
+    index: int,
+    out_dir: str = DEFAULT_SHARDS_DIR,
+    history_path: str = DEFAULT_HISTORY_PATH,
+    feeds_dir: str = DEFAULT_FEEDS_DIR,
+    run: Optional[Budget] = None,
+    retries: int = 0,
+    collect_feeds: bool = True,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+) -> Dict[str, str]:
+    """
+    plan の index 番目のシャードのスクリプトを順に実行し、結果を shard-<index>/ に残す
+    collect_feeds=False なら feeds/ へのコピーを省く（pool のように全シャードが同じ feeds_dir に書く場合）
+    丸ごと読み書きする JSON キャッシュ（cache_files.SHARD_CACHE_FILES）は cache_dir の内容を shard-<index>/cache/ に
+    写してそこで更新し、merge で書き戻す（同時に動くシャード同士で上書きし合わない）
+    """
+    scripts = plan["shards"][index]
+    dest = shard_dir(out_dir, index)
+    # 前回の結果が merge に混ざらないよう作り直す
+    shutil.rmtree(dest, ignore_errors=True)
+    os.makedirs(dest, exist_ok=True)
+    info = {"index": index, "count": plan["count"], "scripts": scripts, "expected": plan["expected"][index]}
+    _write_json(os.path.join(dest, "plan.json"), info)
+
+    # 履歴は全体のものから始め、このシャードで実行した分だけ merge で書き戻す
+    history = DurationHistory(history_path)
+    history.path = os.path.join(dest, "durations.json")
+    errors_log = os.path.join(dest, "errors.log")
+    spec = os.environ.get(ENV_INSTRUMENT, "")
+    if spec:
+        os.environ[ENV_INSTRUMENT] = _instrument_spec(spec, os.path.join(dest, "timings.jsonl"))
+    seed_shard_caches(os.path.join(dest, "cache"), cache_dir)
+    os.environ[ENV_SHARD_CACHE_DIR] = os.path.abspath(os.path.join(dest, "cache"))
+
+    log(f"🧩 シャード {index + 1}/{plan['count']}: {len(scripts)} スクリプト（想定 {info['expected']:.0f}s）")
+    started = time.time()
+    try:
+        # 同じシャード内の 2 本のプロセスがフィード・.cache を取り合わないよう hedge はしない
+        results = run_scripts(
+            scripts, run or default_budget() or Budget(), history, retries=retries, errors_log=errors_log, hedge=False,
+        )
+    finally:
+        history.save()
+    info["seconds"] = round(time.time() - started, 3)
+    info["failed"] = sorted(s for s, r in results.items() if r != "ok")
+    info["feeds"] = _collect_feeds(feeds_dir, started, os.path.join(dest, "feeds")) if collect_feeds else []
+    _write_json(os.path.join(dest, "plan.json"), info)
+    log(f"🧩 シャード {index + 1}/{plan['count']} 終了: {info['seconds']:.0f}s / 失敗 {len(info['failed'])}")
+    return results
+
+
+def run_pool(
+    scripts: List[str],
+    count: int,
+    out_dir: str = DEFAULT_SHARDS_DIR,
+    history_path: str = DEFAULT_HISTORY_PATH,
+    feeds_dir: str = DEFAULT_FEEDS_DIR,
+    deadline: Optional[float] = None,
+    retries: int = 0,
+) -> Dict[str, Any]:
+    """count 個のシャードを別プロセスで同時に実行し、終わったら merge する"""
+    import subprocess
+
+    plan = plan_shards(scripts, count, DurationHistory(history_path))
+    # 前回のシャード数が多かった場合の残りも含め、古い結果は消しておく
+    for d in _shard_dirs(out_dir):
+        shutil.rmtree(os.path.join(out_dir, d), ignore_errors=True)
+    plan_path = os.path.join(out_dir, "plan.json")
+    _write_json(plan_path, plan)
+    env = dict(os.environ)
+    if deadline is not None:
+        # 全シャードで同じ締め切り（UNIX 時刻）を共有する
+        env["RSS_RUN_DEADLINE"] = f"{time.time() + deadline:.3f}"
+
+    started = time.time()
+    procs = []
+    for index in range(plan["count"]):
+        if not plan["shards"][index]:
+            continue
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "run", "--plan", plan_path, "--index", str(index),
+            "--out", out_dir, "--history", history_path, "--feeds-dir", feeds_dir, "--retries", str(retries),
+            "--shared-feeds",
+        ]
+        procs.append(subprocess.Popen(cmd, env=env))
+    for proc in procs:
+        proc.wait()
+    log(f"⏱ {len(procs)} シャードの実行時間 {time.time() - started:.0f}s（想定の最大 {max(plan['expected']):.0f}s"
+        f" / 直列なら {sum(plan['expected']):.0f}s）")
+    return merge_shards(out_dir, plan=plan, history_path=history_path, feeds_dir=feeds_dir)
+
+
+# ---- 集約
+
+
+def merge_shards(
+    out_dir: str = DEFAULT_SHARDS_DIR,
+    plan: Optional[Dict[str, Any]] = None,
+    history_path: str = DEFAULT_HISTORY_PATH,
+    feeds_dir: str = DEFAULT_FEEDS_DIR,
+    errors_log: str = DEFAULT_ERRORS_LOG,
+    timings_path: str = DEFAULT_TIMINGS_PATH,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+) -> Dict[str, Any]:
+    """
+    shard-*/ の結果を集約する（フィードのコピー・errors.log / timings.jsonl の追記・所要時間の履歴と
+    JSON キャッシュの統合）
+    plan を渡すと、終了記録の無いシャードのスクリプトを失敗として errors.log に追記する
+    """
+    dirs = _shard_dirs(out_dir)
+    history = DurationHistory(history_path)
+    finished = set()
+    summary = {"shards": 0, "feeds": 0, "failed": 0, "seconds": []}
+    for d in dirs:
+        path = os.path.join(out_dir, d)
+        info = _read_json(os.path.join(path, "plan.json")) or {}
+        if "seconds" not in info:
+            continue
+        finished.add(info["index"])
+        summary["shards"] += 1
+        summary["seconds"].append(info["seconds"])
+
+        feeds = os.path.join(path, "feeds")
+        if os.path.isdir(feeds):
+            os.makedirs(feeds_dir, exist_ok=True)
+            for name in sorted(os.listdir(feeds)):
+                target = os.path.join(feeds_dir, name)
+                if not (os.path.exists(target) and os.path.samefile(os.path.join(feeds, name), target)):
+                    shutil.copy2(os.path.join(feeds, name), target)
+                summary["feeds"] += 1
+        for src, dst in (("errors.log", errors_log), ("timings.jsonl", timings_path)):
+            src = os.path.join(path, src)
+            if os.path.exists(src) and os.path.getsize(src):
+                with open(src, encoding="utf-8") as f, open(dst, "a", encoding="utf-8") as out:
+                    shutil.copyfileobj(f, out)
+        shard_history = DurationHistory(os.path.join(path, "durations.json"))
+        for name in info.get("scripts", []):
+            if name in shard_history.entries:
+                history.entries[name] = shard_history.entries[name]
+        summary["failed"] += len(info.get("failed", []))
+
+    if plan is not None:
+        for index, scripts in enumerate(plan["shards"]):
+            if index in finished or not scripts:
+                continue
+            log(f"❌ シャード {index + 1}/{plan['count']} の結果がありません（{len(scripts)} スクリプトを失敗として記録）")
+            with open(errors_log, "a", encoding="utf-8") as f:
+                for script in scripts:
+                    f.write(f"{script} failed: shard {index} did not finish\n")
+            summary["failed"] += len(scripts)
+    history.save()
+    # 途中で落ちたシャードのキャッシュも、書き込み済みの分は有効なので統合する
+    caches = merge_json_caches(cache_dir, [os.path.join(out_dir, d, "cache") for d in dirs])
+    if caches:
+        log(f"🗂 シャードのキャッシュを統合: {', '.join(f'{k} {v} 件' for k, v in sorted(caches.items()))}")
+
+    seconds = summary["seconds"]
+    if seconds:
+        log(f"🧩 {summary['shards']} シャードを集約: フィード {summary['feeds']} 件 / 失敗 {summary['failed']} 件"
+            f"（最長 {max(seconds):.0f}s・合計 {sum(seconds):.0f}s → 直列比 {sum(seconds) / max(max(seconds), 1e-9):.1f} 倍）")
+    return summary
+
+
+_ASSIGN_RE = {key: re.compile(rf'^{key}\b.*"([^"]+)"') for key in ("GAKKAI", "BASE_URL")}
+
+
+def script_metadata(script: str) -> Dict[str, str]:
+    """スクリプトの行頭の GAKKAI = "..." / BASE_URL = "..." の値（無ければ空文字）"""
+    found = {"GAKKAI": "", "BASE_URL": ""}
+    try:
+        with open(script, encoding="utf-8") as f:
+            for line in f:
+                for key, pattern in _ASSIGN_RE.items():
+                    m = pattern.match(line)
+                    if m and not found[key]:
+                        found[key] = m.group(1)
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+    return found
+
+
+def write_errors_csv(errors_log: str = DEFAULT_ERRORS_LOG, csv_path: str = DEFAULT_ERRORS_CSV) -> int:
+    """errors.log の各行の先頭（スクリプト名）から script,site,url の CSV を作り、行数を返す（errors.log が無ければ 0）"""
+    if not os.path.exists(errors_log):
+        return 0
+    import csv
+
+    rows = 0
+    with open(errors_log, encoding="utf-8") as f, open(csv_path, "w", encoding="utf-8", newline="") as out:
+        # サイト名等にカンマ・引用符が含まれても列がずれないよう csv でクオートする
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(["script", "site", "url"])
+        for line in f:
+            if not line.strip():
+                continue
+            script = line.split(" ", 1)[0]
+            meta = script_metadata(script)
+            writer.writerow([script, meta["GAKKAI"], meta["BASE_URL"]])
+            rows += 1
+    return rows
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="RSS スクリプトを所要時間で分割して並行実行し、結果を集約する")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def common(p, scripts: bool = True):
+        if scripts:
+            p.add_argument("scripts", nargs="*", help="分割するスクリプト（--plan を使う場合は不要）")
+            p.add_argument("--shards", type=int, default=2, help="シャード数")
+        p.add_argument("--history", default=DEFAULT_HISTORY_PATH, metavar="PATH", help="所要時間の履歴")
+        p.add_argument("--out", default=DEFAULT_SHARDS_DIR, metavar="DIR", help="シャードごとの出力先")
+        p.add_argument("--feeds-dir", default=DEFAULT_FEEDS_DIR, metavar="DIR", help="フィードの出力先")
+
+    p_plan = sub.add_parser("plan", help="分割だけを行い JSON で出力する")
+    common(p_plan)
+    p_plan.add_argument("--output", default=None, metavar="PATH", help="plan を保存するパス（省略時は標準出力）")
+    p_plan.add_argument("--github-output", action="store_true",
+                        help="GITHUB_OUTPUT に plan と matrix（空でないシャード番号）を書き出す")
+
+    p_run = sub.add_parser("run", help="1 シャードを実行する（matrix ジョブ用）")
+    common(p_run)
+    p_run.add_argument("--plan", default=None, metavar="PATH", help="plan（省略時は scripts と --shards から計算）")
+    p_run.add_argument("--index", type=int, required=True, help="実行するシャード番号（0 始まり）")
+    p_run.add_argument("--retries", type=int, default=0)
+    p_run.add_argument("--shared-feeds", action="store_true",
+                       help="フィードの出力先を他のシャードと共有している（feeds/ にコピーしない）")
+
+    p_pool = sub.add_parser("pool", help="全シャードを別プロセスで同時に実行して集約する")
+    common(p_pool)
+    p_pool.add_argument("--deadline", type=float, default=None, metavar="SECONDS",
+                        help="実行全体の締め切り（今からの秒数）。省略時は RSS_RUN_DEADLINE")
+    p_pool.add_argument("--retries", type=int, default=0)
+
+    p_merge = sub.add_parser("merge", help="shard-*/ の結果を集約する")
+    common(p_merge, scripts=False)
+    p_merge.add_argument("--plan", default=None, metavar="PATH", help="終了していないシャードの検出に使う plan")
+    p_merge.add_argument("--errors-log", default=DEFAULT_ERRORS_LOG)
+    p_merge.add_argument("--timings", default=DEFAULT_TIMINGS_PATH, metavar="PATH")
+
+    p_csv = sub.add_parser("errors-csv", help="errors.log から detailed_errors.csv を作る")
+    p_csv.add_argument("errors_log", nargs="?", default=DEFAULT_ERRORS_LOG)
+    p_csv.add_argument("csv_path", nargs="?", default=DEFAULT_ERRORS_CSV)
+
+    args = parser.parse_args()
+    if args.command == "errors-csv":
+        write_errors_csv(args.errors_log, args.csv_path)
+    elif args.command == "merge":
+        plan = _read_json(args.plan) if args.plan else None
+        merge_shards(args.out, plan=plan, history_path=args.history, feeds_dir=args.feeds_dir,
+                     errors_log=args.errors_log, timings_path=args.timings)
+    elif args.command == "pool":
+        run_pool(args.scripts, args.shards, args.out, args.history, args.feeds_dir, args.deadline, args.retries)
+    else:
+        plan = _read_json(args.plan) if getattr(args, "plan", None) else None
+        if plan is None:
+            plan = plan_shards(args.scripts, args.shards, DurationHistory(args.history))
+        if args.command == "run":
+            run_shard(plan, args.index, args.out, args.history, args.feeds_dir, retries=args.retries,
+                      collect_feeds=not args.shared_feeds)
+            return
+        text = json.dumps(plan, ensure_ascii=False)
+        if args.output:
+            _write_json(args.output, plan)
+        else:
+            print(text)
+        if args.github_output:
+            matrix = [i for i, s in enumerate(plan["shards"]) if s]
+            with open(os.environ["GITHUB_OUTPUT"], "a", encoding="utf-8") as f:
+                f.write(f"plan={text}\nmatrix={json.dumps(matrix)}\n")
+
+
+if __name__ == "__main__":
+    main()
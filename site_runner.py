@@ -0,0 +1,694 @@
+# -*- coding: utf-8 -*-
+"""
+サイト定義ファイル（JSON）に列挙した複数サイトを並列にスクレイピングして RSS を出力するランナー
+
+- 1 サイト = extract_items / generate_rss の引数と同名のキーを持つ 1 オブジェクト
+- async Playwright で 1 つの Chromium を共有し、最大 concurrency ページを同時に処理
+- 行の読み取りは scraper_utils の一括抽出 JS（1 回の evaluate）を使い、
+  日付パース以降は engine（scraper_utils / scraper_utils2）の _build_items を共用（記事は feed_item.FeedItem）
+- 失敗したサイトは errors.log に追記し、サイトごとの結果を返す
+- --http-cache を指定すると一覧ページが未更新のサイトはブラウザを使わずに前回の items を再利用
+- url_template / next_selector を指定したサイトは 2 ページ目以降も同時に開いて抽出し、ページ順に連結
+- "details" を指定したサイトは記事ページを並行取得して要約（description）と日付を補完（detail_fetcher）
+- --seen-db を指定すると incremental のサイトでは既読ストア（seen_store）にある記事を抽出結果から除く
+- --deadline を指定すると実行全体をその秒数以内に終える。各サイトには過去の所要時間（--durations）から
+  決めた時間予算を割り当て、Playwright の各タイムアウトを残り時間で頭打ちにする。想定より遅い試行には
+  残り時間がある場合だけ 2 本目を先行開始（hedge）し、締め切りまでに終わったサイトのフィードは書き出す
+- --fingerprints を指定すると一覧の先頭 max_items 行のフィンガープリントを 1 回の evaluate で計算し、
+  前回と同じサイトは行の抽出・記事ページの取得・フィードの書き出しを省略（list_fingerprint）
+- --shard INDEX/COUNT を指定すると、過去の所要時間（--durations）で全サイトを COUNT 個に分けた
+  INDEX 番目（0 始まり）のサイトだけを実行する（sharding.plan_shards と同じ決定的な分割）
+- --timings を指定するとサイト別・フェーズ別の所要時間（instrumentation のスパン）を JSON lines で保存
+- --har record で全サイトの通信を <--har-dir>/<サイト定義ファイル名>-1.har に記録し、--har replay では
+  その HAR だけで（ネットワークに出ずに）同じ処理を再現する。再生時は既読ストア・HTTP キャッシュ・所要時間の
+  履歴を使わず、フィードは <--har-dir>/replay_output/ に書き出す。--concurrency 0 で全サイトを同時に処理し、
+  終了時の CPU 時間・最大 RSS からパイプライン単体の負荷を測れる
+
+サイト定義の例（sites.json）:
+    [
+      {
+        "name": "RSS_example",
+        "gakkai_name": "〇〇学会",
+        "base_url": "https://example.org/",
+        "url": "https://example.org/news/",
+        "output_path": "rss_output/example.xml",
+        "SELECTOR_TITLE": "ul.news li",
+        "SELECTOR_DATE": "ul.news li",
+        "title_selector": "a", "title_index": 0,
+        "href_selector": "a", "href_index": 0,
+        "date_selector": "span.date", "date_index": 0,
+        "date_format": null,
+        "date_regex": "(\\\\d{4})年(\\\\d{1,2})月(\\\\d{1,2})日",
+        "max_items": 10,
+        "engine": "scraper_utils",
+        "sort_order": "desc",
+        "url_template": "https://example.org/news/page/{page}/", "max_pages": 3,
+        "incremental": true,
+        "block": {"extra_allow_host_patterns": ["cdn.example.org"]},
+        "details": {"summary_selector": "div.entry-content p", "per_host": 2}
+      }
+    ]
+
+使い方:
+    python site_runner.py sites.json --concurrency 4
+    python site_runner.py sites.json --har record
+    python site_runner.py sites.json --har replay --concurrency 0 --timings .cache/replay_timings.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
+
+from browser_utils import (
+    DEFAULT_HAR_DIR,
+    DEFAULT_UA,
+    DEFAULT_VIEWPORT,
+    HAR_MODES,
+    HarArchive,
+    install_resource_blocking_async,
+    make_block_profile,
+)
+from detail_fetcher import DetailCache, DetailFetcher
+from fetch_scheduler import report_default
+from http_cache import ValidatorCache
+from instrumentation import JsonLinesSink, SummarySink, configure, count, labels, log, span
+from list_fingerprint import FingerprintStore, page_fingerprint_async
+from pagination import (
+    DEFAULT_MAX_PAGES,
+    FOLLOWING_PAGE_TIMEOUT_MS,
+    merge_pages,
+    next_urls,
+    page_links_async,
+    template_urls,
+)
+from rss_utils import DEFAULT_MAX_HISTORY, generate_rss
+from scheduler import DEFAULT_HISTORY_PATH, Budget, BudgetExceeded, DurationHistory, default_budget, timeout_ms
+from scraper_utils import collect_rows_bulk_async
+from seen_store import SeenStore, SiteSeen
+from sharding import parse_shard, plan_shards
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_ERRORS_LOG = "errors.log"
+
+# サイト定義のキー（未指定時の既定値）。必須キーは REQUIRED_KEYS
+SITE_DEFAULTS: Dict[str, Any] = {
+    "url": None,
+    "SELECTOR_DATE": None,
+    "title_selector": None,
+    "title_index": 0,
+    "href_selector": None,
+    "href_index": 0,
+    "date_selector": None,
+    "date_index": 0,
+    "date_format": None,
+    "date_regex": "",
+    "max_items": 10,
+    "engine": "scraper_utils",
+    # この日数より古い記事は除外。sort_order="desc"（新しい順の一覧）なら古い行で打ち切り
+    "max_age_days": 3,
+    "sort_order": None,
+    # ページ送り（pagination.extract_items_paginated と同じ意味）。どちらも null なら 1 ページ目のみ
+    "url_template": None,
+    "next_selector": None,
+    "max_pages": DEFAULT_MAX_PAGES,
+    "incremental": False,
+    "max_history": DEFAULT_MAX_HISTORY,
+    # リソース遮断の上書き（make_block_profile の引数）。null なら遮断しない
+    "block": {},
+    # 記事ページから要約・日付を補完する（DetailFetcher の引数）。null なら一覧ページの情報のみ
+    "details": None,
+}
+REQUIRED_KEYS = ("name", "gakkai_name", "base_url", "output_path", "SELECTOR_TITLE")
+
+
+def load_sites(path: str) -> List[Dict[str, Any]]:
+    """サイト定義ファイルを読み込み、既定値を補完して返す（必須キー欠落は ValueError）"""
+    raw = json.loads(Path(path).read_text(encoding="utf-8"))
+    sites = []
+    names = set()
+    for idx, entry in enumerate(raw):
+        missing = [k for k in REQUIRED_KEYS if not entry.get(k)]
+        if missing:
+            raise ValueError(f"{path}: {idx} 番目のサイト定義に必須キーがありません: {', '.join(missing)}")
+        # name は所要時間の履歴・既読ストアの保留を分けるキー
+        if entry["name"] in names:
+            raise ValueError(f"{path}: サイト名が重複しています: {entry['name']}")
+        names.add(entry["name"])
+        site = {**SITE_DEFAULTS, **entry}
+        site["url"] = site["url"] or site["base_url"]
+        sites.append(site)
+    return sites
+
+
+async def _extract_page(
+    page, site: Dict[str, Any], engine, timeout: int = 120000, seen=None, budget: Optional[Budget] = None
+) -> List[Dict[str, Any]]:
+    with span("wait_for_selector"):
+        await page.wait_for_selector(site["SELECTOR_TITLE"], state="attached", timeout=timeout_ms(budget, timeout))
+
+    result = await collect_rows_bulk_async(
+        page, site["SELECTOR_TITLE"], site["SELECTOR_DATE"],
+        site["title_selector"], site["title_index"],
+        site["href_selector"], site["href_index"],
+        site["date_selector"], site["date_index"],
+        site["max_items"],
+    )
+    if result is None:
+        raise ValueError("CSS として解釈できないセレクタが含まれています（RSS*.py スクリプトで実行してください）")
+
+    count_titles, _, rows = result
+    log(f"📦 [{site['name']}] 発見した記事数(タイトル側): {count_titles}")
+    return engine._build_items(
+        rows, site["base_url"], site["SELECTOR_DATE"], site["date_regex"],
+        max_age_days=site["max_age_days"], sort_order=site["sort_order"], seen=seen, feed_items=True,
+    )
+
+
+async def _extract_following_page(context, url: str, site: Dict[str, Any], engine, seen=None, budget=None):
+    """
+    2 ページ目以降を新しいタブで開いて抽出する。戻り値: (items, tab)
+    items は取得失敗なら None、一覧の行が無ければ []。失敗時の tab は閉じて None
+    """
+    tab = await context.new_page()
+    try:
+        if site["block"] is not None:
+            await install_resource_blocking_async(tab, make_block_profile(**site["block"]))
+        with span("navigate"):
+            resp = await tab.goto(url, wait_until="domcontentloaded", timeout=timeout_ms(budget, 30000))
+        if resp is not None and resp.status >= 400:
+            raise RuntimeError(f"HTTP {resp.status}")
+        try:
+            items = await _extract_page(tab, site, engine, timeout=FOLLOWING_PAGE_TIMEOUT_MS, seen=seen, budget=budget)
+        except PlaywrightTimeoutError:
+            items = []
+        return items, tab
+    except Exception as e:
+        count("pagination_failures")
+        log(f"⚠ [{site['name']}] ページの抽出に失敗: {url} ({type(e).__name__}: {e})")
+        await tab.close()
+        return None, None
+
+
+async def _extract_following_pages(
+    page, site: Dict[str, Any], engine, first: List[Dict[str, Any]], seen=None, budget: Optional[Budget] = None
+):
+    """
+    url_template / next_selector のページ送りをたどり、ページ順に連結した items を返す
+    1 バッチ分のページは asyncio.gather で同時に開き、結果はページ順に見て
+    記事が 0 件のページ（すべて古い / 行が無い）が出たら、または budget を使い切ったらそこで打ち切る
+    """
+    pages = [first]
+    visited = {page.url.split("#", 1)[0]}
+    max_pages = site["max_pages"]
+    queue = template_urls(site["url_template"], max_pages) if site["url_template"] else []
+    current = page
+    stale = False
+    while not stale and len(visited) < max_pages:
+        if budget is not None and budget.expired():
+            count("budget_exceeded")
+            log(f"⏱ [{site['name']}] 時間予算を使い切ったため、ページ送りを終了")
+            break
+        n = max_pages - len(visited)
+        if site["url_template"]:
+            batch, queue = queue[:n], queue[n:]
+        else:
+            batch = next_urls(await page_links_async(current, site["next_selector"]), visited, n)
+        if current is not page:
+            await current.close()
+            current = page
+        if not batch:
+            break
+        visited.update(batch)
+
+        results = await asyncio.gather(
+            *(_extract_following_page(page.context, url, site, engine, seen, budget) for url in batch)
+        )
+        last = None
+        for url, (items, tab) in zip(batch, results):
+            keep = not stale and items is not None and len(items) > 0
+            if not stale and items is not None and not keep:
+                log(f"⏹ [{site['name']}] {url} に対象期間内の記事が無いため、ページ送りを終了")
+                stale = True
+            if keep:
+                count("pages_crawled")
+                pages.append(items)
+                if last is not None:
+                    await last.close()
+                last = tab
+            elif tab is not None:
+                await tab.close()
+        if last is not None:
+            current = last
+    if current is not page:
+        await current.close()
+
+    merged = merge_pages(pages, site["base_url"])
+    log(f"📚 [{site['name']}] {len(pages)} ページから {len(merged)} 件を取得")
+    return merged
+
+
+# フィンガープリントの一致判定に含める抽出条件（変われば前回の items は使わない）
+_FINGERPRINT_KEYS = (
+    "engine", "SELECTOR_DATE", "SELECTOR_TITLE", "title_selector", "title_index", "href_selector", "href_index",
+    "date_selector", "date_index", "date_regex", "max_items", "sort_order", "url_template", "next_selector",
+    "max_pages", "details",
+)
+
+
+async def _extract_site(
+    page,
+    site: Dict[str, Any],
+    seen=None,
+    budget: Optional[Budget] = None,
+    fingerprints: Optional[FingerprintStore] = None,
+) -> List[Dict[str, Any]]:
+    engine = importlib.import_module(site["engine"])
+    # 既読ストアは既存フィードとマージする incremental のサイトにだけ使う
+    seen = seen if site["incremental"] else None
+
+    with span("navigate"):
+        await page.goto(site["url"], wait_until="domcontentloaded", timeout=timeout_ms(budget, 30000))
+    if fingerprints is not None:
+        # 1 ページ目の一覧が前回と同じなら、ページ送り・記事ページを含めて前回の items を使う
+        with span("wait_for_selector"):
+            await page.wait_for_selector(site["SELECTOR_TITLE"], state="attached", timeout=timeout_ms(budget, 120000))
+        fingerprint = await page_fingerprint_async(page, site["SELECTOR_TITLE"], site["SELECTOR_DATE"], site["max_items"])
+        config = {k: site[k] for k in _FINGERPRINT_KEYS}
+        cached = fingerprints.lookup(site["url"], fingerprint, config, site["max_age_days"])
+        if cached is not None:
+            return cached
+    items = await _extract_page(page, site, engine, seen=seen, budget=budget)
+    count("pages_crawled")
+    if not items or not (site["url_template"] or site["next_selector"]):
+        return items
+    return await _extract_following_pages(page, site, engine, items, seen, budget)
+
+
+async def _enrich_details(
+    context, site: Dict[str, Any], items: List[Dict[str, Any]], cache: Optional[DetailCache], http: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    site["details"] の設定で記事ページを並行取得し、要約・日付を補完する（HTTP で取れなければブラウザ）
+    http=False ならブラウザだけで取得する（HAR の記録 / 再生中）
+    """
+    fetcher = DetailFetcher(**{**site["details"], "http": http}, cache=cache)
+    with span("detail"):
+        items = await fetcher.enrich_async(items, context, max_age_days=site["max_age_days"])
+    fetcher.report(site["name"])
+    return items
+
+
+@contextlib.asynccontextmanager
+async def _site_labels(site: Dict[str, Any]):
+    # gather の各タスクは独自のコンテキストを持つため、ラベルは他サイトに漏れない
+    with labels(site=site["name"]):
+        yield
+
+
+def _seconds(budget: Budget) -> Optional[float]:
+    """asyncio の timeout 引数用（無制限なら None）"""
+    left = budget.remaining()
+    return None if left == float("inf") else max(0.0, left)
+
+
+async def _attempt(
+    context,
+    site: Dict[str, Any],
+    seen: Optional[SiteSeen],
+    budget: Budget,
+    fingerprints: Optional[FingerprintStore] = None,
+) -> List[Dict[str, Any]]:
+    """新しいページで 1 回抽出する（キャンセルされてもページは閉じる）"""
+    page = await context.new_page()
+    block_stats = None
+    try:
+        if site["block"] is not None:
+            block_stats = await install_resource_blocking_async(page, make_block_profile(**site["block"]))
+        return await _extract_site(page, site, seen, budget, fingerprints)
+    finally:
+        if block_stats is not None:
+            block_stats.report(site["name"])
+        await page.close()
+
+
+async def _hedged_attempt(
+    context,
+    site: Dict[str, Any],
+    seen: Optional[SiteSeen],
+    budget: Budget,
+    hedge_after: Optional[float],
+    fingerprints: Optional[FingerprintStore] = None,
+) -> List[Dict[str, Any]]:
+    """
+    1 本目が hedge_after 秒で終わらなければ、残り予算がある場合に限り 2 本目を先行開始し、
+    先に成功した方の結果を返す（もう一方はキャンセル）。予算を使い切ったら BudgetExceeded
+    """
+    tasks = {asyncio.create_task(_attempt(context, site, seen, budget, fingerprints))}
+    try:
+        if hedge_after is not None:
+            left = _seconds(budget)
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after if left is None else min(hedge_after, left))
+            if not done and budget.remaining() > hedge_after:
+                count("hedged_attempts")
+                log(f"🪂 [{site['name']}] {hedge_after:.1f}s 以内に終わらないため 2 本目の試行を開始")
+                tasks.add(asyncio.create_task(_attempt(context, site, seen, budget, fingerprints)))
+        error: Optional[BaseException] = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, timeout=_seconds(budget), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                count("budget_exceeded")
+                raise BudgetExceeded(f"時間予算（{site['name']}）を使い切りました")
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _run_site(
+    context,
+    site: Dict[str, Any],
+    semaphore: asyncio.Semaphore,
+    retries: int,
+    http_cache: Optional[ValidatorCache] = None,
+    seen: Optional[SeenStore] = None,
+    details_cache: Optional[DetailCache] = None,
+    run_budget: Optional[Budget] = None,
+    history: Optional[DurationHistory] = None,
+    http_details: bool = True,
+    fingerprints: Optional[FingerprintStore] = None,
+) -> Dict[str, Any]:
+    async with semaphore, _site_labels(site):
+        started = time.monotonic()
+        error: Optional[str] = None
+        items: List[Dict[str, Any]] = []
+        run_budget = run_budget or Budget()
+        budget = run_budget.child(history.budget_for(site["name"]) if history is not None else None)
+        expected = history.expected(site["name"]) if history is not None else None
+        # 既読ストアは試行ごとに保留を積むため、同時に 2 本走らせる hedge は使わない
+        hedge_after = history.hedge_after(site["name"]) if history is not None and seen is None else None
+        # 保留はサイト名で分ける（base_url が同じ別サイトの commit / discard に巻き込まれない）
+        site_seen = seen.for_site(site["name"]) if seen is not None else None
+
+        cached = unchanged = False
+        if budget.expired():
+            error = "skipped: run deadline exceeded"
+            log(f"⏭ [{site['name']}] 締め切りを過ぎたため実行しません")
+        else:
+            # 一覧ページが前回から変わっていなければブラウザを使わずに前回の items を再利用
+            cached = http_cache is not None and await asyncio.to_thread(http_cache.check, site["url"])
+        if cached:
+            items = http_cache.cached_items(site["url"], max_age_days=site["max_age_days"])
+            log(f"♻ [{site['name']}] 一覧ページに変更なし。前回の {len(items)} 件を再利用")
+
+        for attempt in range(0 if cached or error else retries + 1):
+            if attempt > 0 and budget.remaining() < (expected or 0.0):
+                if expected is None:
+                    # 履歴が無い場合は予算を使い切ったときだけここに来る
+                    log(f"⏭ [{site['name']}] 時間予算を使い切ったため再試行しません")
+                else:
+                    log(f"⏭ [{site['name']}] 残り {budget.remaining():.0f}s が想定所要時間 {expected:.0f}s に満たないため再試行しません")
+                break
+            if site_seen is not None:
+                # 失敗した試行で保留になった記事を既知扱いにしない
+                site_seen.discard()
+            try:
+                items = await _hedged_attempt(context, site, site_seen, budget, hedge_after, fingerprints)
+                if history is not None:
+                    history.record(site["name"], time.monotonic() - started)
+                unchanged = fingerprints is not None and fingerprints.unchanged(site["url"])
+                if site["details"] is not None and items and not unchanged:
+                    if budget.expired():
+                        log(f"⏱ [{site['name']}] 時間予算を使い切ったため、記事ページの取得を省略")
+                    else:
+                        items = await _enrich_details(context, site, items, details_cache, http_details)
+                error = None
+                if http_cache is not None:
+                    http_cache.store(site["url"], items)
+                if fingerprints is not None and not unchanged:
+                    fingerprints.store(site["url"], items)
+                break
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                log(f"⚠ [{site['name']}] 失敗 (attempt {attempt + 1}): {error}")
+                if budget.expired():
+                    break
+
+        if unchanged and error is None and os.path.exists(site["output_path"]):
+            log(f"🧬 [{site['name']}] 一覧に変更がないため、フィードの書き出しを省略")
+        elif error is None:
+            try:
+                generate_rss(
+                    items, site["output_path"], site["base_url"], site["gakkai_name"],
+                    incremental=site["incremental"], max_history=site["max_history"],
+                )
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        if site_seen is not None:
+            # フィードに書き出せた記事だけを既読にする
+            if error is None:
+                site_seen.commit()
+            else:
+                site_seen.discard()
+
+        return {
+            "name": site["name"],
+            "gakkai_name": site["gakkai_name"],
+            "base_url": site["base_url"],
+            "ok": error is None,
+            "cached": cached,
+            "unchanged": unchanged,
+            "items": len(items) if error is None else 0,
+            "seconds": round(time.monotonic() - started, 3),
+            "error": error,
+        }
+
+
+async def run_sites_async(
+    sites: List[Dict[str, Any]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    retries: int = 0,
+    headless: bool = True,
+    http_cache: Optional[ValidatorCache] = None,
+    seen: Optional[SeenStore] = None,
+    details_cache: Optional[DetailCache] = None,
+    run_budget: Optional[Budget] = None,
+    history: Optional[DurationHistory] = None,
+    har: Optional[HarArchive] = None,
+    fingerprints: Optional[FingerprintStore] = None,
+) -> List[Dict[str, Any]]:
+    """
+    全サイトを最大 concurrency 並列（0 以下なら全サイト同時）で処理し、サイト定義と同じ順序で結果を返す
+    http_cache を渡すと、一覧ページが変わっていないサイトはブラウザを使わずに済ませる
+    seen を渡すと、incremental のサイトでは既読ストアにある記事を抽出結果から除く
+    run_budget を渡すとその締め切りまでに全サイトを終える（history があればサイトごとの予算と hedge も使う）
+    har を渡すと共有コンテキストの通信を HAR に記録 / HAR から再生する（記事ページもブラウザで取得）
+    fingerprints を渡すと、一覧が前回と同じサイトは抽出とフィードの書き出しを省略する
+    """
+    semaphore = asyncio.Semaphore(concurrency if concurrency > 0 else max(1, len(sites)))
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        context = None
+        try:
+            context = await browser.new_context(
+                user_agent=DEFAULT_UA, viewport=DEFAULT_VIEWPORT, **(har.context_options() if har is not None else {})
+            )
+            if har is not None:
+                await har.attach_async(context)
+            return await asyncio.gather(*(
+                _run_site(
+                    context, site, semaphore, retries, http_cache, seen, details_cache, run_budget, history,
+                    http_details=har is None, fingerprints=fingerprints,
+                )
+                for site in sites
+            ))
+        finally:
+            # HAR はコンテキストの close 時に書き出される
+            if context is not None:
+                await context.close()
+            await browser.close()
+            if har is not None:
+                har.report()
+
+
+def write_errors_log(results: List[Dict[str, Any]], path: str = DEFAULT_ERRORS_LOG) -> int:
+    """失敗したサイトを errors.log に追記する（ワークフローの書式: '<name> failed ...'）。件数を返す"""
+    failed = [r for r in results if not r["ok"]]
+    if failed:
+        with open(path, "a", encoding="utf-8") as f:
+            for r in failed:
+                f.write(f"{r['name']} failed: {r['error']}\n")
+    return len(failed)
+
+
+def report_resources() -> Optional[Dict[str, float]]:
+    """このプロセスと子プロセス（Chromium）の CPU 時間・最大 RSS を表示して返す（resource が無い環境では None）"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    stats = {
+        "cpu_user_s": round(own.ru_utime + children.ru_utime, 2),
+        "cpu_system_s": round(own.ru_stime + children.ru_stime, 2),
+        # Linux の ru_maxrss は KB（子プロセスは最大のもの 1 つの値）
+        "python_max_rss_mb": round(own.ru_maxrss / 1024, 1),
+        "child_max_rss_mb": round(children.ru_maxrss / 1024, 1),
+    }
+    log(f"🧮 CPU user {stats['cpu_user_s']}s / system {stats['cpu_system_s']}s、"
+        f"最大 RSS: Python {stats['python_max_rss_mb']}MB / 子プロセス {stats['child_max_rss_mb']}MB")
+    return stats
+
+
+def _replay_output_path(har_dir: str, output_path: str) -> str:
+    return os.path.join(har_dir, "replay_output", os.path.basename(output_path))
+
+
+def run_sites(
+    path: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    retries: int = 0,
+    errors_log: str = DEFAULT_ERRORS_LOG,
+    http_cache_path: Optional[str] = None,
+    seen_db_path: Optional[str] = None,
+    details_cache_path: Optional[str] = None,
+    deadline: Optional[float] = None,
+    durations_path: Optional[str] = DEFAULT_HISTORY_PATH,
+    har_mode: Optional[str] = None,
+    har_dir: str = DEFAULT_HAR_DIR,
+    fingerprints_path: Optional[str] = None,
+    shard: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    サイト定義ファイルを読み込んで全サイトを実行し、失敗を errors_log に記録する
+    deadline（秒）を省略した場合は環境変数 RSS_RUN_DEADLINE（UNIX 時刻）の締め切りに従う
+    har_mode="record" / "replay" で HAR の記録 / 再生（HAR 名はサイト定義ファイル名）
+    shard="INDEX/COUNT" で所要時間の履歴から分割したうちの 1 シャード分のサイトだけを実行する
+    """
+    sites = load_sites(path)
+    if shard:
+        index, total = parse_shard(shard)
+        plan = plan_shards([s["name"] for s in sites], total, DurationHistory(durations_path or DEFAULT_HISTORY_PATH))
+        names = set(plan["shards"][index])
+        sites = [s for s in sites if s["name"] in names]
+        log(f"🧩 シャード {index + 1}/{total}: {len(sites)} サイト（想定 {plan['expected'][index]:.0f}s）")
+    har = HarArchive(har_mode, Path(path).stem, har_dir) if har_mode else None
+    if har is not None:
+        # ブラウザ外の HTTP（バリデータキャッシュの条件付き GET）は HAR に残らないため使わない
+        http_cache_path = None
+    if har is not None and har.mode == "replay":
+        # 再生は計測・回帰確認用。本番の既読ストア・所要時間の履歴・フィードには書き込まない
+        seen_db_path = None
+        durations_path = None
+        fingerprints_path = None
+        for site in sites:
+            site["output_path"] = _replay_output_path(har_dir, site["output_path"])
+    http_cache = ValidatorCache(http_cache_path) if http_cache_path else None
+    seen = SeenStore(seen_db_path) if seen_db_path else None
+    details_cache = DetailCache(details_cache_path) if details_cache_path else None
+    run_budget = Budget.after(deadline) if deadline is not None else default_budget()
+    history = DurationHistory(durations_path) if durations_path else None
+    fingerprints = FingerprintStore(fingerprints_path) if fingerprints_path else None
+    try:
+        results = asyncio.run(run_sites_async(
+            sites, concurrency=concurrency, retries=retries,
+            http_cache=http_cache, seen=seen, details_cache=details_cache,
+            run_budget=run_budget, history=history, har=har, fingerprints=fingerprints,
+        ))
+    finally:
+        if history is not None:
+            history.save()
+        if seen is not None:
+            seen.prune()
+            seen.report()
+            seen.close(commit=False)
+    failed = write_errors_log(results, errors_log)
+    if details_cache is not None:
+        details_cache.evict()
+        details_cache.save()
+    if http_cache is not None:
+        http_cache.evict()
+        http_cache.save()
+        http_cache.report()
+    if fingerprints is not None:
+        fingerprints.evict()
+        fingerprints.save()
+        fingerprints.report()
+    # 条件付き GET・記事ページの取得で使ったホストごとの集計
+    report_default()
+
+    for r in results:
+        mark = "✅" if r["ok"] else "❌"
+        log(f"{mark} {r['name']}: {r['items']}件 {r['seconds']}s" + (f" ({r['error']})" if r["error"] else ""))
+    unchanged = sum(1 for r in results if r["unchanged"])
+    log(f"\n🏁 {len(results)} サイト中 {len(results) - failed} 成功 / {failed} 失敗"
+        + (f"（一覧に変更なし {unchanged} サイトは抽出を省略）" if fingerprints is not None else ""))
+    report_resources()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="サイト定義ファイルの全サイトを並列実行して RSS を出力する")
+    parser.add_argument("sites", help="サイト定義 JSON のパス")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="同時に処理するサイト数（0 なら全サイト）")
+    parser.add_argument("--retries", type=int, default=0, help="失敗時の再試行回数")
+    parser.add_argument("--errors-log", default=DEFAULT_ERRORS_LOG)
+    parser.add_argument("--http-cache", default=None, metavar="PATH", help="HTTP バリデータキャッシュの保存先")
+    parser.add_argument("--quiet", action="store_true", help="行ごとのログを出力しない")
+    parser.add_argument("--timings", default=None, metavar="PATH",
+                        help="フェーズ別の所要時間を JSON lines で追記し、終了時に集計表を表示")
+    parser.add_argument("--seen-db", default=None, metavar="PATH",
+                        help="既読ストア（SQLite）のパス。incremental のサイトで既知の記事を除外")
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDS",
+                        help="実行全体の締め切り（今からの秒数）。省略時は RSS_RUN_DEADLINE（UNIX 時刻）")
+    parser.add_argument("--durations", default=DEFAULT_HISTORY_PATH, metavar="PATH",
+                        help="サイトごとの所要時間の履歴（時間予算と hedge の判断に使う）")
+    parser.add_argument("--details-cache", default=None, metavar="PATH",
+                        help="記事ページの要約・日付キャッシュの保存先（details を指定したサイト用）")
+    parser.add_argument("--fingerprints", default=None, metavar="PATH",
+                        help="一覧のフィンガープリントの保存先。一覧が前回と同じサイトは抽出とフィードの書き出しを省略")
+    parser.add_argument("--shard", default=None, metavar="INDEX/COUNT",
+                        help="所要時間の履歴で COUNT 個に分けたうちの INDEX 番目（0 始まり）のサイトだけを実行")
+    parser.add_argument("--har", choices=HAR_MODES, default=None,
+                        help="record: 通信を HAR に記録 / replay: HAR だけで再生（ネットワークに出ない）")
+    parser.add_argument("--har-dir", default=DEFAULT_HAR_DIR, metavar="DIR", help="HAR の保存先")
+    args = parser.parse_args()
+    if args.timings:
+        configure(sinks=[JsonLinesSink(args.timings), SummarySink()])
+    if args.quiet:
+        configure(quiet=True)
+    run_sites(
+        args.sites,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        errors_log=args.errors_log,
+        http_cache_path=args.http_cache,
+        seen_db_path=args.seen_db,
+        details_cache_path=args.details_cache,
+        deadline=args.deadline,
+        durations_path=args.durations,
+        har_mode=args.har,
+        har_dir=args.har_dir,
+        fingerprints_path=args.fingerprints,
+        shard=args.shard,
+    )
+
+
+if __name__ == "__main__":
+    main()
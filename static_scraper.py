@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+ブラウザを起動せずに静的 HTML からニュース記事を抽出するユーティリティ
+
+- requests で取得した HTML を BeautifulSoup(CSS セレクタ) で解析
+- 引数は scraper_utils.extract_items と同じ（page の代わりに url / html を渡す）
+- 行の読み取り規則（text_content 相当・title 属性フォールバック・行ズレ耐性）は
+  ロケータ経路と同じで、日付パース以降は各 scraper_utils の _build_items を共用
+- タイトル行が 0 件なら（JS 描画のページ等）自動的に Playwright 経路へフォールバック
+- HTTP 取得は fetch_scheduler の既定スケジューラ経由（ホストごとの同時接続数・間隔・Retry-After を守る）
+"""
+
+from __future__ import annotations
+
+from types import ModuleType
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from bs4 import BeautifulSoup
+
+import scraper_utils
+from browser_utils import DEFAULT_UA, DEFAULT_VIEWPORT
+from fetch_scheduler import default_scheduler
+from instrumentation import count, log, span
+from scheduler import Budget, resolve_budget, timeout_ms
+
+DEFAULT_TIMEOUT = 30
+
+
+def fetch_html(url: str, timeout: int = DEFAULT_TIMEOUT, session: Optional[requests.Session] = None) -> BeautifulSoup:
+    """
+    url の HTML を取得して BeautifulSoup を返す
+    Content-Type に charset が無い場合は <meta charset> 等から BeautifulSoup に判定させる
+    session を省略すると既定の fetch_scheduler（ホスト単位の同時接続数・間隔を守る）で取得する
+    """
+    with span("fetch"):
+        if session is not None:
+            resp = session.get(url, headers={"User-Agent": DEFAULT_UA}, timeout=timeout)
+        else:
+            resp = default_scheduler().get(url, timeout=timeout)
+    resp.raise_for_status()
+    declared = "charset=" in (resp.headers.get("Content-Type") or "").lower()
+    return BeautifulSoup(resp.content, "lxml", from_encoding=resp.encoding if declared else None)
+
+
+def _first_text(root, selector: str, start_index: int) -> str:
+    """_get_first_text_in_parent の静的版"""
+    for el in root.select(selector)[start_index:]:
+        txt = el.get_text().strip()
+        if txt:
+            return txt
+    return ""
+
+
+def _first_attr(root, selector: Optional[str], attr: str, start_index: int) -> Optional[str]:
+    """_get_first_attr_in_parent の静的版（selector が空なら親自身の属性）"""
+    if not selector:
+        return root.get(attr)
+    for el in root.select(selector)[start_index:]:
+        val = el.get(attr)
+        if val:
+            return val
+    return None
+
+
+def _iter_rows_static(
+    blocks1: list,
+    blocks2: Optional[list],
+    row_count: int,
+    title_selector: Optional[str],
+    title_index: int,
+    href_selector: Optional[str],
+    href_index: int,
+    date_selector: Optional[str],
+    date_index: int,
+) -> Iterator[Optional[Tuple[str, Optional[str], str]]]:
+    for i in range(row_count):
+        try:
+            block1 = blocks1[i]
+            block2 = blocks2[i] if (blocks2 and i < len(blocks2)) else None
+
+            if title_selector:
+                title = _first_text(block1, title_selector, title_index)
+                if not title:
+                    # a要素のtitle属性フォールバック
+                    candidates = block1.select(title_selector)
+                    if title_index < len(candidates):
+                        title = (candidates[title_index].get("title") or "").strip()
+            else:
+                title = block1.get_text().strip()
+
+            href = _first_attr(block1, href_selector, "href", href_index)
+
+            target_for_date = block2 if block2 is not None else block1
+            if date_selector:
+                date_text = _first_text(target_for_date, date_selector, date_index)
+            else:
+                date_text = target_for_date.get_text().strip()
+
+            yield title, href, date_text
+        except Exception as e:
+            count("row_failures")
+            log(f"⚠ 行{i+1}の解析に失敗: {e}", row=True)
+            yield None
+
+
+def extract_items_static(
+    html,
+    SELECTOR_DATE: Optional[str],
+    SELECTOR_TITLE: str,
+    title_selector: Optional[str],
+    title_index: int,
+    href_selector: Optional[str],
+    href_index: int,
+    base_url: str,
+    date_selector: Optional[str],
+    date_index: int,
+    date_format: Optional[str],  # 互換のため残す（未使用）
+    date_regex: str,
+    max_items: int = 10,
+    engine: ModuleType = scraper_utils,
+    max_age_days: int = scraper_utils.DEFAULT_MAX_AGE_DAYS,
+    sort_order: Optional[str] = None,
+    seen=None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    静的 HTML（文字列 / bytes / BeautifulSoup）から記事リストを抽出する。
+
+    engine には日付パースの流儀を決めるモジュール（scraper_utils / scraper_utils2）を渡す。
+
+    Returns:
+        タイトル行が 1 件も見つからない場合（セレクタが CSS として解釈できない場合を含む）は None。
+        それ以外は extract_items と同じ形式のリスト。
+    """
+    soup = html if isinstance(html, BeautifulSoup) else BeautifulSoup(html, "lxml")
+
+    try:
+        blocks1 = soup.select(SELECTOR_TITLE)
+        blocks2 = soup.select(SELECTOR_DATE) if SELECTOR_DATE else None
+    except Exception as e:
+        log(f"ℹ 静的HTMLではセレクタを解釈できません: {e}")
+        return None
+
+    count_titles = len(blocks1)
+    count_dates = len(blocks2) if blocks2 is not None else 0
+    log(f"📦 発見した記事数(タイトル側・静的): {count_titles}")
+    log(f"🗓 取得可能な日付ブロック数(静的): {count_dates}")
+    if count_titles == 0:
+        return None
+
+    rows = _iter_rows_static(
+        blocks1, blocks2, min(count_titles, max_items),
+        title_selector, title_index,
+        href_selector, href_index,
+        date_selector, date_index,
+    )
+    return engine._build_items(rows, base_url, SELECTOR_DATE, date_regex, max_age_days, sort_order, seen)
+
+
+def _extract_with_browser(url: str, page, engine: ModuleType, args: tuple, kwargs: dict) -> List[Dict[str, Any]]:
+    if page is not None:
+        with span("navigate"):
+            page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms(kwargs.get("budget"), 30000))
+        return engine.extract_items(page, *args, **kwargs)
+
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        try:
+            context = browser.new_context(user_agent=DEFAULT_UA, viewport=DEFAULT_VIEWPORT)
+            page = context.new_page()
+            with span("navigate"):
+                page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms(kwargs.get("budget"), 30000))
+            return engine.extract_items(page, *args, **kwargs)
+        finally:
+            browser.close()
+
+
+def extract_items_auto(
+    url: str,
+    SELECTOR_DATE: Optional[str],
+    SELECTOR_TITLE: str,
+    title_selector: Optional[str],
+    title_index: int,
+    href_selector: Optional[str],
+    href_index: int,
+    base_url: str,
+    date_selector: Optional[str],
+    date_index: int,
+    date_format: Optional[str],
+    date_regex: str,
+    max_items: int = 10,
+    engine: ModuleType = scraper_utils,
+    page=None,
+    max_age_days: int = scraper_utils.DEFAULT_MAX_AGE_DAYS,
+    sort_order: Optional[str] = None,
+    seen=None,
+    budget: Optional[Budget] = None,
+) -> List[Dict[str, Any]]:
+    """
+    まず静的 HTML で抽出し、タイトル行が 0 件（または取得失敗）なら Playwright で抽出する。
+
+    page を渡した場合はフォールバック時にその page で url を開く。
+    省略時はフォールバックが必要になった時だけ Chromium を起動する。
+    budget を渡すと静的取得のタイムアウトとフォールバック時の待機を残り時間で頭打ちにする。
+    """
+    budget = resolve_budget(budget)
+    args = (
+        SELECTOR_DATE, SELECTOR_TITLE,
+        title_selector, title_index,
+        href_selector, href_index,
+        base_url,
+        date_selector, date_index,
+        date_format, date_regex,
+    )
+
+    try:
+        timeout = DEFAULT_TIMEOUT if budget is None else budget.timeout_ms(DEFAULT_TIMEOUT * 1000) / 1000
+        soup = fetch_html(url, timeout=timeout)
+        items = extract_items_static(
+            soup, *args, max_items=max_items, engine=engine,
+            max_age_days=max_age_days, sort_order=sort_order, seen=seen,
+        )
+    except Exception as e:
+        log(f"⚠ 静的HTMLの取得/解析に失敗: {e}")
+        items = None
+
+    if items is not None:
+        return items
+
+    log("ℹ 静的HTMLで記事が見つからないため Playwright で再取得します")
+    return _extract_with_browser(
+        url, page, engine, args,
+        {"max_items": max_items, "max_age_days": max_age_days, "sort_order": sort_order, "seen": seen, "budget": budget},
+    )